@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import MutableMapping, Optional, List, Dict, Any
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+from subprocess import run, PIPE, DEVNULL
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from sys import stdout, executable
+import json
+import os
+import platform
+import statistics
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.synthetic_data import create_synthetic_data
+from tools.aux_functions import get_annotations_files, iter_captions, \
+    create_lists_and_frequencies, create_split_data, check_data_for_split
+from tools.file_io import load_settings_file, load_numpy_object
+from tools.instrumentation import measure_stage
+from tools.packed_arrays import load_arrays, get_packed_item
+from processes.features import extract_features
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['run_benchmark', 'measure_startup', 'measure_feature_storage']
+
+# Commands of which the startup time is measured, and heavy
+# dependencies that should be imported only when they are needed.
+_STARTUP_COMMANDS = {
+    'main_help': ['main.py', '--help'],
+    'import_main': ['-c', 'import main'],
+    'import_dataset_creation': ['-c', 'import processes.dataset'],
+    'import_feature_extraction': ['-c', 'import processes.features']}
+_HEAVY_MODULES = ['librosa', 'numba', 'scipy']
+
+# Default storage configurations of the features, as
+# `<features_dtype>:<codec>[:<level>]`.
+_STORAGE_CONFIGS = ['float64:none', 'float32:none', 'float16:none',
+                    'float32:zlib:1', 'float32:zlib:6', 'float16:zlib:1',
+                    'float32:lzma:0']
+
+
+def run_benchmark(settings_data: MutableMapping[str, Any],
+                  settings_features: MutableMapping[str, Any],
+                  dir_root: Path, nb_clips: Dict[str, int],
+                  min_duration: float, max_duration: float,
+                  seed: int) -> Dict[str, Any]:
+    """Runs the stages of the pipeline on synthetic data and\
+    measures each stage.
+
+    For each stage, the wall time, the throughput (audio files\
+    per second and MB of input data per second), and the peak\
+    resident memory of the process (RSS) during the stage are\
+    measured. The memory of the pools of processes is not included.
+
+    :param settings_data: Settings for creating data files.
+    :type settings_data: dict
+    :param settings_features: Settings for feature extraction.
+    :type settings_features: dict
+    :param dir_root: Root directory for the synthetic data.
+    :type dir_root: pathlib.Path
+    :param nb_clips: Amount of audio files for each split\
+                     (i.e. `development` and `evaluation`).
+    :type nb_clips: dict[str, int]
+    :param min_duration: Minimum duration of the audio files, in seconds.
+    :type min_duration: float
+    :param max_duration: Maximum duration of the audio files, in seconds.
+    :type max_duration: float
+    :param seed: Seed for the synthetic data.
+    :type seed: int
+    :return: The results of the benchmark.
+    :rtype: dict[str, T]
+    """
+    inner_logger = logger.bind(indent=2)
+
+    # Use the synthetic data and always do all the work.
+    settings_data = deepcopy(settings_data)
+    settings_data['directories']['root_dir'] = str(dir_root)
+    settings_data['workflow']['incremental_build'] = False
+
+    settings_dirs = settings_data['directories']
+    settings_ann = settings_data['annotations']
+    settings_output = settings_data['output_files']
+
+    inner_logger.info('Creating synthetic data')
+    audio_files = create_synthetic_data(
+        dir_root=dir_root, settings_dirs=settings_dirs, settings_ann=settings_ann,
+        settings_audio=settings_data['audio'], nb_clips=nb_clips,
+        min_duration=min_duration, max_duration=max_duration, seed=seed)
+    inner_logger.info('Done')
+
+    dir_ann = dir_root.joinpath(settings_dirs['annotations_dir'])
+    dir_output = dir_root.joinpath(settings_output['dir_output'])
+    splits = list(nb_clips.keys())
+
+    nb_clips_all = sum(nb_clips.values())
+    nb_bytes_audio = sum(f.stat().st_size for split in splits for f in audio_files[split])
+    nb_bytes_ann = {split: dir_ann.joinpath(settings_ann['{}_file'.format(split)]).stat().st_size
+                    for split in splits}
+
+    stages = {}
+
+    # Reading of the annotations.
+    with _measure(stages, 'get_annotations_files', nb_clips_all, sum(nb_bytes_ann.values())):
+        csv_splits = dict(zip(splits, get_annotations_files(
+            settings_ann=settings_ann, dir_ann=dir_ann)))
+
+    # Creation of the vocabularies.
+    with _measure(stages, 'create_lists_and_frequencies',
+                  nb_clips['development'], nb_bytes_ann['development']):
+        words_list, chars_list = create_lists_and_frequencies(
+            captions=iter_captions(csv_splits['development'], settings_ann),
+            dir_root=dir_root, settings_ann=settings_ann,
+            settings_cntr=settings_data['counters'])
+
+    # Creation and check of the split data.
+    split_dirs = {
+        split: (Path(settings_dirs['downloaded_audio_dir'],
+                     settings_dirs['downloaded_audio_{}'.format(split)]),
+                dir_output.joinpath(settings_output['dir_data_{}'.format(split)]),
+                dir_output.joinpath(settings_output['dir_audio_{}'.format(split)]),
+                dir_output.joinpath(settings_output['audio_checksums_{}'.format(split)]))
+        for split in splits}
+
+    with _measure(stages, 'create_split_data', nb_clips_all, nb_bytes_audio):
+        for split, (dir_audio, dir_split, dir_audio_data, file_checksums) in split_dirs.items():
+            create_split_data(
+                csv_splits[split], dir_split, dir_audio, dir_root=dir_root,
+                words_list=words_list, chars_list=chars_list,
+                settings_ann=settings_ann, settings_audio=settings_data['audio'],
+                settings_output=settings_output, settings_exec=settings_data['execution'],
+                dir_audio_data=dir_audio_data, file_checksums=file_checksums)
+
+    with _measure(stages, 'check_data_for_split', nb_clips_all, nb_bytes_audio):
+        for split, (dir_audio, dir_split, dir_audio_data, file_checksums) in split_dirs.items():
+            check_data_for_split(
+                dir_audio=dir_root.joinpath(dir_audio),
+                dir_data=dir_split.relative_to(dir_root), dir_root=dir_root,
+                csv_split=csv_splits[split], settings_ann=settings_ann,
+                settings_audio=settings_data['audio'],
+                settings_cntr=settings_data['counters'],
+                dir_audio_data=dir_audio_data,
+                settings_verification=settings_data['verification'],
+                file_checksums=file_checksums, settings_output=settings_output)
+
+    # Extraction of the features.
+    with _measure(stages, 'extract_features', nb_clips_all, nb_bytes_audio):
+        extract_features(settings_data=settings_data, settings_features=settings_features)
+
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _get_commit(),
+        'platform': {'python': platform.python_version(),
+                     'system': platform.platform(),
+                     'cpu_count': os.cpu_count()},
+        'data': {'nb_clips': nb_clips, 'min_duration': min_duration,
+                 'max_duration': max_duration, 'seed': seed,
+                 'audio_mb': nb_bytes_audio / 2 ** 20,
+                 'vocabulary_sizes': {'words': len(words_list),
+                                      'characters': len(chars_list)}},
+        'settings': {'dataset_creation': settings_data,
+                     'feature_extraction': settings_features},
+        'stages': stages}
+
+
+@contextmanager
+def _measure(stages: Dict[str, Dict[str, float]], stage_name: str,
+             nb_clips: int, nb_bytes: int) -> None:
+    """Measures the wall time, throughput, and peak memory of a stage.
+
+    :param stages: The results of the stages, where the results\
+                   of this stage are added.
+    :type stages: dict[str, dict[str, float]]
+    :param stage_name: The name of the stage.
+    :type stage_name: str
+    :param nb_clips: Amount of audio files processed by the stage.
+    :type nb_clips: int
+    :param nb_bytes: Amount of input bytes processed by the stage.
+    :type nb_bytes: int
+    """
+    logger.bind(indent=2).info('Running {}'.format(stage_name))
+
+    with measure_stage(stage_name, nb_files=nb_clips) as measurements:
+        yield
+
+    wall_time = measurements['wall_time_s']
+    stages[stage_name] = {
+        'wall_time_s': wall_time,
+        'clips': nb_clips,
+        'clips_per_s': nb_clips / wall_time,
+        'input_mb': nb_bytes / 2 ** 20,
+        'mb_per_s': nb_bytes / 2 ** 20 / wall_time,
+        'peak_rss_mb': measurements['peak_rss_mb']}
+
+    logger.bind(indent=2).info('{}: {:.3f} s, {:.2f} clips/s, {:.2f} MB/s, '
+                               'peak RSS {:.1f} MB'.format(
+                                   stage_name, wall_time, stages[stage_name]['clips_per_s'],
+                                   stages[stage_name]['mb_per_s'],
+                                   stages[stage_name]['peak_rss_mb']))
+
+
+def measure_startup(nb_runs: int) -> Dict[str, Any]:
+    """Measures the startup time of the code, i.e. the wall time\
+    of running Python commands that only import the code (or show\
+    the help message), with a new Python process for each run.
+
+    Also finds which of the heavy dependencies (e.g. librosa) are\
+    imported by the imports of each command.
+
+    :param nb_runs: Amount of runs of each command.
+    :type nb_runs: int
+    :return: The minimum and median wall time of each command,\
+             and the imported heavy dependencies.
+    :rtype: dict[str, T]
+    """
+    dir_code = Path(__file__).resolve().parent.parent
+    startup = {}
+
+    for command_name, command in _STARTUP_COMMANDS.items():
+        wall_times = []
+        for _ in range(nb_runs):
+            start_time = perf_counter()
+            run([executable] + command, cwd=str(dir_code),
+                stdout=DEVNULL, stderr=DEVNULL, check=True)
+            wall_times.append(perf_counter() - start_time)
+
+        startup[command_name] = {'min_s': min(wall_times),
+                                 'median_s': statistics.median(wall_times)}
+
+        logger.bind(indent=2).info('Startup of {}: {:.3f} s (median {:.3f} s)'.format(
+            command_name, startup[command_name]['min_s'],
+            startup[command_name]['median_s']))
+
+    for command_name in ['import_main', 'import_dataset_creation',
+                         'import_feature_extraction']:
+        result = run([executable, '-c', '{}; import sys; print(" ".join('
+                      'm for m in {!r} if m in sys.modules))'.format(
+                          _STARTUP_COMMANDS[command_name][1], _HEAVY_MODULES)],
+                     cwd=str(dir_code), stdout=PIPE, stderr=DEVNULL,
+                     universal_newlines=True, check=True)
+        startup[command_name]['heavy_modules'] = result.stdout.split()
+
+    return startup
+
+
+def measure_feature_storage(settings_data: MutableMapping[str, Any],
+                            settings_features: MutableMapping[str, Any],
+                            dir_root: Path, storage_configs: List[str],
+                            data_format: Optional[str] = None) -> Dict[str, Any]:
+    """Measures the extraction and the loading of the features, for\
+    different data types and compression of the features.
+
+    For each storage configuration, the features are extracted again\
+    from the split data of `run_benchmark`, and the wall time of the\
+    extraction, the size of the features on disk, and the wall time\
+    of loading all features are measured. The features are loaded\
+    right after they are saved, thus mostly from the page cache, and\
+    the loading time is mainly the time of the decompression.
+
+    :param settings_data: Settings for creating data files.
+    :type settings_data: dict
+    :param settings_features: Settings for feature extraction.
+    :type settings_features: dict
+    :param dir_root: Root directory of the synthetic data (i.e.\
+                     where `run_benchmark` created the split data).
+    :type dir_root: pathlib.Path
+    :param storage_configs: The storage configurations, as\
+                            `<features_dtype>:<codec>[:<level>]`.
+    :type storage_configs: list[str]
+    :param data_format: The output format of the features, or None\
+                        for the format of the settings.
+    :type data_format: str|None
+    :return: The results of each storage configuration.
+    :rtype: dict[str, dict[str, float]]
+    """
+    inner_logger = logger.bind(indent=2)
+
+    settings_data = deepcopy(settings_data)
+    settings_data['directories']['root_dir'] = str(dir_root)
+    settings_data['workflow']['incremental_build'] = False
+
+    storage = {}
+    for storage_config in storage_configs:
+        features_dtype, codec, *level = storage_config.split(':')
+
+        settings_storage = deepcopy(settings_features)
+        settings_output = settings_storage['output']
+        settings_output['dir_output'] = str(Path(
+            settings_output['dir_output'], 'storage', storage_config.replace(':', '_')))
+        settings_output['format'] = data_format or settings_output['format']
+        settings_output['features_dtype'] = features_dtype
+        settings_output['compression']['codec'] = codec
+        settings_output['compression']['level'] = int(level[0]) if len(level) > 0 else None
+
+        dirs_splits = [dir_root.joinpath(settings_output['dir_output'], settings_output[dir_split])
+                       for dir_split in ['dir_development', 'dir_evaluation']]
+
+        with measure_stage('storage_{}'.format(storage_config)) as write_measurements:
+            extract_features(settings_data=settings_data, settings_features=settings_storage)
+
+        nb_bytes = sum(f.stat().st_size for dir_split in dirs_splits
+                       for f in dir_split.rglob('*') if f.is_file())
+
+        with measure_stage('storage_{}_load'.format(storage_config)) as read_measurements:
+            nb_frames = sum(_load_features(dir_split, settings_output['format'])
+                            for dir_split in dirs_splits)
+
+        storage[storage_config] = {
+            'extraction_wall_time_s': write_measurements['wall_time_s'],
+            'size_mb': nb_bytes / 2 ** 20,
+            'extraction_mb_per_s': nb_bytes / 2 ** 20 / write_measurements['wall_time_s'],
+            'loading_wall_time_s': read_measurements['wall_time_s'],
+            'loading_mb_per_s': nb_bytes / 2 ** 20 / read_measurements['wall_time_s'],
+            'loading_frames_per_s': nb_frames / read_measurements['wall_time_s']}
+
+        inner_logger.info('Storage {}: {:.2f} MB, extraction {:.3f} s, loading {:.3f} s '
+                          '({:.0f} frames/s)'.format(
+                              storage_config, storage[storage_config]['size_mb'],
+                              storage[storage_config]['extraction_wall_time_s'],
+                              storage[storage_config]['loading_wall_time_s'],
+                              storage[storage_config]['loading_frames_per_s']))
+
+    return storage
+
+
+def _load_features(dir_split: Path, data_format: str) -> int:
+    """Loads all features of a split.
+
+    :param dir_split: The output directory of the split.
+    :type dir_split: pathlib.Path
+    :param data_format: The data format (`npy`, `packed`, or `sharded`).
+    :type data_format: str
+    :return: The amount of loaded feature frames.
+    :rtype: int
+    """
+    if data_format == 'npy':
+        return sum(len(load_numpy_object(f_path)['features'][0])
+                   for f_path in sorted(dir_split.glob('*.npy')))
+
+    # The items are copied, so that memory-mapped data are read.
+    return sum(len(np.array(get_packed_item(arrays, 'features', i)))
+               for arrays in load_arrays(dir_split, data_format)
+               for i in range(len(arrays['features_offsets'])))
+
+
+def _get_commit() -> str:
+    """Returns the current git commit of the code, if any.
+
+    :return: The hash of the commit, or an empty string.
+    :rtype: str
+    """
+    try:
+        result = run(['git', 'rev-parse', 'HEAD'], cwd=str(Path(__file__).parent),
+                     stdout=PIPE, stderr=DEVNULL, universal_newlines=True)
+    except OSError:
+        return ''
+
+    return result.stdout.strip()
+
+
+def get_argument_parser() -> ArgumentParser:
+    """Creates and returns the ArgumentParser for the benchmark.
+
+    :return: The argument parser.
+    :rtype: argparse.ArgumentParser
+    """
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument('-d', '--config-file-dataset',
+                            type=str, default='dataset_creation')
+    arg_parser.add_argument('-f', '--config-file-features',
+                            type=str, default='feature_extraction')
+    arg_parser.add_argument('--nb-clips-development', type=int, default=20)
+    arg_parser.add_argument('--nb-clips-evaluation', type=int, default=10)
+    arg_parser.add_argument('--min-duration', type=float, default=15.)
+    arg_parser.add_argument('--max-duration', type=float, default=30.)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--nb-startup-runs', type=int, default=5,
+                            help='Runs for measuring the startup time '
+                                 '(0 for not measuring it).')
+    arg_parser.add_argument('--storage-configs', type=str, nargs='*',
+                            default=_STORAGE_CONFIGS,
+                            help='Storage configurations of the features, as '
+                                 '<features_dtype>:<codec>[:<level>] (none for not '
+                                 'measuring the storage).')
+    arg_parser.add_argument('--storage-format', type=str, default=None,
+                            choices=['npy', 'packed', 'sharded'],
+                            help='Output format of the features for measuring the '
+                                 'storage (the format of the settings if not given).')
+    arg_parser.add_argument('--dir-data', type=str, default=None,
+                            help='Directory for the synthetic data '
+                                 '(a temporary directory if not given).')
+    arg_parser.add_argument('-o', '--output-file', type=str,
+                            default='benchmark_results.json')
+    arg_parser.add_argument('-v', '--verbose', action='store_true')
+
+    return arg_parser
+
+
+def main():
+
+    # Treat the logging.
+    logger.remove()
+    logger.add(stdout, format='{level} | [{time:HH:mm:ss}] {name} -- {message}.',
+               level='INFO', filter=lambda record: record['extra']['indent'] == 1)
+    logger.add(stdout, format='  {level} | [{time:HH:mm:ss}] {name} -- {message}.',
+               level='INFO', filter=lambda record: record['extra']['indent'] == 2)
+    main_logger = logger.bind(indent=1)
+
+    args = get_argument_parser().parse_args()
+
+    if not args.verbose:
+        logger.disable('processes')
+        logger.disable('tools')
+
+    main_logger.info('Loading settings')
+    settings_data = load_settings_file(args.config_file_dataset)
+    settings_features = load_settings_file(args.config_file_features)
+    main_logger.info('Settings loaded')
+
+    benchmark_args = dict(
+        settings_data=settings_data, settings_features=settings_features,
+        nb_clips={'development': args.nb_clips_development,
+                  'evaluation': args.nb_clips_evaluation},
+        min_duration=args.min_duration, max_duration=args.max_duration,
+        seed=args.seed)
+
+    main_logger.info('Starting benchmark')
+    with TemporaryDirectory() as dir_tmp:
+        dir_data = Path(dir_tmp if args.dir_data is None else args.dir_data)
+        results = run_benchmark(dir_root=dir_data, **benchmark_args)
+
+        if len(args.storage_configs) > 0:
+            main_logger.info('Measuring storage of the features')
+            results['feature_storage'] = measure_feature_storage(
+                settings_data=settings_data, settings_features=settings_features,
+                dir_root=dir_data, storage_configs=args.storage_configs,
+                data_format=args.storage_format)
+    main_logger.info('Benchmark done')
+
+    if args.nb_startup_runs > 0:
+        main_logger.info('Measuring startup time')
+        results['startup'] = measure_startup(args.nb_startup_runs)
+        main_logger.info('Done')
+
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    main_logger.info('Results saved at {}'.format(args.output_file))
+
+
+if __name__ == '__main__':
+    main()
+
+# EOF
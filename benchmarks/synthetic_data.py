@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import MutableMapping, Dict, List, Any
+from pathlib import Path
+import csv
+
+import numpy as np
+import soundfile as sf
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['create_synthetic_data']
+
+# Words for the synthetic captions.
+_SUBJECTS = ['a dog', 'a man', 'a woman', 'the birds', 'a car', 'the wind',
+             'a crowd of people', 'water', 'a machine', 'the rain', 'a child',
+             'a train', 'an engine', 'the door', 'a bell', 'footsteps']
+_VERBS = ['barks', 'talks', 'sings', 'passes by', 'blows', 'cheers', 'flows',
+          'hums', 'falls', 'laughs', 'rumbles', 'rings', 'creaks', 'echo']
+_DETAILS = ['loudly', 'in the distance', 'nearby', 'on a rainy street',
+            'while the cars pass by', 'in a large hall', 'repeatedly',
+            'outside', 'in the background', 'softly', 'over and over again',
+            'close to the microphone', 'in a park', 'at a train station']
+_PUNCTUATION = ['.', '.', '.', ',', '!', '?']
+
+
+def create_synthetic_data(dir_root: Path,
+                          settings_dirs: MutableMapping[str, Any],
+                          settings_ann: MutableMapping[str, Any],
+                          settings_audio: MutableMapping[str, Any],
+                          nb_clips: Dict[str, int],
+                          min_duration: float, max_duration: float,
+                          seed: int) -> Dict[str, List[Path]]:
+    """Creates synthetic data with the structure of Clotho.
+
+    For each split, creates the audio files (noise and tones, of\
+    random duration between `min_duration` and `max_duration`) and\
+    the annotations file (with `nb_captions` captions for each audio\
+    file), at the directories of the settings. The captions of the\
+    evaluation split are drawn from the captions of the development\
+    split, so that all their words are in the vocabularies (which\
+    are created from the development captions).
+
+    :param dir_root: Root directory of the data.
+    :type dir_root: pathlib.Path
+    :param settings_dirs: Settings for the directories.
+    :type settings_dirs: dict
+    :param settings_ann: Settings for the annotations.
+    :type settings_ann: dict
+    :param settings_audio: Settings for the audio.
+    :type settings_audio: dict
+    :param nb_clips: Amount of audio files for each split\
+                     (i.e. `development` and `evaluation`).
+    :type nb_clips: dict[str, int]
+    :param min_duration: Minimum duration of the audio files, in seconds.
+    :type min_duration: float
+    :param max_duration: Maximum duration of the audio files, in seconds.
+    :type max_duration: float
+    :param seed: Seed for the random generator.
+    :type seed: int
+    :return: The audio files of each split.
+    :rtype: dict[str, list[pathlib.Path]]
+    """
+    rng = np.random.default_rng(seed)
+    sr = int(settings_audio['sr'])
+    nb_captions = int(settings_ann['nb_captions'])
+
+    dir_ann = dir_root.joinpath(settings_dirs['annotations_dir'])
+    dir_ann.mkdir(parents=True, exist_ok=True)
+
+    audio_files = {}
+    captions_development = []
+
+    for split_name in ['development', 'evaluation']:
+        nb_split_clips = nb_clips[split_name]
+        dir_audio = dir_root.joinpath(
+            settings_dirs['downloaded_audio_dir'],
+            settings_dirs['downloaded_audio_{}'.format(split_name)])
+        dir_audio.mkdir(parents=True, exist_ok=True)
+
+        audio_files[split_name] = []
+        csv_rows = []
+
+        for i_clip in range(nb_split_clips):
+            audio_file = dir_audio.joinpath('synthetic_{}_{:05d}.wav'.format(split_name, i_clip))
+            duration = rng.uniform(min_duration, max_duration)
+
+            sf.write(str(audio_file), _get_audio(rng, sr, duration), sr, subtype='PCM_16')
+
+            if split_name == 'development':
+                captions = [_get_caption(rng) for _ in range(nb_captions)]
+                captions_development.extend(captions)
+            else:
+                captions = [str(caption) for caption in rng.choice(
+                    captions_development, size=nb_captions)]
+
+            audio_files[split_name].append(audio_file)
+            csv_rows.append([audio_file.name] + captions)
+
+        with dir_ann.joinpath(settings_ann['{}_file'.format(split_name)]).open(
+                'w', newline='') as f:
+            csv_writer = csv.writer(f)
+            csv_writer.writerow([settings_ann['audio_file_column']] + [
+                settings_ann['captions_fields_prefix'].format(i_caption)
+                for i_caption in range(1, nb_captions + 1)])
+            csv_writer.writerows(csv_rows)
+
+    return audio_files
+
+
+def _get_audio(rng: np.random.Generator, sr: int, duration: float) -> np.ndarray:
+    """Returns a synthetic audio signal (noise and tones).
+
+    :param rng: The random generator.
+    :type rng: numpy.random.Generator
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param duration: Duration in seconds.
+    :type duration: float
+    :return: The audio signal.
+    :rtype: numpy.ndarray
+    """
+    t = np.arange(int(sr * duration)) / sr
+    audio = .1 * rng.standard_normal(len(t))
+
+    for frequency in rng.uniform(100, 5000, size=3):
+        audio += .2 * np.sin(2 * np.pi * frequency * t) * \
+            (1 + np.sin(2 * np.pi * rng.uniform(.1, 2) * t)) / 2
+
+    return (audio / np.abs(audio).max() * .9).astype(np.float32)
+
+
+def _get_caption(rng: np.random.Generator) -> str:
+    """Returns a synthetic caption.
+
+    :param rng: The random generator.
+    :type rng: numpy.random.Generator
+    :return: The caption.
+    :rtype: str
+    """
+    clauses = ['{} {} {}'.format(rng.choice(_SUBJECTS), rng.choice(_VERBS), rng.choice(_DETAILS))
+               for _ in range(rng.integers(1, 3))]
+    caption = ' and '.join(clauses)
+
+    return '{}{}'.format(caption[0].upper() + caption[1:], rng.choice(_PUNCTUATION))
+
+# EOF
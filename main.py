@@ -3,12 +3,16 @@
 
 from sys import stdout
 from datetime import datetime
+from pathlib import Path
 
 from loguru import logger
 
 from tools.argument_parsing import get_argument_parser
 from tools.file_io import load_settings_file
-from processes import create_dataset, extract_features
+from tools.instrumentation import measure_stage, enable_cprofile, dump_report
+# The processes are imported when they are used (see processes/__init__.py),
+# so that only the dependencies of the used processes are imported.
+import processes
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
@@ -29,9 +33,15 @@ def main():
         main_logger.info('Verbose if off. Not logging messages')
         logger.disable('__main__')
         logger.disable('processes')
+        logger.disable('tools.instrumentation')
 
     main_logger.info(datetime.now().strftime('%Y-%m-%d %H:%M'))
 
+    # Get the directory for the profiling files of this run.
+    dir_profile = Path(args.profile_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    if args.profile and args.cprofile:
+        enable_cprofile(dir_profile)
+
     main_logger.info('Loading settings')
     settings_dataset = load_settings_file(args.config_file_dataset)
     settings_features = load_settings_file(args.config_file_features)
@@ -39,14 +49,20 @@ def main():
 
     if settings_dataset['workflow']['create_dataset']:
         main_logger.info('Starting Clotho dataset creation')
-        create_dataset(settings_dataset)
+        with measure_stage('create_dataset'):
+            processes.create_dataset(settings_dataset)
         main_logger.info('Dataset created')
 
     if settings_dataset['workflow']['extract_features']:
         main_logger.info('Starting Clotho feature extraction')
-        extract_features(settings_dataset, settings_features)
+        with measure_stage('extract_features'):
+            processes.extract_features(settings_dataset, settings_features)
         main_logger.info('Features extracted')
 
+    if args.profile:
+        dump_report(dir_profile.joinpath('report.json'))
+        main_logger.info('Profiling report saved at {}'.format(dir_profile))
+
 
 if __name__ == '__main__':
     main()
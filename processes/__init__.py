@@ -1,11 +1,24 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from processes.dataset import create_dataset
-from processes.features import extract_features
+from importlib import import_module
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
 __all__ = ['create_dataset', 'extract_features']
 
+# Module of each function of the package.
+_MODULES = {'create_dataset': 'dataset', 'extract_features': 'features'}
+
+
+def __getattr__(name):
+    """Imports the module of a function of the package when the\
+    function is first used, so that e.g. the dataset creation does\
+    not import the feature extraction dependencies.
+    """
+    if name in _MODULES:
+        return getattr(import_module('.{}'.format(_MODULES[name]), __name__), name)
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
 # EOF
@@ -10,10 +10,14 @@ from functools import partial
 from loguru import logger
 
 from tools.argument_parsing import get_argument_parser
-from tools.aux_functions import get_annotations_files, \
+from tools.aux_functions import get_annotations_files, iter_captions, \
     get_amount_of_file_in_dir, check_data_for_split, \
     create_split_data, create_lists_and_frequencies
+from tools.build_manifest import BuildManifest
+from tools.captions_functions import set_clean_sentence_cache_size, \
+    get_clean_sentence_cache_info
 from tools.file_io import load_settings_file
+from tools.instrumentation import measure_stage, enable_cprofile, dump_report
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
@@ -35,29 +39,36 @@ def create_dataset(settings: MutableMapping[str, Any]) -> None:
     # Get root dir
     dir_root = Path(settings['directories']['root_dir'])
 
+    # Get the manifest of the build, for skipping the up to date data.
+    build_manifest = BuildManifest(dir_root.joinpath(
+        settings['output_files']['dir_output'],
+        settings['output_files']['build_manifest_file_name'])) \
+        if settings['workflow']['incremental_build'] else None
+
+    # Set the size of the cache of the cleaned captions.
+    set_clean_sentence_cache_size(settings['execution']['clean_sentence_cache_size'])
+
     # Read the annotation files
     inner_logger.info('Reading annotations files')
-    csv_dev, csv_eva = get_annotations_files(
-        settings_ann=settings['annotations'],
-        dir_ann=dir_root.joinpath(settings['directories']['annotations_dir']))
+    with measure_stage('read_annotations') as stage:
+        csv_dev, csv_eva = get_annotations_files(
+            settings_ann=settings['annotations'],
+            dir_ann=dir_root.joinpath(settings['directories']['annotations_dir']))
+        stage['files'] = 2
     inner_logger.info('Done')
 
-    # Get all captions
-    inner_logger.info('Getting the captions')
-    captions_development = [
-        csv_field.get(
-            settings['annotations']['captions_fields_prefix'].format(c_ind))
-        for csv_field in csv_dev
-        for c_ind in range(1, 6)]
-    inner_logger.info('Done')
+    # Get all captions, one at a time.
+    captions_development = iter_captions(csv_dev, settings['annotations'])
 
     # Create lists of indices and frequencies for words and characters.
     inner_logger.info('Creating and saving words and chars lists '
                       'and frequencies')
-    words_list, chars_list = create_lists_and_frequencies(
-        captions=captions_development, dir_root=dir_root,
-        settings_ann=settings['annotations'],
-        settings_cntr=settings['counters'])
+    with measure_stage('create_vocabularies'):
+        words_list, chars_list = create_lists_and_frequencies(
+            captions=captions_development, dir_root=dir_root,
+            settings_ann=settings['annotations'],
+            settings_cntr=settings['counters'],
+            build_manifest=build_manifest)
     inner_logger.info('Done')
 
     # Aux partial function for convenience.
@@ -67,7 +78,9 @@ def create_dataset(settings: MutableMapping[str, Any]) -> None:
         words_list=words_list, chars_list=chars_list,
         settings_ann=settings['annotations'],
         settings_audio=settings['audio'],
-        settings_output=settings['output_files'])
+        settings_output=settings['output_files'],
+        settings_exec=settings['execution'],
+        build_manifest=build_manifest)
 
     # For each data split (i.e. development and evaluation)
     for split_data in [(csv_dev, 'development'), (csv_eva, 'evaluation')]:
@@ -80,13 +93,24 @@ def create_dataset(settings: MutableMapping[str, Any]) -> None:
             settings['output_files']['dir_output'],
             settings['output_files']['dir_data_{}'.format(split_name)])
 
+        dir_audio_data = dir_root.joinpath(
+            settings['output_files']['dir_output'],
+            settings['output_files']['dir_audio_{}'.format(split_name)])
+
+        file_checksums = dir_root.joinpath(
+            settings['output_files']['dir_output'],
+            settings['output_files']['audio_checksums_{}'.format(split_name)])
+
         dir_downloaded_audio = Path(
             settings['directories']['downloaded_audio_dir'],
             settings['directories']['downloaded_audio_{}'.format(split_name)])
 
         # Create the data for the split.
         inner_logger.info('Creating the {} split data'.format(split_name))
-        split_func(split_csv, dir_split, dir_downloaded_audio)
+        with measure_stage('create_split_data/{}'.format(split_name),
+                           nb_files=len(split_csv)):
+            split_func(split_csv, dir_split, dir_downloaded_audio,
+                       dir_audio_data=dir_audio_data, file_checksums=file_checksums)
         inner_logger.info('Done')
 
         # Count and print the amount of initial and resulting files.
@@ -103,17 +127,28 @@ def create_dataset(settings: MutableMapping[str, Any]) -> None:
 
         # Check the created lists of indices for words and characters.
         inner_logger.info('Checking the {} split'.format(split_name))
-        check_data_for_split(
-            dir_audio=dir_root.joinpath(dir_downloaded_audio),
-            dir_data=Path(settings['output_files']['dir_output'],
-                          settings['output_files']['dir_data_{}'.format(
-                              split_name)]),
-            dir_root=dir_root, csv_split=split_csv,
-            settings_ann=settings['annotations'],
-            settings_audio=settings['audio'],
-            settings_cntr=settings['counters'])
+        with measure_stage('check_data_for_split/{}'.format(split_name),
+                           nb_files=len(split_csv)):
+            check_data_for_split(
+                dir_audio=dir_root.joinpath(dir_downloaded_audio),
+                dir_data=Path(settings['output_files']['dir_output'],
+                              settings['output_files']['dir_data_{}'.format(
+                                  split_name)]),
+                dir_root=dir_root, csv_split=split_csv,
+                settings_ann=settings['annotations'],
+                settings_audio=settings['audio'],
+                settings_cntr=settings['counters'],
+                dir_audio_data=dir_audio_data,
+                settings_verification=settings['verification'],
+                file_checksums=file_checksums,
+                settings_output=settings['output_files'])
         inner_logger.info('Done')
 
+    # Report the use of the cache of the cleaned captions.
+    cache_info = get_clean_sentence_cache_info()
+    inner_logger.info('Captions cleaning cache: {hits} hits, {misses} misses, '
+                      'hit rate {hit_rate:.2%}, size {size}/{max_size}'.format(**cache_info))
+
 
 def main():
 
@@ -134,9 +169,15 @@ def main():
         main_logger.info('Verbose if off. Not logging messages')
         logger.disable('__main__')
         logger.disable('processes')
+        logger.disable('tools.instrumentation')
 
     main_logger.info(datetime.now().strftime('%Y-%m-%d %H:%M'))
 
+    # Get the directory for the profiling files of this run.
+    dir_profile = Path(args.profile_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    if args.profile and args.cprofile:
+        enable_cprofile(dir_profile)
+
     # Load settings file.
     main_logger.info('Loading settings')
     settings = load_settings_file(args.config_file_dataset)
@@ -144,9 +185,14 @@ def main():
 
     # Create the dataset.
     main_logger.info('Starting Clotho dataset creation')
-    create_dataset(settings)
+    with measure_stage('create_dataset'):
+        create_dataset(settings)
     main_logger.info('Dataset created')
 
+    if args.profile:
+        dump_report(dir_profile.joinpath('report.json'))
+        main_logger.info('Profiling report saved at {}'.format(dir_profile))
+
 
 if __name__ == '__main__':
     main()
@@ -2,17 +2,29 @@
 # -*- coding: utf-8 -*-
 
 from sys import stdout
-from typing import MutableMapping, Any
+from typing import MutableMapping, List, Dict, Tuple, \
+    Callable, Optional, Union, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from functools import partial
 from pathlib import Path
 from importlib import import_module
-from itertools import chain
 from datetime import datetime
 
 import numpy as np
 from loguru import logger
 
-from tools.file_io import load_numpy_object, dump_numpy_object, load_settings_file
+from tools.async_writer import AsyncWriter
+from tools.aux_functions import get_split_records
+from tools.build_manifest import BuildManifest, get_signature, get_code_version
+from tools.compression import dump_compressed_numpy_object
+from tools.file_io import dump_numpy_object, load_settings_file
+from tools.instrumentation import measure_stage, enable_cprofile, dump_report
+from tools.split_index import SplitIndexWriter, load_split_index, get_split_index_file
+from tools.packed_arrays import PackedArraysWriter, ShardedArraysWriter, \
+    get_arrays_writer
 from tools.argument_parsing import get_argument_parser
+from processes.spectrum import magnitude_spectrum, get_spectrum_settings
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
@@ -23,6 +35,44 @@ def extract_features(settings_data: MutableMapping[str, Any],
                      settings_features: MutableMapping[str, Any]) -> None:
     """Extracts features from the audio data of Clotho.
 
+    The features and the caption data are saved either as one\
+    numpy object per caption (`npy` output format), in flat,\
+    typed, arrays (`packed` output format), or in shards of\
+    flat, typed, arrays (`sharded` output format).
+
+    Besides the features of the `module`, `process`, and `output`\
+    settings, the features of each of the `feature_sets` settings\
+    are extracted (see `_get_feature_sets`). The audio data are\
+    loaded once for all the sets of features, and the magnitude\
+    spectrum (see processes.spectrum.magnitude_spectrum) is\
+    calculated once for the sets of features with the same\
+    spectrum settings and a `spectrum_feature_extraction` function.\
+    Each set of features is saved at its own output directories.
+
+    If the feature extraction module has a `batch_feature_extraction`\
+    function, the features are extracted for `batch_size` audio files\
+    at once. With more than one worker, the features are extracted\
+    with a pool of processes, while the data are loaded and the\
+    features are saved in the background. The numpy objects of\
+    the `npy` output format are saved by `io_threads` I/O threads.
+
+    The features are cast to the `features_dtype` of the output\
+    settings (if any). With a `codec` other than `none` at the\
+    `compression` output settings, the numpy objects (`npy` output\
+    format) or the features and audio data (`packed` and `sharded`\
+    output formats) are compressed in blocks (see tools.compression).
+
+    The index of each split (see tools.split_index.SplitIndexWriter) is\
+    saved next to the output directory of the split, with the file name\
+    of the `index_file_name_template` output setting. The records of\
+    the split data are found from the index of the split data, if any.
+
+    With incremental build, the features that are up to date (i.e.\
+    same data of the audio file, settings, and code) are not extracted\
+    again. With the `npy` output format, this is checked for each audio\
+    file, thus an interrupted extraction is resumed. With the `packed`\
+    and `sharded` output formats, this is checked for the whole split.
+
     :param settings_data: Settings for creating data files.
     :type settings_data: dict[str, T]
     :param settings_features: Settings for feature extraction.
@@ -38,74 +88,671 @@ def extract_features(settings_data: MutableMapping[str, Any],
     dir_eva = dir_output.joinpath(
         settings_data['output_files']['dir_data_evaluation'])
 
-    # Get the feature extraction module.
-    module_f_func = import_module(
-        '.{}'.format(settings_features['module']),
-        package=settings_features['package'])
-
-    # Get the feature extraction function.
-    f_func = getattr(module_f_func, 'feature_extraction')
-
-    # Get the directories for output.
-    dir_output_dev = dir_root.joinpath(
-            settings_features['output']['dir_output'],
-            settings_features['output']['dir_development'])
-    dir_output_eva = dir_root.joinpath(
-            settings_features['output']['dir_output'],
-            settings_features['output']['dir_evaluation'])
-
-    # Create the directories.
-    dir_output_dev.mkdir(parents=True, exist_ok=True)
-    dir_output_eva.mkdir(parents=True, exist_ok=True)
-
-    # Apply the function to each file and save the result.
-    for data_file_name in filter(lambda _x: _x.suffix == settings_features['data_files_suffix'],
-                                 chain(dir_dev.iterdir(), dir_eva.iterdir())):
-
-        # Load the data file.
-        data_file = load_numpy_object(data_file_name)
-
-        # Extract the features.
-        features = f_func(data_file['audio_data'].item(),
-                          **settings_features['process'])
-
-        # Populate the recarray data and dtypes.
-        array_data = (data_file['file_name'].item(), )
-        dtypes = [('file_name', data_file['file_name'].dtype)]
-
-        # Check if we keeping the raw audio data.
-        if settings_features['keep_raw_audio_data']:
-            # And add them to the recarray data and dtypes.
-            array_data += (data_file['audio_data'].item(), )
-            dtypes.append(('audio_data', data_file['audio_data'].dtype))
-
-        # Add the rest to the recarray.
-        array_data += (
-            features,
-            data_file['caption'].item(),
-            data_file['caption_ind'].item(),
-            data_file['words_ind'].item(),
-            data_file['chars_ind'].item())
-        dtypes.extend([
-            ('features', np.dtype(object)),
-            ('caption', data_file['caption'].dtype),
-            ('caption_ind', data_file['caption_ind'].dtype),
-            ('words_ind', data_file['words_ind'].dtype),
-            ('chars_ind', data_file['chars_ind'].dtype)
-        ])
-
-        # Make the recarray
-        np_rec_array = np.rec.array([array_data], dtype=dtypes)
-
-        # Make the path for serializing the recarray.
-        parent_path = dir_output_dev \
-            if data_file_name.parent.name == settings_data['output_files']['dir_data_development'] \
-            else dir_output_eva
-
-        file_path = parent_path.joinpath(data_file_name.name)
-
-        # Dump it.
+    # Get the directories of the shared audio data.
+    dir_audio_dev = dir_output.joinpath(
+        settings_data['output_files']['dir_audio_development'])
+    dir_audio_eva = dir_output.joinpath(
+        settings_data['output_files']['dir_audio_evaluation'])
+
+    # Get the manifest of the data, for skipping the up to date features.
+    data_manifest = BuildManifest(dir_output.joinpath(
+        settings_data['output_files']['build_manifest_file_name'])) \
+        if settings_data['workflow']['incremental_build'] else None
+
+    # Get the feature extraction, the output directories, and
+    # the manifest of the builds of each set of features.
+    feature_sets = []
+    features_manifests = {}
+    for settings_set in _get_feature_sets(settings_features):
+
+        # Get the feature extraction module.
+        module_f_func = import_module(
+            '.{}'.format(settings_set['module']),
+            package=settings_set['package'])
+
+        # Get the directories for output.
+        dirs_output_split = [
+            dir_root.joinpath(settings_set['output']['dir_output'],
+                              settings_set['output'][dir_split])
+            for dir_split in ['dir_development', 'dir_evaluation']]
+
+        # Create the directories.
+        for dir_output_split in dirs_output_split:
+            dir_output_split.mkdir(parents=True, exist_ok=True)
+
+        # Sets of features with the same output directory share
+        # the manifest of the builds.
+        features_manifest, settings_signature = None, None
+        if data_manifest is not None:
+            manifest_file = dir_root.joinpath(
+                settings_set['output']['dir_output'],
+                settings_set['output']['build_manifest_file_name'])
+            if manifest_file not in features_manifests:
+                features_manifests[manifest_file] = BuildManifest(manifest_file)
+            features_manifest = features_manifests[manifest_file]
+            # The execution settings do not change the features.
+            settings_signature = get_signature(
+                {key: value for key, value in settings_set.items()
+                 if key not in ['execution', 'batch_size']},
+                get_code_version(__name__, module_f_func.__name__, 'processes.spectrum',
+                                 'tools.packed_arrays', 'tools.compression'))
+
+        feature_sets.append({
+            'settings': settings_set,
+            'dirs_output_split': dirs_output_split,
+            'features_manifest': features_manifest,
+            'settings_signature': settings_signature,
+            # The feature extraction function and, if the module has them, the
+            # batched and the magnitude spectrum feature extraction functions.
+            'extractor': {
+                'f_func': getattr(module_f_func, 'feature_extraction'),
+                'batch_f_func': getattr(module_f_func, 'batch_feature_extraction', None),
+                'spectrum_f_func': getattr(module_f_func, 'spectrum_feature_extraction', None),
+                'settings_process': settings_set['process'],
+                'features_dtype': settings_set['output']['features_dtype']}})
+
+    dirs_output_split = [dir_output_split for feature_set in feature_sets
+                         for dir_output_split in feature_set['dirs_output_split']]
+    if len(set(dirs_output_split)) != len(dirs_output_split):
+        raise ValueError('Sets of features must have different output directories.')
+
+    extractors = [feature_set['extractor'] for feature_set in feature_sets]
+
+    # Apply the functions to each audio file and save the results for
+    # each of its captions. Features are extracted once per audio file.
+    for i_split, (dir_data, dir_audio_data) in enumerate([
+            (dir_dev, dir_audio_dev), (dir_eva, dir_audio_eva)]):
+
+        with measure_stage(feature_sets[0]['dirs_output_split'][i_split].name,
+                           nb_files=0) as stage:
+            split_records = get_split_records(
+                dir_data=dir_data, settings_output=settings_data['output_files'],
+                dir_audio_data=dir_audio_data,
+                suffix=settings_features['data_files_suffix'],
+                index_file=get_split_index_file(
+                    dir_data, settings_data['output_files']['index_file_name_template']))
+
+            # Get the signatures of the data of each audio file.
+            data_signatures = {}
+            if data_manifest is not None:
+                key_prefix = '{}/'.format(dir_data.name)
+                data_signatures = {
+                    Path(key[len(key_prefix):]).stem: entry['signature']
+                    for key, entry in data_manifest.items() if key.startswith(key_prefix)}
+
+            # Get the outputs of the sets of features, None
+            # for the sets of features that are up to date.
+            outputs = [
+                _get_split_output(
+                    dir_output_split=feature_set['dirs_output_split'][i_split],
+                    settings_output=feature_set['settings']['output'],
+                    split_records=split_records, data_signatures=data_signatures,
+                    features_manifest=feature_set['features_manifest'],
+                    settings_signature=feature_set['settings_signature'])
+                for feature_set in feature_sets]
+            active_sets = [i_set for i_set, output in enumerate(outputs) if output is not None]
+
+            # Get the audio files with features to extract, and the
+            # sets of features to extract for each audio file.
+            batch_items = [
+                (f_stem, tuple(i_set for i_set in active_sets
+                               if f_stem in outputs[i_set]['f_stems']))
+                for f_stem in split_records.keys()]
+            batch_items = [item for item in batch_items if len(item[1]) > 0]
+            stage['files'] = len(batch_items)
+
+            batch_size = settings_features['batch_size'] \
+                if any(extractors[i_set]['batch_f_func'] is not None
+                       for i_set in active_sets) else 1
+
+            # The numpy objects are saved by I/O threads. The packed
+            # arrays are saved in order, thus without I/O threads.
+            async_writer = AsyncWriter(
+                nb_threads=settings_features['execution']['io_threads']
+                if all(outputs[i_set]['is_npy'] for i_set in active_sets) else 0,
+                queue_size=settings_features['execution']['io_queue_size'])
+
+            # Extract and save the features, for batches of audio files.
+            with async_writer:
+                _map_batches(
+                    batches=[batch_items[i:i + batch_size]
+                             for i in range(0, len(batch_items), batch_size)],
+                    load_func=partial(_load_first_records, split_records=split_records),
+                    features_func=partial(_get_batch_features, extractors=extractors),
+                    dump_func=partial(_dump_batch_features, async_writer=async_writer,
+                                      split_records=split_records, outputs=outputs,
+                                      keep_raw_audio_data=settings_features['keep_raw_audio_data']),
+                    settings_exec=settings_features['execution'])
+
+            for output in outputs:
+                if output is None:
+                    continue
+
+                if output['packed_writer'] is not None:
+                    output['packed_writer'].close()
+
+                    if output['features_manifest'] is not None and \
+                            output['split_signature'] is not None:
+                        output['features_manifest'].update(
+                            output['dir_output_split'].name,
+                            signature=output['split_signature'],
+                            outputs=[output['dir_output_split']])
+
+                output['split_index'].close(audio_stems=split_records.keys())
+
+
+def _get_feature_sets(settings_features: MutableMapping[str, Any]) -> \
+        List[Dict[str, Any]]:
+    """Returns the settings of each set of features.
+
+    The first set of features is the one of the `module`, `process`,\
+    and `output` settings. Each of the `feature_sets` settings can\
+    have its own `module` and `process` settings, and `output`\
+    settings that replace the ones of the first set of features\
+    (at least the output directories, since each set of features\
+    is saved at its own output directories).
+
+    :param settings_features: Settings for feature extraction.
+    :type settings_features: dict[str, T]
+    :return: The settings for the feature extraction of each set\
+             of features, without the `feature_sets` settings.
+    :rtype: list[dict[str, T]]
+    """
+    settings_first = {key: value for key, value in settings_features.items()
+                      if key != 'feature_sets'}
+    feature_sets = [settings_first]
+
+    for settings_set in settings_features['feature_sets'] or []:
+        feature_set = dict(settings_first)
+        feature_set['module'] = settings_set.get('module', settings_first['module'])
+        feature_set['process'] = settings_set.get('process', settings_first['process'])
+        feature_set['output'] = dict(settings_first['output'], **settings_set.get('output', {}))
+        feature_sets.append(feature_set)
+
+    return feature_sets
+
+
+def _get_split_output(dir_output_split: Path,
+                      settings_output: MutableMapping[str, Any],
+                      split_records: MutableMapping[str, List[Tuple[str, Callable]]],
+                      data_signatures: MutableMapping[str, str],
+                      features_manifest: Optional[BuildManifest],
+                      settings_signature: Optional[str]) -> \
+        Optional[Dict[str, Any]]:
+    """Returns the output of a set of features for a split, i.e.\
+    where and how the features are saved, and the audio files with\
+    features to extract.
+
+    :param dir_output_split: The output directory of the split.
+    :type dir_output_split: pathlib.Path
+    :param settings_output: The output settings of the set of features.
+    :type settings_output: dict[str, T]
+    :param split_records: The records of the split.
+    :type split_records: dict[str, list[(str, callable)]]
+    :param data_signatures: The signatures of the data of the audio files.
+    :type data_signatures: dict[str, str]
+    :param features_manifest: Manifest of the builds of the features, if any.
+    :type features_manifest: tools.build_manifest.BuildManifest|None
+    :param settings_signature: The signature of the settings and\
+                               code of the set of features, if any.
+    :type settings_signature: str|None
+    :return: The output of the set of features, or None if the\
+             features of the split are up to date.
+    :rtype: dict[str, T]|None
+    """
+    is_npy = settings_output['format'] == 'npy'
+
+    # Without the index of the features, all features are extracted
+    # again, since the index has information of all the records.
+    index_file = get_split_index_file(
+        dir_output_split, settings_output['index_file_name_template'])
+    use_manifest = features_manifest is not None and index_file.exists()
+
+    # Get the signatures of the features of each audio file, based
+    # on the signatures of the data of the audio file.
+    signatures, split_signature = {}, None
+    if features_manifest is not None:
+        signatures = {
+            f_stem: get_signature(settings_signature, data_signatures[f_stem])
+            if f_stem in data_signatures else None
+            for f_stem in split_records.keys()}
+
+        if not is_npy:
+            split_signature = None if None in signatures.values() \
+                else get_signature(sorted(signatures.items()))
+            if use_manifest and \
+                    features_manifest.is_up_to_date(dir_output_split.name, split_signature):
+                return None
+
+    # Get the audio files with features to extract.
+    f_stems = set(split_records.keys())
+    if use_manifest and is_npy:
+        f_stems = {
+            f_stem for f_stem in f_stems
+            if not features_manifest.is_up_to_date(
+                '{}/{}'.format(dir_output_split.name, f_stem), signatures[f_stem])}
+
+    return {
+        'dir_output_split': dir_output_split,
+        'is_npy': is_npy,
+        'f_stems': f_stems,
+        'packed_writer': get_arrays_writer(
+            data_format=settings_output['format'],
+            dir_output=dir_output_split,
+            shard_size=settings_output['shard_size']),
+        # Get the compression of the features, if any.
+        'compression': None if settings_output['compression']['codec'] == 'none'
+        else dict(settings_output['compression']),
+        'features_manifest': features_manifest,
+        'signatures': signatures,
+        'split_signature': split_signature,
+        # The rows of the features that are not extracted again
+        # are kept from the previous index.
+        'split_index': SplitIndexWriter(
+            index_file, previous_index=load_split_index(index_file)
+            if use_manifest and is_npy else None)}
+
+
+def _map_batches(batches: List[List[Tuple[str, Tuple[int, ...]]]],
+                 load_func: Callable[[List[Tuple[str, Tuple[int, ...]]]], List[Dict[str, Any]]],
+                 features_func: Callable[[List[Tuple[str, Tuple[int, ...]]], List[np.ndarray]],
+                                         List[Dict[int, np.ndarray]]],
+                 dump_func: Callable[[List[Tuple[str, Tuple[int, ...]]], List[Dict[str, Any]],
+                                      List[Dict[int, np.ndarray]]], None],
+                 settings_exec: MutableMapping[str, Any]) -> None:
+    """Loads, extracts the features, and saves the features of\
+    batches of audio files.
+
+    With more than one worker, the features are extracted with a\
+    pool of processes, while a thread loads the next batches and\
+    another thread saves the features of the previous batches. At\
+    most `max_waveforms` audio files are loaded and not yet saved\
+    at any time, and the batches are saved in their order.
+
+    :param batches: The stem of each audio file of each batch, with\
+                    the indices of the sets of features to extract.
+    :type batches: list[list[(str, tuple[int])]]
+    :param load_func: Function that loads the first record of each\
+                      audio file of a batch.
+    :type load_func: callable
+    :param features_func: Function that extracts the features of\
+                          the audio data of a batch.
+    :type features_func: callable
+    :param dump_func: Function that saves the features and the\
+                      records of a batch.
+    :type dump_func: callable
+    :param settings_exec: Settings for the execution (i.e. workers\
+                          and maximum amount of waveforms in memory).
+    :type settings_exec: dict
+    """
+    nb_workers = int(settings_exec['workers'] or 1)
+
+    if nb_workers <= 1:
+        for batch in batches:
+            first_records = load_func(batch)
+            dump_func(batch, first_records, features_func(
+                batch, [record['audio_data'] for record in first_records]))
+        return
+
+    max_waveforms = int(settings_exec['max_waveforms'])
+
+    with ProcessPoolExecutor(max_workers=nb_workers) as pool, \
+            ThreadPoolExecutor(max_workers=1) as reader, \
+            ThreadPoolExecutor(max_workers=1) as writer:
+        in_flight = deque()
+        nb_waveforms = 0
+
+        try:
+            for batch in batches:
+                # Wait for the oldest batches to be saved, so that
+                # at most `max_waveforms` waveforms are in memory.
+                while len(in_flight) > 0 and \
+                        nb_waveforms + len(batch) > max_waveforms:
+                    nb_batch_waveforms, write_future = in_flight.popleft()
+                    write_future.result()
+                    nb_waveforms -= nb_batch_waveforms
+
+                read_future = reader.submit(
+                    _read_batch, batch, load_func, features_func, pool)
+                in_flight.append((len(batch), writer.submit(
+                    _write_batch, batch, read_future, dump_func)))
+                nb_waveforms += len(batch)
+
+            while len(in_flight) > 0:
+                in_flight.popleft()[1].result()
+        except BaseException:
+            for _, write_future in in_flight:
+                write_future.cancel()
+            raise
+
+
+def _read_batch(batch: List[Tuple[str, Tuple[int, ...]]],
+                load_func: Callable[[List[Tuple[str, Tuple[int, ...]]]], List[Dict[str, Any]]],
+                features_func: Callable[[List[Tuple[str, Tuple[int, ...]]], List[np.ndarray]],
+                                        List[Dict[int, np.ndarray]]],
+                pool: ProcessPoolExecutor) -> \
+        Tuple[List[Dict[str, Any]], Future]:
+    """Loads a batch and submits its feature extraction to a pool.
+
+    :param batch: The stems of the audio files of the batch, with\
+                  the indices of the sets of features to extract.
+    :type batch: list[(str, tuple[int])]
+    :param load_func: Function that loads the first records of the batch.
+    :type load_func: callable
+    :param features_func: Function that extracts the features of the batch.
+    :type features_func: callable
+    :param pool: The pool of processes.
+    :type pool: concurrent.futures.ProcessPoolExecutor
+    :return: The first records and the future of the features.
+    :rtype: (list[dict[str, T]], concurrent.futures.Future)
+    """
+    first_records = load_func(batch)
+    return first_records, pool.submit(
+        features_func, batch, [record['audio_data'] for record in first_records])
+
+
+def _write_batch(batch: List[Tuple[str, Tuple[int, ...]]], read_future: Future,
+                 dump_func: Callable[[List[Tuple[str, Tuple[int, ...]]], List[Dict[str, Any]],
+                                      List[Dict[int, np.ndarray]]], None]) -> None:
+    """Saves a batch, when its features are extracted.
+
+    :param batch: The stems of the audio files of the batch, with\
+                  the indices of the sets of features to extract.
+    :type batch: list[(str, tuple[int])]
+    :param read_future: The future of the first records and of the features.
+    :type read_future: concurrent.futures.Future
+    :param dump_func: Function that saves the features and records of the batch.
+    :type dump_func: callable
+    """
+    first_records, features_future = read_future.result()
+    dump_func(batch, first_records, features_future.result())
+
+
+def _load_first_records(batch: List[Tuple[str, Tuple[int, ...]]],
+                        split_records: MutableMapping[str, List[Tuple[str, Callable]]]) -> \
+        List[Dict[str, Any]]:
+    """Loads the first record (i.e. with the audio data) of each audio file.
+
+    :param batch: The stems of the audio files, with the\
+                  indices of the sets of features to extract.
+    :type batch: list[(str, tuple[int])]
+    :param split_records: The records of the split.
+    :type split_records: dict[str, list[(str, callable)]]
+    :return: The first record of each audio file.
+    :rtype: list[dict[str, T]]
+    """
+    return [split_records[f_stem][0][1]() for f_stem, _ in batch]
+
+
+def _get_batch_features(batch: List[Tuple[str, Tuple[int, ...]]],
+                        audio_data: List[np.ndarray],
+                        extractors: List[Dict[str, Any]]) -> List[Dict[int, np.ndarray]]:
+    """Extracts the sets of features of a batch of audio data.
+
+    The sets of features with a batched feature extraction function\
+    are extracted for all their audio data at once. For the other sets\
+    of features of an audio data, the magnitude spectrum is calculated\
+    once for all the sets of features with the same spectrum settings\
+    and a magnitude spectrum feature extraction function.
+
+    The features are cast in the process that extracts\
+    them, so that less data are sent back to the main process.
+
+    :param batch: The stems of the audio files, with the\
+                  indices of the sets of features to extract.
+    :type batch: list[(str, tuple[int])]
+    :param audio_data: The audio data.
+    :type audio_data: list[numpy.ndarray]
+    :param extractors: The feature extraction functions (`f_func`,\
+                       `batch_f_func`, and `spectrum_f_func`), the\
+                       `settings_process`, and the `features_dtype`\
+                       (e.g. `float32`, or None for keeping the data\
+                       type of the feature extraction function) of\
+                       each set of features.
+    :type extractors: list[dict[str, T]]
+    :return: The features of each set of features of each audio data.
+    :rtype: list[dict[int, numpy.ndarray]]
+    """
+    batch_features = [{} for _ in audio_data]
+
+    for i_set, extractor in enumerate(extractors):
+        if extractor['batch_f_func'] is None:
+            continue
+
+        items = [i_item for i_item, (_, sets) in enumerate(batch) if i_set in sets]
+        if len(items) > 0:
+            for i_item, features in zip(items, extractor['batch_f_func'](
+                    [audio_data[i_item] for i_item in items],
+                    **extractor['settings_process'])):
+                batch_features[i_item][i_set] = features
+
+    for (_, sets), i_audio_data, features in zip(batch, audio_data, batch_features):
+        spectra = {}
+
+        for i_set in sets:
+            if i_set in features:
+                continue
+
+            extractor = extractors[i_set]
+            if extractor['spectrum_f_func'] is None:
+                features[i_set] = extractor['f_func'](
+                    i_audio_data, **extractor['settings_process'])
+                continue
+
+            spectrum_settings = get_spectrum_settings(extractor['settings_process'])
+            if spectrum_settings not in spectra:
+                spectra[spectrum_settings] = magnitude_spectrum(
+                    i_audio_data, **dict(spectrum_settings))
+            features[i_set] = extractor['spectrum_f_func'](
+                spectra[spectrum_settings], **extractor['settings_process'])
+
+    return [{i_set: np.asarray(i_features, dtype=extractors[i_set]['features_dtype'])
+             for i_set, i_features in features.items()}
+            for features in batch_features]
+
+
+def _dump_batch_features(batch: List[Tuple[str, Tuple[int, ...]]],
+                         first_records: List[Dict[str, Any]],
+                         batch_features: List[Dict[int, np.ndarray]],
+                         async_writer: AsyncWriter,
+                         **kwargs: Any) -> None:
+    """Saves the features and the caption data of the records\
+    of a batch of audio files, with an asynchronous writer.
+
+    :param batch: The stems of the audio files, with the\
+                  indices of the sets of features to extract.
+    :type batch: list[(str, tuple[int])]
+    :param first_records: The loaded first record of each audio file.
+    :type first_records: list[dict[str, T]]
+    :param batch_features: The features of each set of features\
+                           of each audio file.
+    :type batch_features: list[dict[int, numpy.ndarray]]
+    :param async_writer: The asynchronous writer.
+    :type async_writer: tools.async_writer.AsyncWriter
+    :param kwargs: The other arguments of `_dump_audio_file_features`.
+    :type kwargs: T
+    """
+    for (f_stem, _), first_record, features in zip(
+            batch, first_records, batch_features):
+        async_writer.submit(_dump_audio_file_features, f_stem, first_record,
+                            features, **kwargs)
+
+
+def _dump_audio_file_features(f_stem: str, first_record: Dict[str, Any],
+                              features: Dict[int, np.ndarray],
+                              split_records: MutableMapping[str, List[Tuple[str, Callable]]],
+                              outputs: List[Optional[Dict[str, Any]]],
+                              keep_raw_audio_data: bool) -> None:
+    """Saves the features and the caption data of the records\
+    of an audio file, for each set of features.
+
+    The records are loaded once for all the sets of features.
+
+    :param f_stem: The stem of the audio file.
+    :type f_stem: str
+    :param first_record: The loaded first record of the audio file.
+    :type first_record: dict[str, T]
+    :param features: The features of the audio file, for the index\
+                     of each set of features.
+    :type features: dict[int, numpy.ndarray]
+    :param split_records: The records of the split.
+    :type split_records: dict[str, list[(str, callable)]]
+    :param outputs: The output of each set of features (see\
+                    `_get_split_output`).
+    :type outputs: list[dict[str, T]|None]
+    :param keep_raw_audio_data: Keep the audio data?
+    :type keep_raw_audio_data: bool
+    """
+    records = split_records[f_stem]
+    packed_indices = {i_set: {} for i_set in features.keys()}
+
+    for i_record, (record_name, load_record) in enumerate(records):
+
+        # Load the record.
+        record = first_record if i_record == 0 else load_record()
+
+        for i_set, set_features in features.items():
+            output = outputs[i_set]
+
+            if output['packed_writer'] is None:
+                _dump_features_record(
+                    record=record, features=set_features,
+                    file_path=output['dir_output_split'].joinpath(record_name),
+                    keep_raw_audio_data=keep_raw_audio_data,
+                    compression=output['compression'])
+                location = {'path': record_name}
+            else:
+                record_index = _dump_features_record_packed(
+                    record=record, features=set_features,
+                    packed_writer=output['packed_writer'],
+                    packed_indices=packed_indices[i_set],
+                    keep_raw_audio_data=keep_raw_audio_data,
+                    compression=output['compression'])
+                location = {'shard': output['packed_writer'].shard_file_name,
+                            'record_index': record_index}
+
+            output['split_index'].add(
+                file_name=record['file_name'], caption_ind=int(record['caption_ind']),
+                nb_frames=set_features.shape[0], nb_words=len(record['words_ind']),
+                nb_chars=len(record['chars_ind']), **location)
+
+    # The manifests of the `packed` and `sharded` output
+    # formats are updated for the whole split.
+    for i_set in features.keys():
+        output = outputs[i_set]
+        if output['is_npy'] and output['features_manifest'] is not None and \
+                output['signatures'].get(f_stem) is not None:
+            output['features_manifest'].update(
+                '{}/{}'.format(output['dir_output_split'].name, f_stem),
+                signature=output['signatures'][f_stem],
+                outputs=[output['dir_output_split'].joinpath(record_name)
+                         for record_name, _ in records])
+
+
+def _dump_features_record(record: MutableMapping[str, Any],
+                          features: np.ndarray, file_path: Path,
+                          keep_raw_audio_data: bool,
+                          compression: Optional[Dict[str, Any]] = None) -> None:
+    """Saves the features and the caption data of a record as numpy object.
+
+    A compressed numpy object is loaded with tools.file_io.load_numpy_object.
+
+    :param record: The record.
+    :type record: dict[str, T]
+    :param features: The features of the audio data of the record.
+    :type features: numpy.ndarray
+    :param file_path: The file path for the numpy object.
+    :type file_path: pathlib.Path
+    :param keep_raw_audio_data: Keep the audio data?
+    :type keep_raw_audio_data: bool
+    :param compression: The `codec`, `level`, and `block_size` for\
+                        compressing the numpy object, or None for\
+                        no compression.
+    :type compression: dict[str, T]|None
+    """
+    # Populate the recarray data and dtypes.
+    array_data = (record['file_name'], )
+    dtypes = [('file_name', 'U{}'.format(len(record['file_name'])))]
+
+    # Check if we keeping the raw audio data.
+    if keep_raw_audio_data:
+        # And add them to the recarray data and dtypes.
+        array_data += (np.array(record['audio_data']), )
+        dtypes.append(('audio_data', np.dtype(object)))
+
+    # Add the rest to the recarray.
+    array_data += (
+        features,
+        record['caption'],
+        record['caption_ind'],
+        np.array(record['words_ind']),
+        np.array(record['chars_ind']))
+    dtypes.extend([
+        ('features', np.dtype(object)),
+        ('caption', 'U{}'.format(len(record['caption']))),
+        ('caption_ind', 'i4'),
+        ('words_ind', np.dtype(object)),
+        ('chars_ind', np.dtype(object))
+    ])
+
+    # Make the recarray
+    np_rec_array = np.rec.array([array_data], dtype=dtypes)
+
+    # Dump it.
+    if compression is None:
         dump_numpy_object(np_rec_array, str(file_path))
+    else:
+        dump_compressed_numpy_object(np_rec_array, file_path, **compression)
+
+
+def _dump_features_record_packed(record: MutableMapping[str, Any],
+                                 features: np.ndarray,
+                                 packed_writer: Union[PackedArraysWriter,
+                                                      ShardedArraysWriter],
+                                 packed_indices: MutableMapping[str, int],
+                                 keep_raw_audio_data: bool,
+                                 compression: Optional[Dict[str, Any]] = None) -> int:
+    """Adds the features and the caption data of a record to packed arrays.
+
+    The features (and audio data) are added once for all the records\
+    of the same audio file, using the `packed_indices`.
+
+    :param record: The record.
+    :type record: dict[str, T]
+    :param features: The features of the audio data of the record.
+    :type features: numpy.ndarray
+    :param packed_writer: The writer of the packed arrays.
+    :type packed_writer: tools.packed_arrays.PackedArraysWriter|\
+                         tools.packed_arrays.ShardedArraysWriter
+    :param packed_indices: Indices of the features (and audio data)\
+                           of the audio file at the packed arrays.
+    :type packed_indices: dict[str, int]
+    :param keep_raw_audio_data: Keep the audio data?
+    :type keep_raw_audio_data: bool
+    :param compression: The `codec`, `level`, and `block_size` for\
+                        compressing the features and audio data, or\
+                        None for no compression.
+    :type compression: dict[str, T]|None
+    :return: Index of the record at the packed arrays (or at the shard).
+    :rtype: int
+    """
+    if 'features_index' not in packed_indices:
+        packed_writer.start_entry()
+        packed_indices['features_index'] = packed_writer.append_item(
+            'features', features, compression=compression)
+        if keep_raw_audio_data:
+            packed_indices['audio_data_index'] = packed_writer.append_item(
+                'audio_data', record['audio_data'], compression=compression)
+
+    return packed_writer.append_record(
+        file_name=record['file_name'],
+        caption=record['caption'],
+        caption_ind=record['caption_ind'],
+        words_ind_index=packed_writer.append_item(
+            'words_ind', record['words_ind'], dtype=np.int32),
+        chars_ind_index=packed_writer.append_item(
+            'chars_ind', record['chars_ind'], dtype=np.int32),
+        **packed_indices)
 
 
 def main():
@@ -127,9 +774,15 @@ def main():
         main_logger.info('Verbose if off. Not logging messages')
         logger.disable('__main__')
         logger.disable('processes')
+        logger.disable('tools.instrumentation')
 
     main_logger.info(datetime.now().strftime('%Y-%m-%d %H:%M'))
 
+    # Get the directory for the profiling files of this run.
+    dir_profile = Path(args.profile_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    if args.profile and args.cprofile:
+        enable_cprofile(dir_profile)
+
     # Load settings file.
     main_logger.info('Loading settings')
     settings_dataset = load_settings_file(args.config_file_dataset)
@@ -138,10 +791,15 @@ def main():
 
     # Create the dataset.
     main_logger.info('Starting feature extraction')
-    extract_features(settings_data=settings_dataset,
-                     settings_features=settings_features)
+    with measure_stage('extract_features'):
+        extract_features(settings_data=settings_dataset,
+                         settings_features=settings_features)
     main_logger.info('Features extracted')
 
+    if args.profile:
+        dump_report(dir_profile.joinpath('report.json'))
+        main_logger.info('Profiling report saved at {}'.format(dir_profile))
+
 
 if __name__ == '__main__':
     main()
@@ -4,9 +4,11 @@
 import numpy as np
 from librosa.feature import melspectrogram
 
+from processes.spectrum import magnitude_spectrum
+
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
-__all__ = ['feature_extraction']
+__all__ = ['feature_extraction', 'spectrum_feature_extraction']
 
 
 def feature_extraction(audio_data: np.ndarray, sr: int, nb_fft: int,
@@ -42,10 +44,52 @@ def feature_extraction(audio_data: np.ndarray, sr: int, nb_fft: int,
     :return: Log mel-bands energies of shape=(t, nb_mels)
     :rtype: numpy.ndarray
     """
-    y = audio_data/abs(audio_data).max()
+    spectrum = magnitude_spectrum(
+        audio_data, nb_fft=nb_fft, hop_size=hop_size,
+        window_function=window_function, center=center)
+
+    return spectrum_feature_extraction(
+        spectrum, sr=sr, nb_fft=nb_fft, hop_size=hop_size, nb_mels=nb_mels,
+        f_min=f_min, f_max=f_max, htk=htk, power=power, norm=norm,
+        window_function=window_function, center=center)
+
+
+def spectrum_feature_extraction(spectrum: np.ndarray, sr: int, nb_fft: int,
+                                hop_size: int, nb_mels: int, f_min: float,
+                                f_max: float, htk: bool, power: float, norm: bool,
+                                window_function: str, center: bool) -> np.ndarray:
+    """Feature extraction function, from the magnitude spectrum\
+    (see processes.spectrum.magnitude_spectrum).
+
+    :param spectrum: Magnitude spectrum of shape=(nb_fft//2 + 1, t).
+    :type spectrum: numpy.ndarray
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param power: Power of the magnitude.
+    :type power: float
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :return: Log mel-bands energies of shape=(t, nb_mels)
+    :rtype: numpy.ndarray
+    """
     mel_bands = melspectrogram(
-        y=y, sr=sr, n_fft=nb_fft, hop_length=hop_size, win_length=nb_fft,
-        window=window_function, center=center, power=power, n_mels=nb_mels,
+        S=spectrum ** power, sr=sr, n_fft=nb_fft, n_mels=nb_mels,
         fmin=f_min, fmax=f_max, htk=htk, norm=norm).T
 
     return np.log(mel_bands + np.finfo(float).eps)
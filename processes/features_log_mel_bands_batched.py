@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import List
+
+import numpy as np
+
+from processes.spectrum import get_mel_basis, get_window, get_pad_mode, get_frames
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['feature_extraction', 'batch_feature_extraction']
+
+# Maximum ratio of padding to audio samples at a group of clips.
+_MAX_PADDING_RATIO = .25
+
+
+def feature_extraction(audio_data: np.ndarray, sr: int, nb_fft: int,
+                       hop_size: int, nb_mels: int, f_min: float,
+                       f_max: float, htk: bool, power: float, norm: bool,
+                       window_function: str, center: bool) -> np.ndarray:
+    """Feature extraction function, for one audio signal.
+
+    Same as the `feature_extraction` of the `features_log_mel_bands`\
+    module, but with the batched implementation.
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param power: Power of the magnitude.
+    :type power: float
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :return: Log mel-bands energies of shape=(t, nb_mels)
+    :rtype: numpy.ndarray
+    """
+    return batch_feature_extraction(
+        [audio_data], sr=sr, nb_fft=nb_fft, hop_size=hop_size,
+        nb_mels=nb_mels, f_min=f_min, f_max=f_max, htk=htk, power=power,
+        norm=norm, window_function=window_function, center=center)[0]
+
+
+def batch_feature_extraction(audio_data: List[np.ndarray], sr: int,
+                             nb_fft: int, hop_size: int, nb_mels: int,
+                             f_min: float, f_max: float, htk: bool,
+                             power: float, norm: bool, window_function: str,
+                             center: bool) -> List[np.ndarray]:
+    """Feature extraction function, for a batch of audio signals.
+
+    The MEL filterbank and the window are created once for each\
+    set of settings. The audio signals are grouped by length,\
+    zero padded to the longest signal of their group, and the\
+    STFT, MEL bands, and logarithm are calculated for each group\
+    at once.
+
+    When centered, each signal is padded as by the STFT of the\
+    installed librosa (i.e. with its default padding mode, `reflect`\
+    for librosa 0.7 and `constant` since librosa 0.10) before the zero\
+    padding to the longest signal, which does not change the frames\
+    of the signal. Thus, the features are the same as the ones of the\
+    `features_log_mel_bands` module, up to the floating point precision\
+    (absolute difference of the log mel-bands energies less than 1e-4).
+
+    :param audio_data: Audio signals.
+    :type audio_data: list[numpy.ndarray]
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param power: Power of the magnitude.
+    :type power: float
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :return: Log mel-bands energies of shape=(t, nb_mels), for each\
+             audio signal.
+    :rtype: list[numpy.ndarray]
+    """
+    mel_basis = get_mel_basis(sr=sr, nb_fft=nb_fft, nb_mels=nb_mels,
+                              f_min=f_min, f_max=f_max, htk=htk, norm=norm)
+    window = get_window(window_function=window_function, nb_fft=nb_fft)
+
+    features = [np.empty(0)] * len(audio_data)
+
+    for group in _group_by_length([len(y) for y in audio_data]):
+        group_features = _get_log_mel_bands(
+            [audio_data[i] for i in group], mel_basis=mel_basis,
+            window=window, hop_size=hop_size, power=power, center=center)
+
+        for i, i_features in zip(group, group_features):
+            features[i] = i_features
+
+    return features
+
+
+def _get_log_mel_bands(audio_data: List[np.ndarray], mel_basis: np.ndarray,
+                       window: np.ndarray, hop_size: int, power: float,
+                       center: bool) -> List[np.ndarray]:
+    """Calculates the log mel-bands energies of a group of audio signals.
+
+    :param audio_data: Audio signals.
+    :type audio_data: list[numpy.ndarray]
+    :param mel_basis: MEL filterbank, of shape=(nb_mels, nb_fft//2 + 1).
+    :type mel_basis: numpy.ndarray
+    :param window: Window, of shape=(nb_fft, ).
+    :type window: numpy.ndarray
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param power: Power of the magnitude.
+    :type power: float
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :return: Log mel-bands energies of shape=(t, nb_mels), for each\
+             audio signal.
+    :rtype: list[numpy.ndarray]
+    """
+    nb_fft = len(window)
+    pad = nb_fft // 2 if center else 0
+    dtype = np.result_type(*[y.dtype for y in audio_data], np.float32)
+
+    nb_frames = [1 + (len(y) + 2 * pad - nb_fft) // hop_size for y in audio_data]
+    batch = np.zeros((len(audio_data), max(len(y) for y in audio_data) + 2 * pad),
+                     dtype=dtype)
+
+    pad_mode = get_pad_mode()
+    for i, y in enumerate(audio_data):
+        batch[i, :len(y) + 2 * pad] = np.pad(y / abs(y).max(), pad, mode=pad_mode)
+
+    # Frames of shape=(batch, t, nb_fft).
+    frames = get_frames(batch, nb_fft=nb_fft, hop_size=hop_size, nb_frames=max(nb_frames))
+    spectrum = np.abs(np.fft.rfft(frames * window.astype(dtype), axis=-1))
+    if power != 1:
+        spectrum **= power
+
+    mel_bands = np.matmul(spectrum.astype(dtype, copy=False), mel_basis.T.astype(dtype))
+
+    return [np.log(i_mel_bands[:i_nb_frames] + np.finfo(float).eps)
+            for i_mel_bands, i_nb_frames in zip(mel_bands, nb_frames)]
+
+
+def _group_by_length(lengths: List[int]) -> List[List[int]]:
+    """Groups the indices of signals with similar length.
+
+    The signals are sorted by length and each group is extended\
+    for as long as the padding to the longest signal of the group\
+    is less than `_MAX_PADDING_RATIO` of the samples of the group.
+
+    :param lengths: The lengths of the signals.
+    :type lengths: list[int]
+    :return: The groups of indices.
+    :rtype: list[list[int]]
+    """
+    groups = []
+    group = []
+    group_samples = 0
+
+    for i in sorted(range(len(lengths)), key=lambda x: lengths[x]):
+        padded_samples = (len(group) + 1) * lengths[i]
+        if len(group) > 0 and \
+                padded_samples > (1 + _MAX_PADDING_RATIO) * (group_samples + lengths[i]):
+            groups.append(group)
+            group = []
+            group_samples = 0
+
+        group.append(i)
+        group_samples += lengths[i]
+
+    if len(group) > 0:
+        groups.append(group)
+
+    return groups
+
+# EOF
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Iterator, Tuple
+
+import numpy as np
+
+from processes.spectrum import get_mel_basis, get_window, get_pad_mode, get_frames
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['feature_extraction']
+
+# Default amount of audio samples that are processed at once.
+_BLOCK_SIZE = 2 ** 20
+
+
+def feature_extraction(audio_data: np.ndarray, sr: int, nb_fft: int,
+                       hop_size: int, nb_mels: int, f_min: float,
+                       f_max: float, htk: bool, power: float, norm: bool,
+                       window_function: str, center: bool,
+                       block_size: Optional[int] = _BLOCK_SIZE) -> np.ndarray:
+    """Feature extraction function, processing the audio signal in blocks.
+
+    The audio signal is read in blocks of (about) `block_size` samples,\
+    twice: once for finding its peak (for the normalization), and once\
+    for calculating the STFT and MEL bands of the frames of each block.\
+    Each block is extended by the overlap of its last frame with the\
+    next block and, when centered, the blocks at the start and the end\
+    of the signal are padded as by the STFT of the installed librosa\
+    (see processes.spectrum.get_pad_mode). Thus, apart from the features, the memory for the calculation\
+    depends on the `block_size` and not on the length of the signal,\
+    and the audio signal can be memory-mapped (e.g. the shared audio\
+    data or the `packed` and `sharded` formats) and never fully loaded.
+
+    The features are the same as the ones of the `features_log_mel_bands`\
+    module, up to the floating point precision (absolute difference of\
+    the log mel-bands energies less than 1e-4).
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param power: Power of the magnitude.
+    :type power: float
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :param block_size: Amount of audio samples processed at once.
+    :type block_size: int
+    :return: Log mel-bands energies of shape=(t, nb_mels)
+    :rtype: numpy.ndarray
+    """
+    mel_basis = get_mel_basis(sr=sr, nb_fft=nb_fft, nb_mels=nb_mels,
+                              f_min=f_min, f_max=f_max, htk=htk, norm=norm)
+    window = get_window(window_function=window_function, nb_fft=nb_fft)
+
+    dtype = np.result_type(audio_data.dtype, np.float32)
+    window = window.astype(dtype)
+    mel_basis_t = mel_basis.T.astype(dtype)
+
+    pad = nb_fft // 2 if center else 0
+    nb_frames = max(1 + (len(audio_data) + 2 * pad - nb_fft) // hop_size, 0)
+
+    # The features have the data type of the features of the other
+    # modules, so that the logarithm is calculated in place.
+    peak = _get_peak(audio_data, block_size=int(block_size))
+    mel_bands = np.empty((nb_frames, len(mel_basis)),
+                         dtype=np.result_type(dtype, np.finfo(float).eps))
+
+    for frame_start, frame_end, block in _iter_blocks(
+            audio_data, nb_frames=nb_frames, nb_fft=nb_fft, hop_size=hop_size,
+            pad=pad, frames_per_block=max(int(block_size) // hop_size, 1), dtype=dtype):
+        block /= peak
+
+        # Frames of shape=(t, nb_fft).
+        frames = get_frames(block, nb_fft=nb_fft, hop_size=hop_size,
+                            nb_frames=frame_end - frame_start)
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=-1))
+        if power != 1:
+            spectrum **= power
+
+        np.matmul(spectrum.astype(dtype, copy=False), mel_basis_t,
+                  out=mel_bands[frame_start:frame_end])
+
+    mel_bands += np.finfo(float).eps
+    return np.log(mel_bands, out=mel_bands)
+
+
+def _get_peak(audio_data: np.ndarray, block_size: int) -> np.ndarray:
+    """Returns the maximum absolute value of an audio signal,\
+    reading the signal in blocks.
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param block_size: Amount of audio samples read at once.
+    :type block_size: int
+    :return: The maximum absolute value.
+    :rtype: numpy.ndarray
+    """
+    return max(abs(audio_data[i:i + block_size]).max()
+               for i in range(0, len(audio_data), block_size))
+
+
+def _iter_blocks(audio_data: np.ndarray, nb_frames: int, nb_fft: int,
+                 hop_size: int, pad: int, frames_per_block: int,
+                 dtype: np.dtype) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """Returns the blocks of an audio signal with the samples of\
+    `frames_per_block` frames, i.e. with the overlap of the frames\
+    of consecutive blocks and with the padding at the edges.
+
+    The padding at each edge is calculated once, from the samples\
+    at the edge (see `_get_edges_padding`).
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param nb_frames: Amount of frames of the signal.
+    :type nb_frames: int
+    :param nb_fft: Amount of FFT points (i.e. samples of a frame).
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param pad: Amount of padding samples before and after the signal.
+    :type pad: int
+    :param frames_per_block: Amount of frames of a block.
+    :type frames_per_block: int
+    :param dtype: Data type of the blocks.
+    :type dtype: numpy.dtype
+    :return: The first frame, the frame after the last frame, and\
+             the samples (a copy) of each block.
+    :rtype: iterator[(int, int, numpy.ndarray)]
+    """
+    nb_samples = len(audio_data)
+    padding_start, padding_end = _get_edges_padding(audio_data, pad=pad)
+
+    # The parts of the padded signal, with their first sample.
+    parts = [(-pad, padding_start), (0, audio_data), (nb_samples, padding_end)]
+
+    for frame_start in range(0, nb_frames, frames_per_block):
+        frame_end = min(frame_start + frames_per_block, nb_frames)
+
+        # Samples of the frames, with negative indices
+        # and indices after the signal for the padding.
+        start = frame_start * hop_size - pad
+        end = (frame_end - 1) * hop_size + nb_fft - pad
+
+        block = np.zeros(end - start, dtype=dtype)
+        for part_start, part in parts:
+            block_start = max(start, part_start)
+            block_end = min(end, part_start + len(part))
+            if block_start < block_end:
+                block[block_start - start:block_end - start] = \
+                    part[block_start - part_start:block_end - part_start]
+
+        yield frame_start, frame_end, block
+
+
+def _get_edges_padding(audio_data: np.ndarray, pad: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the padding before and after an audio signal, as\
+    by the STFT of the installed librosa.
+
+    The padding modes of librosa (`reflect` and `constant`) use only\
+    the `pad + 1` samples at each edge, thus only these are read.
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param pad: Amount of padding samples before and after the signal.
+    :type pad: int
+    :return: The padding before and the padding after the signal.
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    if pad == 0:
+        return np.empty(0, dtype=audio_data.dtype), np.empty(0, dtype=audio_data.dtype)
+
+    pad_mode = get_pad_mode()
+    return (np.pad(audio_data[:pad + 1], (pad, 0), mode=pad_mode)[:pad],
+            np.pad(audio_data[-(pad + 1):], (0, pad), mode=pad_mode)[-pad:])
+
+# EOF
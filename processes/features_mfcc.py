@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional
+
+import numpy as np
+from librosa import power_to_db
+from librosa.feature import melspectrogram, mfcc
+
+from processes.spectrum import magnitude_spectrum
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['feature_extraction', 'spectrum_feature_extraction']
+
+
+def feature_extraction(audio_data: np.ndarray, sr: int, nb_fft: int,
+                       hop_size: int, nb_mels: int, nb_mfcc: int,
+                       f_min: float, f_max: float, htk: bool, norm: bool,
+                       window_function: str, center: bool,
+                       dct_type: Optional[int] = 2,
+                       lifter: Optional[float] = 0) -> np.ndarray:
+    """Feature extraction function, for MFCCs.
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param nb_mfcc: Amount of MFCCs.
+    :type nb_mfcc: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :param dct_type: Type of the discrete cosine transform.
+    :type dct_type: int
+    :param lifter: Liftering coefficient (0 for no liftering).
+    :type lifter: float
+    :return: MFCCs of shape=(t, nb_mfcc)
+    :rtype: numpy.ndarray
+    """
+    spectrum = magnitude_spectrum(
+        audio_data, nb_fft=nb_fft, hop_size=hop_size,
+        window_function=window_function, center=center)
+
+    return spectrum_feature_extraction(
+        spectrum, sr=sr, nb_fft=nb_fft, hop_size=hop_size, nb_mels=nb_mels,
+        nb_mfcc=nb_mfcc, f_min=f_min, f_max=f_max, htk=htk, norm=norm,
+        window_function=window_function, center=center,
+        dct_type=dct_type, lifter=lifter)
+
+
+def spectrum_feature_extraction(spectrum: np.ndarray, sr: int, nb_fft: int,
+                                hop_size: int, nb_mels: int, nb_mfcc: int,
+                                f_min: float, f_max: float, htk: bool, norm: bool,
+                                window_function: str, center: bool,
+                                dct_type: Optional[int] = 2,
+                                lifter: Optional[float] = 0) -> np.ndarray:
+    """Feature extraction function for MFCCs, from the magnitude\
+    spectrum (see processes.spectrum.magnitude_spectrum).
+
+    The MFCCs are calculated from the MEL bands of the power\
+    spectrum, in decibels, as the MFCCs of librosa.
+
+    :param spectrum: Magnitude spectrum of shape=(nb_fft//2 + 1, t).
+    :type spectrum: numpy.ndarray
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param nb_mfcc: Amount of MFCCs.
+    :type nb_mfcc: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :param dct_type: Type of the discrete cosine transform.
+    :type dct_type: int
+    :param lifter: Liftering coefficient (0 for no liftering).
+    :type lifter: float
+    :return: MFCCs of shape=(t, nb_mfcc)
+    :rtype: numpy.ndarray
+    """
+    mel_bands = melspectrogram(
+        S=spectrum ** 2, sr=sr, n_fft=nb_fft, n_mels=nb_mels,
+        fmin=f_min, fmax=f_max, htk=htk, norm=norm)
+
+    return mfcc(S=power_to_db(mel_bands), n_mfcc=nb_mfcc,
+                dct_type=dct_type, lifter=lifter).T
+
+# EOF
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import MutableMapping, Optional, Tuple, Any
+from functools import lru_cache
+from inspect import signature
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['magnitude_spectrum', 'get_spectrum_settings', 'get_mel_basis',
+           'get_window', 'get_pad_mode', 'get_frames']
+
+# Settings of the feature extraction that define the magnitude spectrum.
+_SPECTRUM_SETTINGS = ('nb_fft', 'hop_size', 'window_function', 'center')
+
+
+def magnitude_spectrum(audio_data: np.ndarray, nb_fft: int, hop_size: int,
+                       window_function: str, center: bool) -> np.ndarray:
+    """Returns the magnitude of the STFT of the peak normalized audio signal.
+
+    Feature extraction modules with a `spectrum_feature_extraction`\
+    function extract the features from this magnitude spectrum, thus\
+    it can be calculated once for many sets of features.
+
+    :param audio_data: Audio signal.
+    :type audio_data: numpy.ndarray
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param window_function: Window function.
+    :type window_function: str
+    :param center: Center the frame for FFT.
+    :type center: bool
+    :return: Magnitude spectrum of shape=(nb_fft//2 + 1, t).
+    :rtype: numpy.ndarray
+    """
+    from librosa import stft
+
+    y = audio_data/abs(audio_data).max()
+    return np.abs(stft(y=y, n_fft=nb_fft, hop_length=hop_size, win_length=nb_fft,
+                       window=window_function, center=center))
+
+
+def get_spectrum_settings(settings_process: MutableMapping[str, Any]) -> \
+        Tuple[Tuple[str, Any], ...]:
+    """Returns the settings of the magnitude spectrum, from the\
+    settings of a feature extraction.
+
+    Feature extractions with the same settings of the magnitude\
+    spectrum can use the same magnitude spectrum.
+
+    :param settings_process: Settings for the feature extraction.
+    :type settings_process: dict
+    :return: The settings of the magnitude spectrum, as pairs of\
+             name and value (i.e. hashable).
+    :rtype: tuple[(str, T)]
+    """
+    return tuple((name, settings_process[name]) for name in _SPECTRUM_SETTINGS)
+
+
+@lru_cache(maxsize=8)
+def get_mel_basis(sr: int, nb_fft: int, nb_mels: int, f_min: float,
+                  f_max: Optional[float], htk: bool, norm: bool) -> np.ndarray:
+    """Returns the MEL filterbank, created once for each set of settings.
+
+    :param sr: Sampling frequency.
+    :type sr: int
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :param nb_mels: Amount of MEL bands.
+    :type nb_mels: int
+    :param f_min: Minimum frequency in Hertz for MEL band calculation.
+    :type f_min: float
+    :param f_max: Maximum frequency in Hertz for MEL band calculation.
+    :type f_max: float|None
+    :param htk: Use the HTK Toolbox formula instead of Auditory toolkit.
+    :type htk: bool
+    :param norm: Area normalization of MEL filters.
+    :type norm: bool
+    :return: MEL filterbank, of shape=(nb_mels, nb_fft//2 + 1).
+    :rtype: numpy.ndarray
+    """
+    from librosa import filters
+
+    return filters.mel(sr=sr, n_fft=nb_fft, n_mels=nb_mels, fmin=f_min,
+                       fmax=f_max, htk=htk, norm=norm)
+
+
+@lru_cache(maxsize=8)
+def get_window(window_function: str, nb_fft: int) -> np.ndarray:
+    """Returns the window, created once for each set of settings.
+
+    :param window_function: Window function.
+    :type window_function: str
+    :param nb_fft: Amount of FFT points.
+    :type nb_fft: int
+    :return: Window, of shape=(nb_fft, ).
+    :rtype: numpy.ndarray
+    """
+    from librosa import filters
+
+    return filters.get_window(window_function, nb_fft, fftbins=True)
+
+
+@lru_cache(maxsize=1)
+def get_pad_mode() -> str:
+    """Returns the padding mode of the centered frames of the\
+    STFT of the installed librosa (i.e. its default `pad_mode`,\
+    `reflect` for librosa 0.7 and `constant` since librosa 0.10).
+
+    :return: The padding mode.
+    :rtype: str
+    """
+    from librosa import stft
+
+    return signature(stft).parameters['pad_mode'].default
+
+
+def get_frames(signals: np.ndarray, nb_fft: int, hop_size: int,
+               nb_frames: int) -> np.ndarray:
+    """Returns the frames of signals, as a read-only view.
+
+    :param signals: The (padded) signals, of shape=(..., nb_samples).
+    :type signals: numpy.ndarray
+    :param nb_fft: Amount of FFT points (i.e. samples of a frame).
+    :type nb_fft: int
+    :param hop_size: Hop size in samples.
+    :type hop_size: int
+    :param nb_frames: Amount of frames, at most\
+                      1 + (nb_samples - nb_fft) // hop_size.
+    :type nb_frames: int
+    :return: The frames, of shape=(..., nb_frames, nb_fft).
+    :rtype: numpy.ndarray
+    """
+    return as_strided(
+        signals, shape=signals.shape[:-1] + (nb_frames, nb_fft),
+        strides=signals.strides[:-1] + (hop_size * signals.strides[-1], signals.strides[-1]),
+        writeable=False)
+
+# EOF
@@ -1,20 +1,27 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import tools.argument_parsing
-import tools.aux_functions
-import tools.captions_functions
-import tools.csv_functions
-import tools.file_io
-import tools.yaml_loader
+from importlib import import_module
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
 __all__ = [
-    'argument_parsing', 'aux_functions',
-    'captions_functions', 'csv_functions',
-    'file_io', 'yaml_loader'
+    'annotations_table', 'argument_parsing', 'async_writer', 'audio_cache',
+    'aux_functions', 'build_manifest',
+    'captions_functions', 'compression', 'csv_functions',
+    'file_io', 'instrumentation', 'packed_arrays', 'split_index', 'vocabulary',
+    'yaml_loader'
 ]
 
 
+def __getattr__(name):
+    """Imports the modules of the package when they are first used,\
+    so that importing a module does not import all the others.
+    """
+    if name in __all__:
+        return import_module('.{}'.format(name), __name__)
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
 # EOF
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Callable, Sequence, List, Dict, \
+    Tuple, Iterator, Union
+from pathlib import Path
+from itertools import chain
+import csv
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['AnnotationsTable', 'AnnotationsRow']
+
+
+class AnnotationsRow(object):
+    """One row (i.e. audio file) of an annotations table.
+
+    Offers read access by column name, like the rows of\
+    `csv.DictReader`, but keeps only the values of the row.
+    """
+
+    __slots__ = ['file_name', 'captions', 'columns']
+
+    def __init__(self, file_name: str, captions: Tuple[str, ...],
+                 columns: Tuple[str, ...]) -> None:
+        """One row of an annotations table.
+
+        :param file_name: The file name of the audio file.
+        :type file_name: str
+        :param captions: The captions of the audio file.
+        :type captions: tuple[str]
+        :param columns: The names of the columns (i.e. of the\
+                        file name column and of the captions columns).
+        :type columns: tuple[str]
+        """
+        self.file_name = file_name
+        self.captions = captions
+        self.columns = columns
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.columns
+
+    def get(self, column: str, default: Optional[str] = None) -> Optional[str]:
+        try:
+            return self[column]
+        except KeyError:
+            return default
+
+    def __getitem__(self, column: str) -> str:
+        if column == self.columns[0]:
+            return self.file_name
+        try:
+            return self.captions[self.columns.index(column, 1) - 1]
+        except ValueError:
+            raise KeyError(column)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+class AnnotationsTable(object):
+    """Columnar table of annotations, i.e. a file name column\
+    and the captions columns, with a file name to row mapping.
+
+    Each column is kept as a list of strings, thus there is\
+    no dictionary for each row. The rows are created when\
+    they are accessed.
+    """
+
+    def __init__(self, file_names: Sequence[str],
+                 captions: Sequence[Sequence[str]],
+                 file_name_column: str,
+                 captions_columns: Sequence[str]) -> None:
+        """Columnar table of annotations.
+
+        :param file_names: The file names of the audio files.
+        :type file_names: list[str]
+        :param captions: The captions, one list for each captions column.
+        :type captions: list[list[str]]
+        :param file_name_column: The name of the file name column.
+        :type file_name_column: str
+        :param captions_columns: The names of the captions columns.
+        :type captions_columns: list[str]
+        """
+        if len(captions) != len(captions_columns):
+            raise ValueError('Amount of captions columns and of their names differ.')
+
+        if any(len(column) != len(file_names) for column in captions):
+            raise ValueError('Columns of an annotations table must have the same length.')
+
+        self._file_names: List[str] = list(file_names)
+        self._captions: List[List[str]] = [list(column) for column in captions]
+        self._columns: Tuple[str, ...] = (file_name_column, ) + tuple(captions_columns)
+        self._rows: Dict[str, int] = {
+            file_name: row for row, file_name in enumerate(self._file_names)}
+
+    @classmethod
+    def from_csv_file(cls, file_path: Union[str, Path], file_name_column: str,
+                      captions_columns: Sequence[str]) -> 'AnnotationsTable':
+        """Reads an annotations table from a CSV file.
+
+        Only the file name column and the captions columns are\
+        kept, and the values are appended directly to the columns.
+
+        :param file_path: The path of the CSV file.
+        :type file_path: str|pathlib.Path
+        :param file_name_column: The name of the file name column.
+        :type file_name_column: str
+        :param captions_columns: The names of the captions columns.
+        :type captions_columns: list[str]
+        :return: The annotations table.
+        :rtype: tools.annotations_table.AnnotationsTable
+        """
+        with Path(file_path).open(mode='r', newline='') as csv_file:
+            csv_reader = csv.reader(csv_file)
+            header = next(csv_reader)
+
+            try:
+                columns_ind = [header.index(column)
+                               for column in chain([file_name_column], captions_columns)]
+            except ValueError as e:
+                raise KeyError('Column not found in {}: {}'.format(file_path, e))
+
+            columns = [[] for _ in columns_ind]
+            appends = [(column_ind, column.append)
+                       for column_ind, column in zip(columns_ind, columns)]
+
+            for row in csv_reader:
+                for column_ind, append in appends:
+                    append(row[column_ind])
+
+        return cls(file_names=columns[0], captions=columns[1:],
+                   file_name_column=file_name_column,
+                   captions_columns=captions_columns)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """The names of the columns.
+
+        :return: The file name column and the captions columns.
+        :rtype: tuple[str]
+        """
+        return self._columns
+
+    @property
+    def file_names(self) -> List[str]:
+        """The file names of the audio files.
+
+        :return: The file name column.
+        :rtype: list[str]
+        """
+        return self._file_names
+
+    def get_column(self, column: str) -> List[str]:
+        """Returns a column of the table.
+
+        :param column: The name of the column.
+        :type column: str
+        :return: The values of the column.
+        :rtype: list[str]
+        """
+        if column == self._columns[0]:
+            return self._file_names
+        try:
+            return self._captions[self._columns.index(column, 1) - 1]
+        except ValueError:
+            raise KeyError(column)
+
+    def index(self, file_name: str) -> int:
+        """Returns the row of an audio file.
+
+        :param file_name: The file name of the audio file.
+        :type file_name: str
+        :return: The row of the audio file.
+        :rtype: int
+        """
+        return self._rows[file_name]
+
+    def get_captions(self, row: int) -> Tuple[str, ...]:
+        """Returns the captions of a row.
+
+        :param row: The row.
+        :type row: int
+        :return: The captions, in the order of the captions columns.
+        :rtype: tuple[str]
+        """
+        return tuple(column[row] for column in self._captions)
+
+    def iter_captions(self) -> Iterator[str]:
+        """Returns all captions, row by row.
+
+        :return: The captions.
+        :rtype: iterator[str]
+        """
+        return chain.from_iterable(zip(*self._captions))
+
+    def map_captions(self, func: Callable[[str], str]) -> 'AnnotationsTable':
+        """Returns a table with a function applied to all captions.
+
+        :param func: The function.
+        :type func: callable
+        :return: The new table.
+        :rtype: tools.annotations_table.AnnotationsTable
+        """
+        return self.__class__(
+            file_names=self._file_names,
+            captions=[[func(caption) for caption in column] for column in self._captions],
+            file_name_column=self._columns[0], captions_columns=self._columns[1:])
+
+    def __getitem__(self, row: Union[int, slice]) -> \
+            Union[AnnotationsRow, List[AnnotationsRow]]:
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        return AnnotationsRow(self._file_names[row], self.get_captions(row), self._columns)
+
+    def __contains__(self, file_name: str) -> bool:
+        return file_name in self._rows
+
+    def __iter__(self) -> Iterator[AnnotationsRow]:
+        return (AnnotationsRow(file_name, captions, self._columns)
+                for file_name, captions in zip(self._file_names, zip(*self._captions)))
+
+    def __len__(self) -> int:
+        return len(self._file_names)
+
+# EOF
@@ -20,6 +20,14 @@ def get_argument_parser() -> ArgumentParser:
     arg_parser.add_argument('-f', '--config-file-features',
                             type=str, default='feature_extraction')
     arg_parser.add_argument('-v', '--verbose', action='store_true')
+    arg_parser.add_argument('-p', '--profile', action='store_true',
+                            help='Save a report with the measurements '
+                                 'of each stage.')
+    arg_parser.add_argument('--cprofile', action='store_true',
+                            help='Also save the cProfile statistics '
+                                 'of each stage (with --profile).')
+    arg_parser.add_argument('--profile-dir', type=str, default='profiling',
+                            help='Directory for the profiling files.')
 
     return arg_parser
 
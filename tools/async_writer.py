@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Callable, Any
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from threading import BoundedSemaphore, Lock
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['AsyncWriter']
+
+
+class AsyncWriter(object):
+    """Writer that saves files with a pool of I/O threads.
+
+    The writing functions are queued and called by the I/O threads,\
+    so that the caller does not wait for the disk. When the queue is\
+    full (i.e. `queue_size` pending writes), the caller waits for a\
+    write to finish. An error of a write is raised at the next call\
+    of `submit`, `flush`, or `close`.
+
+    With zero I/O threads, the writing functions are called directly.
+    """
+
+    def __init__(self, nb_threads: int, queue_size: int) -> None:
+        """Writer that saves files with a pool of I/O threads.
+
+        :param nb_threads: The amount of I/O threads.
+        :type nb_threads: int
+        :param queue_size: The maximum amount of pending writes.
+        :type queue_size: int
+        """
+        self._executor = ThreadPoolExecutor(max_workers=nb_threads) \
+            if nb_threads > 0 else None
+        self._slots = BoundedSemaphore(max(queue_size, 1))
+        self._lock = Lock()
+        self._pending = set()
+        self._error: Optional[BaseException] = None
+
+    def submit(self, write_func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queues a write.
+
+        :param write_func: The writing function.
+        :type write_func: callable
+        :param args: The positional arguments of the function.
+        :type args: T
+        :param kwargs: The keyword arguments of the function.
+        :type kwargs: T
+        """
+        self._raise_error()
+
+        if self._executor is None:
+            write_func(*args, **kwargs)
+            return
+
+        # Wait for a free place in the queue.
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(write_func, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._write_done)
+
+    def flush(self) -> None:
+        """Waits for the pending writes, and raises their errors.
+        """
+        with self._lock:
+            pending = list(self._pending)
+
+        wait(pending)
+
+        for future in pending:
+            self._set_error(future)
+
+        self._raise_error()
+
+    def close(self) -> None:
+        """Waits for the pending writes and stops the I/O threads.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'AsyncWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            # Do not mask the error of the caller. The pending writes
+            # are cancelled (outside of the lock, since cancelling
+            # calls `_write_done`).
+            with self._lock:
+                pending = list(self._pending)
+            for future in pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+
+    def _write_done(self, future: Future) -> None:
+        """Releases the place in the queue of a finished write.
+
+        :param future: The future of the write.
+        :type future: concurrent.futures.Future
+        """
+        with self._lock:
+            self._pending.discard(future)
+        self._set_error(future)
+        self._slots.release()
+
+    def _set_error(self, future: Future) -> None:
+        """Keeps the error of a finished write, if it is the first one.
+
+        :param future: The future of the write.
+        :type future: concurrent.futures.Future
+        """
+        if future.cancelled() or future.exception() is None:
+            return
+
+        with self._lock:
+            if self._error is None:
+                self._error = future.exception()
+
+    def _raise_error(self) -> None:
+        """Raises the error of a write, if any.
+        """
+        if self._error is not None:
+            raise self._error
+
+# EOF
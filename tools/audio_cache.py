@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, MutableMapping, Dict, List, Tuple, Any
+from pathlib import Path
+from hashlib import sha256
+import json
+import os
+
+import numpy as np
+
+from tools.file_io import load_audio_file
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['AudioCache', 'get_audio_cache', 'load_audio']
+
+# Audio caches of the process, by directory.
+_AUDIO_CACHES: Dict[Path, 'AudioCache'] = {}
+
+
+class AudioCache(object):
+    """On disk cache of decoded (and resampled) audio data.
+
+    The audio data are kept as float32 numpy files, one for each\
+    audio file, sampling frequency, and mono setting, and are loaded\
+    memory mapped. A file is decoded again if its modification time\
+    changes. When the size of the cache exceeds its maximum size,\
+    the least recently used audio data are removed. The size of the\
+    cache is found from the files of its directory, thus the maximum\
+    size holds for all the processes that share the cache.
+    """
+
+    def __init__(self, dir_cache: Path, max_size: int) -> None:
+        """On disk cache of decoded audio data.
+
+        :param dir_cache: The directory of the cache.
+        :type dir_cache: pathlib.Path
+        :param max_size: The maximum size of the cache, in bytes.
+        :type max_size: int
+        """
+        self.dir_cache = dir_cache
+        self.max_size = max_size
+        self.dir_cache.mkdir(parents=True, exist_ok=True)
+
+    def load(self, audio_file: Path, sr: int, mono: bool) -> np.ndarray:
+        """Loads the audio data of an audio file, from the cache if\
+        they are there, else decodes them and adds them to the cache.
+
+        :param audio_file: The path of the audio file.
+        :type audio_file: pathlib.Path
+        :param sr: The sampling frequency to be used.
+        :type sr: int
+        :param mono: Turn to mono?
+        :type mono: bool
+        :return: The audio data (float32, memory mapped).
+        :rtype: numpy.ndarray
+        """
+        cache_file = self.dir_cache.joinpath('{}.npy'.format(
+            self._get_key(audio_file, sr, mono)))
+
+        try:
+            audio_data = np.load(str(cache_file), mmap_mode='r')
+            # Mark as recently used.
+            os.utime(str(cache_file))
+            return audio_data
+        except (FileNotFoundError, ValueError):
+            pass
+
+        audio_data = load_audio_file(audio_file=str(audio_file), sr=sr, mono=mono)
+
+        # Write to a temporary file and rename, so that other
+        # processes do not read partially written data.
+        tmp_file = cache_file.with_suffix('.{}.tmp'.format(os.getpid()))
+        with tmp_file.open('wb') as f:
+            np.save(f, audio_data.astype(np.float32, copy=False))
+        os.replace(str(tmp_file), str(cache_file))
+
+        try:
+            audio_data = np.load(str(cache_file), mmap_mode='r')
+        except FileNotFoundError:
+            # Removed by another process of the cache.
+            audio_data = audio_data.astype(np.float32, copy=False)
+
+        self._evict(keep_file=cache_file)
+
+        return audio_data
+
+    def _evict(self, keep_file: Path) -> None:
+        """Removes the least recently used audio data, until\
+        the size of the cache is less than its maximum size.
+
+        :param keep_file: The file of the cache that is not removed\
+                          (i.e. the one just added).
+        :type keep_file: pathlib.Path
+        """
+        cache_files = sorted(self._get_cache_files(), key=lambda x: x[0].st_mtime_ns)
+        size = sum(f_stat.st_size for f_stat, _ in cache_files)
+
+        for f_stat, cache_file in cache_files:
+            if size <= self.max_size:
+                break
+            if cache_file == keep_file:
+                continue
+
+            try:
+                cache_file.unlink()
+            except FileNotFoundError:
+                # Already removed by another process of the cache.
+                pass
+            size -= f_stat.st_size
+
+    def _get_cache_files(self) -> List[Tuple[os.stat_result, Path]]:
+        """Returns the files of the cache, with their status.
+
+        The files that are removed (by another process of the cache)\
+        while the directory is read are skipped.
+
+        :return: The status and the path of each file of the cache.
+        :rtype: list[(os.stat_result, pathlib.Path)]
+        """
+        cache_files = []
+        for cache_file in self.dir_cache.glob('*.npy'):
+            try:
+                cache_files.append((cache_file.stat(), cache_file))
+            except FileNotFoundError:
+                pass
+
+        return cache_files
+
+    @staticmethod
+    def _get_key(audio_file: Path, sr: int, mono: bool) -> str:
+        """Returns the key of the audio data of an audio file.
+
+        :param audio_file: The path of the audio file.
+        :type audio_file: pathlib.Path
+        :param sr: The sampling frequency.
+        :type sr: int
+        :param mono: Mono audio data?
+        :type mono: bool
+        :return: SHA-256 hex digest of the path, modification\
+                 time, sampling frequency, and mono setting.
+        :rtype: str
+        """
+        return sha256(json.dumps([
+            str(audio_file.resolve()), audio_file.stat().st_mtime_ns,
+            int(sr), bool(mono)]).encode('utf-8')).hexdigest()
+
+
+def get_audio_cache(settings_audio: MutableMapping[str, Any],
+                    dir_root: Path) -> Optional[AudioCache]:
+    """Returns the audio cache of the audio settings, if it is used.
+
+    The cache is created once for each process.
+
+    :param settings_audio: Settings for the audio.
+    :type settings_audio: dict
+    :param dir_root: Root directory of data.
+    :type dir_root: pathlib.Path
+    :return: The audio cache, or None if it is not used.
+    :rtype: tools.audio_cache.AudioCache|None
+    """
+    settings_cache = settings_audio.get('cache')
+
+    if settings_cache is None or not settings_cache['use']:
+        return None
+
+    dir_cache = dir_root.joinpath(settings_cache['dir_cache'])
+    if dir_cache not in _AUDIO_CACHES:
+        _AUDIO_CACHES[dir_cache] = AudioCache(
+            dir_cache=dir_cache,
+            max_size=int(settings_cache['max_size_mb'] * 2 ** 20))
+
+    return _AUDIO_CACHES[dir_cache]
+
+
+def load_audio(audio_file: Path, settings_audio: MutableMapping[str, Any],
+               dir_root: Path) -> np.ndarray:
+    """Loads the data of an audio file, using the audio cache if it is used.
+
+    :param audio_file: The path of the audio file.
+    :type audio_file: pathlib.Path
+    :param settings_audio: Settings for the audio.
+    :type settings_audio: dict
+    :param dir_root: Root directory of data.
+    :type dir_root: pathlib.Path
+    :return: The audio data.
+    :rtype: numpy.ndarray
+    """
+    audio_cache = get_audio_cache(settings_audio, dir_root)
+
+    if audio_cache is None:
+        return load_audio_file(audio_file=str(audio_file),
+                               sr=int(settings_audio['sr']),
+                               mono=settings_audio['to_mono'])
+
+    return np.asarray(audio_cache.load(
+        audio_file, sr=int(settings_audio['sr']), mono=settings_audio['to_mono']))
+
+# EOF
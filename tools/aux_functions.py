@@ -1,25 +1,44 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from itertools import chain, count
-from collections import deque, Counter
+from itertools import count
+from collections import deque, defaultdict, Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from hashlib import sha256
 from pathlib import Path
-from typing import MutableSequence, MutableMapping, \
-    Tuple, List, Any
+from typing import MutableMapping, Iterable, Sequence, \
+    Tuple, List, Dict, Iterator, Callable, Optional, Union, Any
 
 import numpy as np
-
-from tools.csv_functions import read_csv_file
-from tools.captions_functions import get_sentence_words, \
-    clean_sentence, get_words_counter
-from tools.file_io import load_numpy_object, load_audio_file, \
+from loguru import logger
+
+from tools.annotations_table import AnnotationsTable, AnnotationsRow
+from tools.async_writer import AsyncWriter
+from tools.audio_cache import load_audio
+from tools.build_manifest import BuildManifest, get_signature, \
+    get_file_signature, get_code_version
+from tools.captions_functions import get_sentence_words, clean_sentence
+from tools.file_io import load_numpy_object, \
     load_pickle_file, dump_numpy_object, dump_pickle_file
+from tools.split_index import SplitIndexWriter, load_split_index, get_split_index_file
+from tools.packed_arrays import PackedArraysWriter, ShardedArraysWriter, \
+    get_arrays_writer, load_arrays, get_packed_record
+from tools.vocabulary import Vocabulary
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
 __all__ = ['get_amount_of_file_in_dir', 'get_annotations_files',
-           'check_data_for_split', 'create_split_data',
-           'create_lists_and_frequencies']
+           'process_annotations', 'iter_captions',
+           'get_data_files_index', 'get_audio_checksum',
+           'get_split_records',
+           'check_data_for_split', 'create_split_data', 'encode_captions',
+           'create_lists_and_frequencies', 'get_audio_data']
+
+# Modules with the code for the creation of the split data.
+_CREATION_MODULES = ['tools.annotations_table', 'tools.aux_functions',
+                     'tools.captions_functions', 'tools.file_io',
+                     'tools.packed_arrays', 'tools.vocabulary']
 
 
 def get_amount_of_file_in_dir(the_dir: Path) -> int:
@@ -37,16 +56,56 @@ def get_amount_of_file_in_dir(the_dir: Path) -> int:
     return next(counter)
 
 
+def get_audio_checksum(audio_data: np.ndarray) -> str:
+    """Returns the checksum of the contents of audio data.
+
+    :param audio_data: The audio data.
+    :type audio_data: numpy.ndarray
+    :return: SHA-256 hex digest of the audio samples.
+    :rtype: str
+    """
+    return sha256(np.ascontiguousarray(audio_data).tobytes()).hexdigest()
+
+
+def get_data_files_index(dir_data: Path) -> Dict[str, List[Path]]:
+    """Indexes the data files of a directory by the stem\
+    of their audio file.
+
+    :param dir_data: Directory with the data files.
+    :type dir_data: pathlib.Path
+    :return: The data files of each audio file stem.
+    :rtype: dict[str, list[pathlib.Path]]
+    """
+    data_files_index = defaultdict(list)
+
+    for data_file in sorted(dir_data.iterdir()):
+        # Get the stem of the audio file name
+        f_stem = data_file.name.split('file_')[-1].split('.wav_')[0]
+        data_files_index[f_stem].append(data_file)
+
+    return dict(data_files_index)
+
+
 def check_data_for_split(dir_audio: Path, dir_data: Path, dir_root: Path,
-                         csv_split: MutableSequence[MutableMapping[str, str]],
+                         csv_split: AnnotationsTable,
                          settings_ann: MutableMapping[str, Any],
                          settings_audio: MutableMapping[str, Any],
-                         settings_cntr: MutableMapping[str, Any]) -> None:
+                         settings_cntr: MutableMapping[str, Any],
+                         dir_audio_data: Optional[Path] = None,
+                         settings_verification: Optional[MutableMapping[str, Any]] = None,
+                         file_checksums: Optional[Path] = None,
+                         settings_output: Optional[MutableMapping[str, Any]] = None) -> None:
     """Goes through all audio files and checks the created data.
 
-    Gets each audio file and checks if there are associated data. If there are,\
-    checks the validity of the raw audio data and the validity of the captions,\
-    words, and characters.
+    Indexes the data files once, and checks that each audio file has associated\
+    data (data files without audio file are reported). Then, checks the validity\
+    of the raw audio data and the validity of the captions, words, and characters.
+
+    With the `full` verification mode, the original audio files are loaded\
+    and compared with the raw audio data. With the `checksum` verification\
+    mode, the checksums and lengths of the raw audio data are compared\
+    with the ones recorded during the creation of the data, without\
+    loading the original audio files.
 
     :param dir_audio: Directory with the audio files.
     :type dir_audio: pathlib.Path
@@ -55,18 +114,63 @@ def check_data_for_split(dir_audio: Path, dir_data: Path, dir_root: Path,
     :param dir_root: Root directory.
     :type dir_root: pathlib.Path
     :param csv_split: CSV entries for the data/
-    :type csv_split: list[collections.OrderedDict]
+    :type csv_split: tools.annotations_table.AnnotationsTable
     :param settings_ann: Settings for annotations.
     :type settings_ann: dict
     :param settings_audio: Settings for audio.
     :type settings_audio: dict
     :param settings_cntr: Settings for counters.
     :type settings_cntr: dict
+    :param dir_audio_data: Directory with the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :param settings_verification: Settings for the verification (i.e. mode).
+    :type settings_verification: dict|None
+    :param file_checksums: File with the recorded checksums of the audio data.
+    :type file_checksums: pathlib.Path|None
+    :param settings_output: Settings for the output files (i.e. format of the data).
+    :type settings_output: dict|None
     """
+    verification_mode = 'full' if settings_verification is None \
+        else settings_verification['mode']
+
+    if verification_mode not in ['full', 'checksum']:
+        raise ValueError('Unknown verification mode: {}'.format(verification_mode))
+
+    # Load the recorded checksums and lengths of the audio data
+    if verification_mode == 'checksum':
+        if file_checksums is None or not file_checksums.exists():
+            raise FileNotFoundError('No recorded checksums of audio data for '
+                                    'the checksum verification mode.')
+        audio_checksums = load_pickle_file(file_checksums)
+
     # Load the words and characters lists
     words_list = load_pickle_file(dir_root.joinpath(settings_cntr['words_list_file_name']))
     chars_list = load_pickle_file(dir_root.joinpath(settings_cntr['characters_list_file_name']))
 
+    # Index the records by the stem of their audio file, in one pass.
+    data_files_index = get_split_records(
+        dir_data=dir_root.joinpath(dir_data),
+        settings_output={'format': 'npy'} if settings_output is None else settings_output,
+        dir_audio_data=dir_audio_data)
+
+    # Check for audio files without data files and data files without audio file.
+    audio_stems = {Path(file_name).stem for file_name in csv_split.file_names}
+
+    data_files_no_audio = [data_file for f_stem, data_files in data_files_index.items()
+                           if f_stem not in audio_stems for data_file, _ in data_files]
+
+    if len(data_files_no_audio) > 0:
+        logger.bind(indent=2).warning(
+            'Data files with no associated audio file: {}'.format(
+                ', '.join(data_files_no_audio)))
+
+    audio_no_data_files = [file_name for file_name in csv_split.file_names
+                           if Path(file_name).stem not in data_files_index]
+
+    if len(audio_no_data_files) > 0:
+        raise FileExistsError('Audio files with no associated data: {}'.format(
+            ', '.join(audio_no_data_files)))
+
     for csv_entry in csv_split:
         # Get audio file name
         file_name_audio = Path(csv_entry[settings_ann['audio_file_column']])
@@ -76,239 +180,773 @@ def check_data_for_split(dir_audio: Path, dir_data: Path, dir_root: Path,
             raise FileExistsError('Audio file {f_name_audio} not exists in {d_audio}'.format(
                 f_name_audio=file_name_audio, d_audio=dir_audio))
 
-        # Flag for checking if there are data files for the audio file
-        audio_has_data_files = False
-
-        # Get the original audio data
-        data_audio_original = load_audio_file(
-            audio_file=str(dir_audio.joinpath(file_name_audio)),
-            sr=int(settings_audio['sr']), mono=settings_audio['to_mono'])
-
-        for data_file in dir_root.joinpath(dir_data).iterdir():
-            # Get the stem of the audio file name
-            f_stem = str(data_file).split('file_')[-1].split('.wav_')[0]
-
-            if f_stem == file_name_audio.stem:
-                audio_has_data_files = True
-                # Get the numpy record array
-                data_array = load_numpy_object(data_file)
-
-                # Get the audio data from the numpy record array
-                data_audio_rec_array = data_array['audio_data'].item()
-
-                # Compare the lengths
-                if len(data_audio_rec_array) != len(data_audio_original):
-                    raise ValueError(
-                        'File {f_audio} was not saved successfully to the numpy '
-                        'object {f_np}.'.format(f_audio=file_name_audio, f_np=data_file))
-
-                # Check all elements, one to one
-                if not all([data_audio_original[i] == data_audio_rec_array[i]
-                            for i in range(len(data_audio_original))]):
-                    raise ValueError('Numpy object {} has wrong audio data.'.format(data_file))
-
-                # Get the original caption
-                caption_index = data_array['caption_ind'].item()
-
-                # Clean it to remove any spaces before punctuation.
-                original_caption = clean_sentence(
-                    sentence=csv_entry[settings_ann['captions_fields_prefix'].format(caption_index + 1)],
-                    keep_case=True, remove_punctuation=False,
-                    remove_specials=not settings_ann['use_special_tokens'])
-
-                # Check with the file caption
-                caption_data_array = clean_sentence(
-                    sentence=data_array['caption'].item(), keep_case=True,
-                    remove_punctuation=False,
-                    remove_specials=not settings_ann['use_special_tokens'])
-
-                if not original_caption == caption_data_array:
-                    raise ValueError('Numpy object {} has wrong caption.'.format(data_file))
-
-                # Since caption in the file is OK, we can use it instead of
-                # the original, because it already has the special tokens.
-                caption_data_array = clean_sentence(
-                    sentence=data_array['caption'].item(),
-                    keep_case=settings_ann['keep_case'],
-                    remove_punctuation=settings_ann['remove_punctuation_words'],
-                    remove_specials=not settings_ann['use_special_tokens'])
-
-                # Check with the indices of words
-                words_indices = data_array['words_ind'].item()
-                caption_form_words = ' '.join([words_list[i] for i in words_indices])
-
-                if not caption_data_array == caption_form_words:
-                    raise ValueError('Numpy object {} has wrong words indices.'.format(data_file))
-
-                # Check with the indices of characters
-                caption_from_chars = ''.join([chars_list[i] for i in data_array['chars_ind'].item()])
-
-                caption_data_array = clean_sentence(
-                    sentence=data_array['caption'].item(),
-                    keep_case=settings_ann['keep_case'],
-                    remove_punctuation=settings_ann['remove_punctuation_chars'],
-                    remove_specials=not settings_ann['use_special_tokens'])
-
-                if not caption_data_array == caption_from_chars:
-                    raise ValueError('Numpy object {} has wrong characters '
-                                     'indices.'.format(data_file))
-
-        if not audio_has_data_files:
-            raise FileExistsError('Audio file {} has no associated data.'.format(
-                file_name_audio))
-
-
-def create_lists_and_frequencies(captions: MutableSequence[str],
+        # Get the original audio data or their recorded checksum and length
+        if verification_mode == 'full':
+            data_audio_original = load_audio(
+                audio_file=dir_audio.joinpath(file_name_audio),
+                settings_audio=settings_audio, dir_root=dir_root)
+            length_original = len(data_audio_original)
+        else:
+            checksum_original, length_original = audio_checksums[str(file_name_audio)]
+
+        for data_file, load_record in data_files_index[file_name_audio.stem]:
+            # Get the record
+            data_array = load_record()
+
+            # Get the audio data from the record
+            data_audio_rec_array = data_array['audio_data']
+
+            # Compare the lengths
+            if len(data_audio_rec_array) != length_original:
+                raise ValueError(
+                    'File {f_audio} was not saved successfully to the numpy '
+                    'object {f_np}.'.format(f_audio=file_name_audio, f_np=data_file))
+
+            # Check all elements
+            if verification_mode == 'full':
+                audio_ok = np.array_equal(data_audio_original, data_audio_rec_array)
+            else:
+                audio_ok = get_audio_checksum(data_audio_rec_array) == checksum_original
+
+            if not audio_ok:
+                raise ValueError('Numpy object {} has wrong audio data.'.format(data_file))
+
+            # Get the original caption
+            caption_index = data_array['caption_ind']
+
+            # Clean it to remove any spaces before punctuation.
+            original_caption = clean_sentence(
+                sentence=csv_entry[settings_ann['captions_fields_prefix'].format(caption_index + 1)],
+                keep_case=True, remove_punctuation=False,
+                remove_specials=not settings_ann['use_special_tokens'])
+
+            # Check with the file caption
+            caption_data_array = clean_sentence(
+                sentence=data_array['caption'], keep_case=True,
+                remove_punctuation=False,
+                remove_specials=not settings_ann['use_special_tokens'])
+
+            if not original_caption == caption_data_array:
+                raise ValueError('Numpy object {} has wrong caption.'.format(data_file))
+
+            # Since caption in the file is OK, we can use it instead of
+            # the original, because it already has the special tokens.
+            caption_data_array = clean_sentence(
+                sentence=data_array['caption'],
+                keep_case=settings_ann['keep_case'],
+                remove_punctuation=settings_ann['remove_punctuation_words'],
+                remove_specials=not settings_ann['use_special_tokens'])
+
+            # Check with the indices of words
+            words_indices = data_array['words_ind']
+            caption_form_words = ' '.join([words_list[i] for i in words_indices])
+
+            if not caption_data_array == caption_form_words:
+                raise ValueError('Numpy object {} has wrong words indices.'.format(data_file))
+
+            # Check with the indices of characters
+            caption_from_chars = ''.join([chars_list[i] for i in data_array['chars_ind']])
+
+            caption_data_array = clean_sentence(
+                sentence=data_array['caption'],
+                keep_case=settings_ann['keep_case'],
+                remove_punctuation=settings_ann['remove_punctuation_chars'],
+                remove_specials=not settings_ann['use_special_tokens'])
+
+            if not caption_data_array == caption_from_chars:
+                raise ValueError('Numpy object {} has wrong characters '
+                                 'indices.'.format(data_file))
+
+
+def create_lists_and_frequencies(captions: Iterable[str],
                                  dir_root: Path,
                                  settings_ann: MutableMapping[str, Any],
-                                 settings_cntr: MutableMapping[str, Any]) -> \
-        Tuple[List[str], List[str]]:
+                                 settings_cntr: MutableMapping[str, Any],
+                                 build_manifest: Optional[BuildManifest] = None) -> \
+        Tuple[Vocabulary, Vocabulary]:
     """Creates the pickle files with words, characters, and their frequencies.
 
+    Along with the lists of words and characters, the corresponding\
+    vocabularies (i.e. lists with token to index mapping) are saved.
+
+    The captions are read once, one at a time, thus they can be given\
+    by a generator (e.g. `iter_captions`) and only the counters of the\
+    words and characters are kept in memory.
+
+    If a build manifest is given and the pickle files are up to date\
+    (i.e. same captions, settings, and code), the pickle files are\
+    not saved again.
+
     :param captions: Captions to be used (development captions are suggested).
-    :type captions: list[str]
+    :type captions: list[str]|iterable
     :param dir_root: Root directory of data.
     :type dir_root: pathlib.Path
     :param settings_ann: Settings for annotations.
     :type settings_ann: dict
     :param settings_cntr: Settings for pickle files.
     :type settings_cntr: dict
-    :return: Words and characters list.
-    :rtype: list[str], list[str]
+    :param build_manifest: Manifest of the build, for skipping up to date files.
+    :type build_manifest: tools.build_manifest.BuildManifest|None
+    :return: Words and characters vocabularies.
+    :rtype: tools.vocabulary.Vocabulary, tools.vocabulary.Vocabulary
     """
-    # Get words counter
-    counter_words = get_words_counter(
-        captions=captions,
-        use_unique=settings_ann['use_unique_words_per_caption'],
-        keep_case=settings_ann['keep_case'],
-        remove_punctuation=settings_ann['remove_punctuation_words'],
-        remove_specials=not settings_ann['use_special_tokens']
-    )
+    obj_f_names = [
+        settings_cntr['words_list_file_name'],
+        settings_cntr['words_counter_file_name'],
+        settings_cntr['characters_list_file_name'],
+        settings_cntr['characters_frequencies_file_name'],
+        settings_cntr['words_vocabulary_file_name'],
+        settings_cntr['characters_vocabulary_file_name']
+    ]
+
+    counter_words = Counter()
+    counter_characters = Counter()
+    captions_hash = sha256()
+    nb_captions = 0
+
+    # Get words and characters counters, in one pass over the captions.
+    for caption in captions:
+        counter_words.update(get_sentence_words(
+            caption,
+            unique=settings_ann['use_unique_words_per_caption'],
+            keep_case=settings_ann['keep_case'],
+            remove_punctuation=settings_ann['remove_punctuation_words'],
+            remove_specials=not settings_ann['use_special_tokens']))
+
+        counter_characters.update(clean_sentence(
+            caption, keep_case=settings_ann['keep_case'],
+            remove_punctuation=settings_ann['remove_punctuation_chars'],
+            remove_specials=True))
+
+        captions_hash.update('{!r}\n'.format(caption).encode('utf-8'))
+        nb_captions += 1
+
+    # Check if the pickle files are up to date
+    if build_manifest is not None:
+        signature = get_signature(captions_hash.hexdigest(), settings_ann, settings_cntr,
+                                  get_code_version(*_CREATION_MODULES))
+
+        if build_manifest.is_up_to_date('vocabulary', signature):
+            return tuple(load_pickle_file(dir_root.joinpath(obj_f_name))
+                         for obj_f_name in obj_f_names[-2:])
 
     # Get words and frequencies
     words_list, frequencies_words = list(counter_words.keys()), list(counter_words.values())
 
-    # Get characters and frequencies
-    cleaned_captions = [clean_sentence(
-        sentence, keep_case=settings_ann['keep_case'],
-        remove_punctuation=settings_ann['remove_punctuation_chars'],
-        remove_specials=True) for sentence in captions]
-
-    characters_all = list(chain.from_iterable(cleaned_captions))
-    counter_characters = Counter(characters_all)
-
     # Add special characters
-    if settings_ann['use_special_tokens']:
-        counter_characters.update(['<sos>'] * len(cleaned_captions))
-        counter_characters.update(['<eos>'] * len(cleaned_captions))
+    if settings_ann['use_special_tokens'] and nb_captions > 0:
+        counter_characters.update({'<sos>': nb_captions, '<eos>': nb_captions})
 
     chars_list, frequencies_chars = list(counter_characters.keys()), list(counter_characters.values())
 
+    # Get the vocabularies
+    words_vocabulary, chars_vocabulary = Vocabulary(words_list), Vocabulary(chars_list)
+
     # Save to disk
-    obj_list = [words_list, frequencies_words, chars_list, frequencies_chars]
-    obj_f_names = [
-        settings_cntr['words_list_file_name'],
-        settings_cntr['words_counter_file_name'],
-        settings_cntr['characters_list_file_name'],
-        settings_cntr['characters_frequencies_file_name']
-    ]
+    obj_list = [words_list, frequencies_words, chars_list, frequencies_chars,
+                words_vocabulary, chars_vocabulary]
 
     [dump_pickle_file(obj=obj, file_name=dir_root.joinpath(obj_f_name))
      for obj, obj_f_name in zip(obj_list, obj_f_names)]
 
-    return words_list, chars_list
+    if build_manifest is not None:
+        build_manifest.update(
+            'vocabulary', signature=signature,
+            outputs=[dir_root.joinpath(obj_f_name) for obj_f_name in obj_f_names])
 
+    return words_vocabulary, chars_vocabulary
 
-def create_split_data(csv_split: MutableSequence[MutableMapping[str, str]], dir_split: Path,
-                      dir_audio: Path, dir_root: Path, words_list: MutableSequence[str],
-                      chars_list: MutableSequence[str], settings_ann: MutableMapping[str, Any],
+
+def create_split_data(csv_split: AnnotationsTable, dir_split: Path,
+                      dir_audio: Path, dir_root: Path, words_list: Vocabulary,
+                      chars_list: Vocabulary, settings_ann: MutableMapping[str, Any],
                       settings_audio: MutableMapping[str, Any],
-                      settings_output: MutableMapping[str, Any]) -> None:
+                      settings_output: MutableMapping[str, Any],
+                      settings_exec: Optional[MutableMapping[str, Any]] = None,
+                      dir_audio_data: Optional[Path] = None,
+                      file_checksums: Optional[Path] = None,
+                      build_manifest: Optional[BuildManifest] = None) -> None:
     """Creates the data for the split.
 
+    With the `npy` format, one numpy object is saved for each caption.\
+    With the `shared` audio layout, the audio data of each audio file\
+    are saved once at the `dir_audio_data` directory, and the data of\
+    each caption have only the name of the file with the audio data.\
+    With the `per_caption` audio layout, the audio data are saved in the\
+    data of each caption.
+
+    With the `packed` format, the data of the split are saved in flat,\
+    typed, arrays (see tools.packed_arrays.PackedArraysWriter), with\
+    the audio data of each audio file saved once. The `sharded` format\
+    is the same, but the arrays are split in shards of `shard_size`\
+    audio files (see tools.packed_arrays.ShardedArraysWriter).
+
+    The checksum and the length of the audio data of each audio file\
+    are saved at the `file_checksums` file, if it is specified.
+
+    The index of the split (see tools.split_index.SplitIndexWriter) is\
+    saved next to the directory of the split, with the file name of\
+    the `index_file_name_template` setting.
+
+    If more than one worker is specified in the execution settings,\
+    the entries of the split are distributed to a pool of processes.\
+    The data are saved in the order of the entries, thus the resulting\
+    files are the same as the ones of the serial processing.
+
+    The numpy objects of the `npy` format are saved by `io_threads`\
+    I/O threads (execution settings), with at most `io_queue_size`\
+    audio files waiting to be saved.
+
+    If a build manifest is given, the data that are up to date (i.e.\
+    same audio file, captions, vocabularies, settings, and code) are\
+    not created again. With the `npy` format, this is checked for each\
+    audio file, thus an interrupted creation is resumed. With the\
+    `packed` and `sharded` formats, this is checked for the whole split.
+
     :param csv_split: Annotations of the split.
-    :type csv_split: list[collections.OrderedDict]
+    :type csv_split: tools.annotations_table.AnnotationsTable
     :param dir_split: Directory for the split.
     :type dir_split: pathlib.Path
     :param dir_audio: Directory of the audio files for the split.
     :type dir_audio: pathlib.Path
     :param dir_root: Root directory of data.
     :type dir_root: pathlib.Path
-    :param words_list: List of the words.
-    :type words_list: list[str]
-    :param chars_list: List of the characters.
-    :type chars_list: list[str]
+    :param words_list: Vocabulary of the words.
+    :type words_list: tools.vocabulary.Vocabulary
+    :param chars_list: Vocabulary of the characters.
+    :type chars_list: tools.vocabulary.Vocabulary
     :param settings_ann: Settings for the annotations.
     :type settings_ann: dict
     :param settings_audio: Settings for the audio.
     :type settings_audio: dict
     :param settings_output: Settings for the output files.
     :type settings_output: dict
+    :param settings_exec: Settings for the execution (i.e.\
+                          workers, chunk size, and I/O threads).
+    :type settings_exec: dict|None
+    :param dir_audio_data: Directory for the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :param file_checksums: File for the checksums of the audio data.
+    :type file_checksums: pathlib.Path|None
+    :param build_manifest: Manifest of the build, for skipping up to date data.
+    :type build_manifest: tools.build_manifest.BuildManifest|None
     """
-    # Make sure that the directory exists
+    # Make sure that the directories exist
     dir_split.mkdir(parents=True, exist_ok=True)
 
-    captions_fields = [settings_ann['captions_fields_prefix'].format(i)
-                       for i in range(1, int(settings_ann['nb_captions']) + 1)]
+    csv_split_to_create = csv_split
+    index_file = get_split_index_file(dir_split, settings_output['index_file_name_template'])
+
+    # Get the entries that are not up to date
+    if build_manifest is not None:
+        # The audio cache does not change the audio data.
+        settings_signature = get_signature(
+            settings_ann, {key: value for key, value in settings_audio.items() if key != 'cache'},
+            settings_output,
+            words_list.tokens, chars_list.tokens,
+            get_code_version(*_CREATION_MODULES))
+
+        signatures = OrderedDict(
+            (csv_entry[settings_ann['audio_file_column']],
+             get_signature(settings_signature, dict(csv_entry), get_file_signature(
+                 dir_root.joinpath(dir_audio, csv_entry[settings_ann['audio_file_column']]))))
+            for csv_entry in csv_split)
+
+        if settings_output['format'] == 'npy':
+            csv_split_to_create = [
+                csv_entry for csv_entry in csv_split
+                if not build_manifest.is_up_to_date(
+                    '{}/{}'.format(dir_split.name, csv_entry[settings_ann['audio_file_column']]),
+                    signatures[csv_entry[settings_ann['audio_file_column']]])]
+        else:
+            split_signature = get_signature(list(signatures.values()))
+            if index_file.exists() and \
+                    build_manifest.is_up_to_date(dir_split.name, split_signature):
+                csv_split_to_create = []
+
+    arrays_writer = get_arrays_writer(
+        data_format=settings_output['format'], dir_output=dir_split,
+        shard_size=settings_output['shard_size']) \
+        if len(csv_split_to_create) > 0 else None
+
+    if arrays_writer is None and settings_output['audio_layout'] == 'shared':
+        if dir_audio_data is None:
+            raise ValueError('Directory for the shared audio data is not specified.')
+        dir_audio_data.mkdir(parents=True, exist_ok=True)
+
+    entry_func = partial(
+        _get_entry_data,
+        dir_audio=dir_audio, dir_root=dir_root,
+        settings_ann=settings_ann, settings_audio=settings_audio)
+
+    # Encode the captions of the split at once, in flat arrays. All
+    # the captions are encoded, for the token lengths of the index.
+    nb_captions = int(settings_ann['nb_captions'])
+    encoded = encode_captions(
+        list(iter_captions(csv_split, settings_ann)),
+        words_list=words_list, chars_list=chars_list, settings_ann=settings_ann)
+
+    split_index = SplitIndexWriter(index_file)
+
+    audio_checksums = OrderedDict()
+
+    # The numpy objects are saved by I/O threads. The packed
+    # arrays are saved in order, thus without I/O threads.
+    settings_io = {} if settings_exec is None else settings_exec
+    async_writer = AsyncWriter(
+        nb_threads=int(settings_io.get('io_threads') or 0) if arrays_writer is None else 0,
+        queue_size=int(settings_io.get('io_queue_size') or 1))
 
     # For each sound:
-    for csv_entry in csv_split:
-        file_name_audio = csv_entry[settings_ann['audio_file_column']]
+    with async_writer:
+        for entry in _map_entries(entry_func, csv_split_to_create, settings_exec):
+            audio_checksums[entry['file_name']] = entry['audio_checksum']
+
+            # The indices of each caption are views of the flat arrays.
+            i_entry = csv_split.index(entry['file_name'])
+            captions_ind = range(i_entry * nb_captions, (i_entry + 1) * nb_captions)
+            for key in ['words', 'chars']:
+                indices, offsets = encoded['{}_ind'.format(key)], encoded['{}_offsets'.format(key)]
+                entry['{}_ind'.format(key)] = [
+                    indices[offsets[i]:offsets[i + 1]] for i in captions_ind]
+
+            async_writer.submit(
+                _save_entry_data, entry, dir_split=dir_split,
+                settings_output=settings_output, dir_audio_data=dir_audio_data,
+                arrays_writer=arrays_writer, build_manifest=build_manifest,
+                signature=None if build_manifest is None else signatures[entry['file_name']],
+                split_index=split_index)
+
+    if arrays_writer is not None:
+        arrays_writer.close()
+
+    if build_manifest is not None:
+        if settings_output['format'] != 'npy' and len(csv_split_to_create) > 0:
+            build_manifest.update(dir_split.name, signature=split_signature,
+                                  outputs=[dir_split])
+
+        # Get the checksums of the audio data that were not created again.
+        audio_checksums = OrderedDict(
+            (file_name, tuple(build_manifest.get('{}/{}'.format(
+                dir_split.name, file_name))['audio_checksum']))
+            for file_name in signatures.keys())
+
+    if file_checksums is not None:
+        dump_pickle_file(obj=audio_checksums, file_name=file_checksums)
+
+    # The rows of the numpy objects are found from their names, thus
+    # they are added for all the entries (created again or not).
+    if settings_output['format'] == 'npy':
+        words_lengths = np.diff(encoded['words_offsets'])
+        chars_lengths = np.diff(encoded['chars_offsets'])
+        for i_entry, file_name in enumerate(csv_split.file_names):
+            for caption_ind in range(nb_captions):
+                i_caption = i_entry * nb_captions + caption_ind
+                split_index.add(
+                    file_name=file_name, caption_ind=caption_ind,
+                    nb_frames=audio_checksums[file_name][1],
+                    nb_words=int(words_lengths[i_caption]),
+                    nb_chars=int(chars_lengths[i_caption]),
+                    path=settings_output['file_name_template'].format(
+                        audio_file_name=file_name, caption_index=caption_ind))
+
+    if settings_output['format'] == 'npy' or len(csv_split_to_create) > 0:
+        split_index.close()
+
+
+def _map_entries(entry_func: Callable[[AnnotationsRow], Dict[str, Any]],
+                 csv_split: Union[AnnotationsTable, List[AnnotationsRow]],
+                 settings_exec: Optional[MutableMapping[str, Any]] = None) -> \
+        Iterator[Dict[str, Any]]:
+    """Applies a function to the entries of a split, with a pool\
+    of processes if more than one worker is specified.
+
+    :param entry_func: The function.
+    :type entry_func: callable
+    :param csv_split: Annotations of the split.
+    :type csv_split: tools.annotations_table.AnnotationsTable|\
+                     list[tools.annotations_table.AnnotationsRow]
+    :param settings_exec: Settings for the execution (i.e.\
+                          workers and chunk size).
+    :type settings_exec: dict|None
+    :return: The results of the function, in the order of the entries.
+    :rtype: iterator[dict[str, T]]
+    """
+    settings_exec = {} if settings_exec is None else settings_exec
+    nb_workers = int(settings_exec.get('workers') or 1)
+    chunk_size = int(settings_exec.get('chunk_size') or 1)
+
+    if nb_workers > 1:
+        # Entries are given to the pool in batches, so that only
+        # the results of a batch are kept in memory.
+        batch_size = 2 * nb_workers * chunk_size
+        with ProcessPoolExecutor(max_workers=nb_workers) as executor:
+            for i in range(0, len(csv_split), batch_size):
+                yield from executor.map(
+                    entry_func, csv_split[i:i + batch_size], chunksize=chunk_size)
+    else:
+        yield from map(entry_func, csv_split)
+
+
+def _get_entry_data(csv_entry: AnnotationsRow, dir_audio: Path,
+                    dir_root: Path, settings_ann: MutableMapping[str, Any],
+                    settings_audio: MutableMapping[str, Any]) -> Dict[str, Any]:
+    """Gets the data for one entry (i.e. audio file) of the split.
+
+    :param csv_entry: Annotations of the audio file.
+    :type csv_entry: tools.annotations_table.AnnotationsRow
+    :param dir_audio: Directory of the audio files for the split.
+    :type dir_audio: pathlib.Path
+    :param dir_root: Root directory of data.
+    :type dir_root: pathlib.Path
+    :param settings_ann: Settings for the annotations.
+    :type settings_ann: dict
+    :param settings_audio: Settings for the audio.
+    :type settings_audio: dict
+    :return: The audio file name, the audio data with their checksum\
+             and length, and the captions.
+    :rtype: dict[str, T]
+    """
+    file_name_audio = csv_entry.file_name
 
-        audio = load_audio_file(
-            audio_file=str(dir_root.joinpath(dir_audio, file_name_audio)),
-            sr=int(settings_audio['sr']), mono=settings_audio['to_mono'])
+    audio = load_audio(
+        audio_file=dir_root.joinpath(dir_audio, file_name_audio),
+        settings_audio=settings_audio, dir_root=dir_root)
 
-        for caption_ind, caption_field in enumerate(captions_fields):
-            caption = csv_entry[caption_field]
+    return {
+        'file_name': file_name_audio,
+        'audio_data': audio,
+        'audio_checksum': (get_audio_checksum(audio), len(audio)),
+        'captions': list(csv_entry.captions)}
 
-            words_caption = get_sentence_words(
-                caption, unique=settings_ann['use_unique_words_per_caption'],
-                keep_case=settings_ann['keep_case'],
-                remove_punctuation=settings_ann['remove_punctuation_words'],
-                remove_specials=not settings_ann['use_special_tokens']
-            )
-
-            chars_caption = list(chain.from_iterable(
-                clean_sentence(
-                    caption,
-                    keep_case=settings_ann['keep_case'],
-                    remove_punctuation=settings_ann['remove_punctuation_chars'],
-                    remove_specials=True)))
-
-            if settings_ann['use_special_tokens']:
-                chars_caption.insert(0, ' ')
-                chars_caption.insert(0, '<sos>')
-                chars_caption.append(' ')
-                chars_caption.append('<eos>')
-
-            indices_words = [words_list.index(word) for word in words_caption]
-            indices_chars = [chars_list.index(char) for char in chars_caption]
-
-            #   create the numpy object with all elements
-            np_rec_array = np.rec.array(np.array(
-                (file_name_audio, audio, caption, caption_ind,
-                 np.array(indices_words), np.array(indices_chars)),
-                dtype=[
-                    ('file_name', 'U{}'.format(len(file_name_audio))),
-                    ('audio_data', np.dtype(object)),
-                    ('caption', 'U{}'.format(len(caption))),
-                    ('caption_ind', 'i4'),
-                    ('words_ind', np.dtype(object)),
-                    ('chars_ind', np.dtype(object))
-                ]
-            ))
-
-            #   save the numpy object to disk
-            dump_numpy_object(
-                np_obj=np_rec_array,
-                file_name=str(dir_split.joinpath(
-                    settings_output['file_name_template'].format(
-                        audio_file_name=file_name_audio, caption_index=caption_ind))))
+
+def encode_captions(captions: Sequence[str], words_list: Vocabulary,
+                    chars_list: Vocabulary, settings_ann: MutableMapping[str, Any]) -> \
+        Dict[str, np.ndarray]:
+    """Returns the indices of the words and of the characters of\
+    many captions, in flat int32 arrays (i.e. ragged arrays).
+
+    The indices of the words of the i-th caption are the elements\
+    `words_ind[words_offsets[i]:words_offsets[i + 1]]`, and the same\
+    for the characters. With special tokens, the `<sos>` and `<eos>`\
+    tokens (and the spaces after and before them) are added to the\
+    indices of the characters of all captions at once.
+
+    :param captions: The captions.
+    :type captions: list[str]
+    :param words_list: Vocabulary of the words.
+    :type words_list: tools.vocabulary.Vocabulary
+    :param chars_list: Vocabulary of the characters.
+    :type chars_list: tools.vocabulary.Vocabulary
+    :param settings_ann: Settings for the annotations.
+    :type settings_ann: dict
+    :return: The indices (`words_ind` and `chars_ind`) and the\
+             offsets (`words_offsets` and `chars_offsets`).
+    :rtype: dict[str, numpy.ndarray]
+    """
+    words_ind, words_offsets = words_list.encode_batch([
+        get_sentence_words(
+            caption, unique=settings_ann['use_unique_words_per_caption'],
+            keep_case=settings_ann['keep_case'],
+            remove_punctuation=settings_ann['remove_punctuation_words'],
+            remove_specials=not settings_ann['use_special_tokens'])
+        for caption in captions])
+
+    chars_ind, chars_offsets = chars_list.encode_batch([
+        clean_sentence(
+            caption, keep_case=settings_ann['keep_case'],
+            remove_punctuation=settings_ann['remove_punctuation_chars'],
+            remove_specials=True)
+        for caption in captions])
+
+    if settings_ann['use_special_tokens']:
+        chars_ind, chars_offsets = _add_special_tokens(
+            chars_ind, chars_offsets,
+            prefix=chars_list.encode(['<sos>', ' ']),
+            suffix=chars_list.encode([' ', '<eos>']))
+
+    return {'words_ind': words_ind, 'words_offsets': words_offsets,
+            'chars_ind': chars_ind, 'chars_offsets': chars_offsets}
+
+
+def _add_special_tokens(indices: np.ndarray, offsets: np.ndarray,
+                        prefix: List[int], suffix: List[int]) -> \
+        Tuple[np.ndarray, np.ndarray]:
+    """Adds the same indices at the start and at the end of\
+    each sequence of a ragged array.
+
+    :param indices: The indices of the sequences.
+    :type indices: numpy.ndarray
+    :param offsets: The offsets of the sequences.
+    :type offsets: numpy.ndarray
+    :param prefix: The indices to add at the start of each sequence.
+    :type prefix: list[int]
+    :param suffix: The indices to add at the end of each sequence.
+    :type suffix: list[int]
+    :return: The new indices and offsets.
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    new_offsets = offsets + np.arange(len(offsets)) * (len(prefix) + len(suffix))
+    new_indices = np.empty(int(new_offsets[-1]), dtype=indices.dtype)
+    is_token = np.ones(len(new_indices), dtype=bool)
+
+    for i, index in enumerate(prefix):
+        new_indices[new_offsets[:-1] + i] = index
+        is_token[new_offsets[:-1] + i] = False
+
+    for i, index in enumerate(suffix):
+        new_indices[new_offsets[1:] - len(suffix) + i] = index
+        is_token[new_offsets[1:] - len(suffix) + i] = False
+
+    new_indices[is_token] = indices
+
+    return new_indices, new_offsets
+
+
+def _save_entry_data(entry: Dict[str, Any], dir_split: Path,
+                     settings_output: MutableMapping[str, Any],
+                     dir_audio_data: Optional[Path],
+                     arrays_writer: Optional[Union[PackedArraysWriter, ShardedArraysWriter]],
+                     build_manifest: Optional[BuildManifest],
+                     signature: Optional[str],
+                     split_index: Optional[SplitIndexWriter] = None) -> None:
+    """Saves the data of one entry (i.e. audio file) of the split,\
+    and records them at the build manifest.
+
+    :param entry: The data of the entry.
+    :type entry: dict[str, T]
+    :param dir_split: Directory for the split.
+    :type dir_split: pathlib.Path
+    :param settings_output: Settings for the output files.
+    :type settings_output: dict
+    :param dir_audio_data: Directory for the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :param arrays_writer: Writer of the packed arrays (None for\
+                          the `npy` format).
+    :type arrays_writer: tools.packed_arrays.PackedArraysWriter|\
+                         tools.packed_arrays.ShardedArraysWriter|None
+    :param build_manifest: Manifest of the build.
+    :type build_manifest: tools.build_manifest.BuildManifest|None
+    :param signature: Signature of the data of the entry.
+    :type signature: str|None
+    :param split_index: Index of the split, for the records of\
+                        the packed arrays.
+    :type split_index: tools.split_index.SplitIndexWriter|None
+    """
+    if arrays_writer is None:
+        outputs = _dump_entry_data(entry, dir_split, settings_output, dir_audio_data)
+    else:
+        _dump_entry_data_packed(entry, arrays_writer, split_index)
+        outputs = []
+
+    if build_manifest is not None:
+        build_manifest.update(
+            '{}/{}'.format(dir_split.name, entry['file_name']),
+            signature=signature, outputs=outputs,
+            audio_checksum=entry['audio_checksum'])
+
+
+def _dump_entry_data(entry: Dict[str, Any], dir_split: Path,
+                     settings_output: MutableMapping[str, Any],
+                     dir_audio_data: Optional[Path] = None) -> List[Path]:
+    """Saves the data of one entry of the split as numpy objects,\
+    one for each caption.
+
+    :param entry: The data of the entry.
+    :type entry: dict[str, T]
+    :param dir_split: Directory for the split.
+    :type dir_split: pathlib.Path
+    :param settings_output: Settings for the output files.
+    :type settings_output: dict
+    :param dir_audio_data: Directory for the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :return: The paths of the saved files.
+    :rtype: list[pathlib.Path]
+    """
+    file_name_audio = entry['file_name']
+    audio = entry['audio_data']
+    outputs = []
+
+    # Save the audio data once, if they are shared between the captions.
+    if settings_output['audio_layout'] == 'shared':
+        audio_file = settings_output['audio_file_name_template'].format(
+            audio_file_name=file_name_audio)
+        dump_numpy_object(
+            np_obj=audio, file_name=str(dir_audio_data.joinpath(audio_file)))
+        outputs.append(dir_audio_data.joinpath(audio_file))
+        audio_field = (audio_file, ('audio_file', 'U{}'.format(len(audio_file))))
+    else:
+        audio_field = (audio, ('audio_data', np.dtype(object)))
+
+    for caption_ind, (caption, indices_words, indices_chars) in enumerate(
+            zip(entry['captions'], entry['words_ind'], entry['chars_ind'])):
+
+        #   create the numpy object with all elements
+        np_rec_array = np.rec.array(np.array(
+            (file_name_audio, audio_field[0], caption, caption_ind,
+             indices_words.astype(np.int64), indices_chars.astype(np.int64)),
+            dtype=[
+                ('file_name', 'U{}'.format(len(file_name_audio))),
+                audio_field[1],
+                ('caption', 'U{}'.format(len(caption))),
+                ('caption_ind', 'i4'),
+                ('words_ind', np.dtype(object)),
+                ('chars_ind', np.dtype(object))
+            ]
+        ))
+
+        #   save the numpy object to disk
+        outputs.append(dir_split.joinpath(
+            settings_output['file_name_template'].format(
+                audio_file_name=file_name_audio, caption_index=caption_ind)))
+        dump_numpy_object(np_obj=np_rec_array, file_name=str(outputs[-1]))
+
+    return outputs
+
+
+def _dump_entry_data_packed(entry: Dict[str, Any],
+                            packed_writer: Union[PackedArraysWriter,
+                                                 ShardedArraysWriter],
+                            split_index: Optional[SplitIndexWriter] = None) -> None:
+    """Adds the data of one entry of the split to packed arrays.
+
+    :param entry: The data of the entry.
+    :type entry: dict[str, T]
+    :param packed_writer: The writer of the packed arrays.
+    :type packed_writer: tools.packed_arrays.PackedArraysWriter|\
+                         tools.packed_arrays.ShardedArraysWriter
+    :param split_index: Index of the split, where the records are added.
+    :type split_index: tools.split_index.SplitIndexWriter|None
+    """
+    packed_writer.start_entry()
+    audio_index = packed_writer.append_item('audio_data', entry['audio_data'])
+
+    for caption_ind, (caption, indices_words, indices_chars) in enumerate(
+            zip(entry['captions'], entry['words_ind'], entry['chars_ind'])):
+        record_index = packed_writer.append_record(
+            file_name=entry['file_name'],
+            caption=caption,
+            caption_ind=caption_ind,
+            audio_data_index=audio_index,
+            words_ind_index=packed_writer.append_item(
+                'words_ind', indices_words, dtype=np.int32),
+            chars_ind_index=packed_writer.append_item(
+                'chars_ind', indices_chars, dtype=np.int32))
+
+        if split_index is not None:
+            split_index.add(
+                file_name=entry['file_name'], caption_ind=caption_ind,
+                nb_frames=len(entry['audio_data']), nb_words=len(indices_words),
+                nb_chars=len(indices_chars), shard=packed_writer.shard_file_name,
+                record_index=record_index)
+
+
+def get_split_records(dir_data: Path,
+                      settings_output: MutableMapping[str, Any],
+                      dir_audio_data: Optional[Path] = None,
+                      suffix: Optional[str] = None,
+                      index_file: Optional[Path] = None) -> \
+        Dict[str, List[Tuple[str, Callable[[], Dict[str, Any]]]]]:
+    """Returns the records (i.e. data of each caption) of a split,\
+    grouped by the stem of their audio file.
+
+    Each record is given as its name (i.e. the name of its file for\
+    the `npy` format) and a function that loads it. The loaded record\
+    has the entries `file_name`, `audio_data`, `caption`,\
+    `caption_ind`, `words_ind`, and `chars_ind`.
+
+    For the `npy` format, the files of the records are found from the\
+    index of the split, if it exists, else by listing the directory.
+
+    :param dir_data: Directory with the data of the split.
+    :type dir_data: pathlib.Path
+    :param settings_output: Settings for the output files.
+    :type settings_output: dict
+    :param dir_audio_data: Directory with the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :param suffix: Suffix of the data files (for the `npy` format).
+    :type suffix: str|None
+    :param index_file: The index file of the split, if any.
+    :type index_file: pathlib.Path|None
+    :return: Names and loading functions of the records.
+    :rtype: dict[str, list[(str, callable)]]
+    """
+    split_records = defaultdict(list)
+
+    if settings_output['format'] in ['packed', 'sharded']:
+        for arrays in load_arrays(dir_data, settings_output['format']):
+            for record_index, file_name_audio in enumerate(arrays['file_name']):
+                record_name = settings_output['file_name_template'].format(
+                    audio_file_name=file_name_audio,
+                    caption_index=arrays['caption_ind'][record_index])
+                split_records[Path(file_name_audio).stem].append(
+                    (record_name, partial(get_packed_record, arrays, record_index)))
+    elif index_file is not None and index_file.exists():
+        for row in load_split_index(index_file):
+            data_file = dir_data.joinpath(str(row['path']))
+            if suffix is None or data_file.suffix == suffix:
+                split_records[Path(str(row['file_name'])).stem].append(
+                    (data_file.name, partial(_load_record, data_file, dir_audio_data)))
+    else:
+        for f_stem, data_files in get_data_files_index(dir_data).items():
+            split_records[f_stem].extend(
+                (data_file.name, partial(_load_record, data_file, dir_audio_data))
+                for data_file in data_files
+                if suffix is None or data_file.suffix == suffix)
+
+    return dict(split_records)
+
+
+def _load_record(data_file: Path, dir_audio_data: Optional[Path] = None) -> \
+        Dict[str, Any]:
+    """Loads the record of a numpy object of the split data.
+
+    :param data_file: The file of the numpy object.
+    :type data_file: pathlib.Path
+    :param dir_audio_data: Directory with the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :return: The record.
+    :rtype: dict[str, T]
+    """
+    data_array = load_numpy_object(data_file)
+
+    return {
+        'file_name': data_array['file_name'].item(),
+        'audio_data': get_audio_data(data_array, dir_audio_data),
+        'caption': data_array['caption'].item(),
+        'caption_ind': data_array['caption_ind'].item(),
+        'words_ind': data_array['words_ind'].item(),
+        'chars_ind': data_array['chars_ind'].item()}
+
+
+def get_audio_data(data_array: np.recarray,
+                   dir_audio_data: Optional[Path] = None) -> np.ndarray:
+    """Returns the audio data of a caption data file.
+
+    The audio data are either in the data file (`per_caption`\
+    audio layout) or in the file of the shared audio data\
+    (`shared` audio layout). The shared audio data are memory-mapped,\
+    thus they can be read in parts (e.g. for long audio files).
+
+    :param data_array: The numpy record array of the data file.
+    :type data_array: numpy.rec.array
+    :param dir_audio_data: Directory with the shared audio data.
+    :type dir_audio_data: pathlib.Path|None
+    :return: The audio data.
+    :rtype: numpy.ndarray
+    """
+    if 'audio_data' in data_array.dtype.names:
+        return data_array['audio_data'].item()
+
+    if dir_audio_data is None:
+        raise ValueError('Directory for the shared audio data is not specified.')
+
+    return load_numpy_object(dir_audio_data.joinpath(data_array['audio_file'].item()),
+                             mmap_mode='r')
 
 
 def get_annotations_files(settings_ann: MutableMapping[str, Any], dir_ann: Path) -> \
-        Tuple[List[MutableMapping[str, Any]], List[MutableMapping[str, Any]]]:
+        Tuple[AnnotationsTable, AnnotationsTable]:
     """Reads, process (if necessary), and returns tha annotations files.
 
     :param settings_ann: Settings to be used.
@@ -316,31 +954,74 @@ def get_annotations_files(settings_ann: MutableMapping[str, Any], dir_ann: Path)
     :param dir_ann: Directory of the annotations files.
     :type dir_ann: pathlib.Path
     :return: Development and evaluation annotations files.
-    :rtype: list[collections.OrderedDict], list[collections.OrderedDict]
+    :rtype: tools.annotations_table.AnnotationsTable,\
+            tools.annotations_table.AnnotationsTable
+    """
+    captions_fields = [settings_ann['captions_fields_prefix'].format(c_ind)
+                       for c_ind in range(1, int(settings_ann['nb_captions']) + 1)]
+
+    return tuple(
+        process_annotations(AnnotationsTable.from_csv_file(
+            file_path=dir_ann.joinpath(settings_ann[file_name]),
+            file_name_column=settings_ann['audio_file_column'],
+            captions_columns=captions_fields), settings_ann=settings_ann)
+        for file_name in ['development_file', 'evaluation_file'])
+
+
+def process_annotations(annotations: AnnotationsTable,
+                        settings_ann: MutableMapping[str, Any]) -> AnnotationsTable:
+    """Processes (if necessary) the captions of an annotations table.
+
+    :param annotations: The annotations table.
+    :type annotations: tools.annotations_table.AnnotationsTable
+    :param settings_ann: Settings to be used.
+    :type settings_ann: dict
+    :return: The annotations table with the processed captions.
+    :rtype: tools.annotations_table.AnnotationsTable
     """
-    field_caption = settings_ann['captions_fields_prefix']
-    csv_development = read_csv_file(
-        file_name=settings_ann['development_file'],
-        base_dir=dir_ann)
-    csv_evaluation = read_csv_file(
-        file_name=settings_ann['evaluation_file'],
-        base_dir=dir_ann)
+    return annotations.map_captions(partial(
+        _process_caption, use_special_tokens=settings_ann['use_special_tokens']))
+
 
-    caption_fields = [field_caption.format(c_ind) for c_ind in range(1, 6)]
+def _process_caption(caption: str, use_special_tokens: bool) -> str:
+    """Processes a caption of an annotations file.
+
+    :param caption: The caption.
+    :type caption: str
+    :param use_special_tokens: Add the `<SOS>` and `<EOS>` tokens?
+    :type use_special_tokens: bool
+    :return: The processed caption.
+    :rtype: str
+    """
+    # Clean sentence to remove any spaces before punctuations.
+    caption = clean_sentence(caption, keep_case=True,
+                             remove_punctuation=False, remove_specials=False)
 
-    for csv_entry in chain(csv_development, csv_evaluation):
-        # Clean sentence to remove any spaces before punctuations.
+    if use_special_tokens:
+        caption = '<SOS> {} <EOS>'.format(caption)
 
-        captions = [clean_sentence(csv_entry.get(caption_field), keep_case=True,
-                                   remove_punctuation=False, remove_specials=False)
-                    for caption_field in caption_fields]
+    return caption
 
-        if settings_ann['use_special_tokens']:
-            captions = ['<SOS> {} <EOS>'.format(caption) for caption in captions]
 
-        [csv_entry.update({caption_field: caption})
-         for caption_field, caption in zip(caption_fields, captions)]
+def iter_captions(csv_entries: Iterable[MutableMapping[str, Any]],
+                  settings_ann: MutableMapping[str, Any]) -> Iterator[str]:
+    """Returns the captions of the entries of an annotations file,\
+    one at a time.
 
-    return csv_development, csv_evaluation
+    :param csv_entries: Entries of the annotations file.
+    :type csv_entries: tools.annotations_table.AnnotationsTable|iterable
+    :param settings_ann: Settings to be used.
+    :type settings_ann: dict
+    :return: The captions.
+    :rtype: iterator[str]
+    """
+    if isinstance(csv_entries, AnnotationsTable):
+        # Read the captions columns directly.
+        yield from csv_entries.iter_captions()
+        return
+
+    for csv_entry in csv_entries:
+        for c_ind in range(1, int(settings_ann['nb_captions']) + 1):
+            yield csv_entry.get(settings_ann['captions_fields_prefix'].format(c_ind))
 
 # EOF
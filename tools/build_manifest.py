@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Union, Dict, List, Any, Iterator, Tuple
+from importlib import import_module
+from pathlib import Path
+from hashlib import sha256
+from threading import Lock
+import json
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['BuildManifest', 'get_signature',
+           'get_file_signature', 'get_code_version']
+
+
+class BuildManifest(object):
+    """Manifest of the outputs of a build.
+
+    For each output (e.g. the data files of an audio file) the\
+    manifest keeps the signature of everything that the output\
+    depends on (e.g. input files, settings, and code version) and\
+    the paths of the output files. An output with the same signature\
+    and existing files is up to date and does not have to be built.
+
+    The manifest is a JSON lines file, with one line appended for\
+    each built output. Thus, a build that is interrupted can be\
+    resumed from the last built output.
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        """Manifest of the outputs of a build.
+
+        :param file_path: The path of the manifest file.
+        :type file_path: pathlib.Path
+        """
+        self.file_path = file_path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+        if self.file_path.exists():
+            with self.file_path.open('r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Incomplete line of an interrupted build.
+                        continue
+                    self._entries[entry['key']] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry of an output.
+
+        :param key: The key of the output.
+        :type key: str
+        :return: The entry, with the signature, the output\
+                 files, and any other recorded information.
+        :rtype: dict[str, T]|None
+        """
+        return self._entries.get(key)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Returns the keys and entries of the outputs.
+
+        :return: The keys and the entries.
+        :rtype: iterator[(str, dict[str, T])]
+        """
+        return iter(self._entries.items())
+
+    def is_up_to_date(self, key: str, signature: Optional[str]) -> bool:
+        """Checks if an output is up to date.
+
+        :param key: The key of the output.
+        :type key: str
+        :param signature: The current signature of the output.
+        :type signature: str|None
+        :return: True if the recorded signature is the same\
+                 and the output files exist.
+        :rtype: bool
+        """
+        entry = self._entries.get(key)
+
+        return signature is not None and entry is not None and \
+            entry['signature'] == signature and \
+            all(Path(output).exists() for output in entry['outputs'])
+
+    def update(self, key: str, signature: str,
+               outputs: List[Union[str, Path]], **info: Any) -> None:
+        """Records a built output.
+
+        :param key: The key of the output.
+        :type key: str
+        :param signature: The signature of the output.
+        :type signature: str
+        :param outputs: The files of the output.
+        :type outputs: list[str|pathlib.Path]
+        :param info: Other information to record (JSON serializable).
+        :type info: T
+        """
+        entry = dict(info, key=key, signature=signature,
+                     outputs=[str(output) for output in outputs])
+
+        # Outputs can be recorded by more than one thread.
+        with self._lock:
+            self._entries[key] = entry
+
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.file_path.open('a') as f:
+                f.write('{}\n'.format(json.dumps(entry)))
+
+
+def get_signature(*objects: Any) -> str:
+    """Returns the signature of JSON serializable objects.
+
+    :param objects: The objects (e.g. settings and file signatures).
+    :type objects: T
+    :return: SHA-256 hex digest of the objects.
+    :rtype: str
+    """
+    return sha256(json.dumps(objects, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def get_file_signature(file_path: Path) -> Dict[str, Any]:
+    """Returns the signature of a file, based on its path,\
+    size, and modification time.
+
+    :param file_path: The path of the file.
+    :type file_path: pathlib.Path
+    :return: The signature of the file.
+    :rtype: dict[str, T]
+    """
+    file_stat = file_path.stat()
+    return {'path': str(file_path), 'size': file_stat.st_size,
+            'mtime_ns': file_stat.st_mtime_ns}
+
+
+def get_code_version(*modules_names: str) -> str:
+    """Returns the version of the code of modules, based\
+    on the contents of their source files.
+
+    :param modules_names: The full names of the modules.
+    :type modules_names: str
+    :return: SHA-256 hex digest of the source files.
+    :rtype: str
+    """
+    code_hash = sha256()
+    for module_name in modules_names:
+        code_hash.update(Path(import_module(module_name).__file__).read_bytes())
+
+    return code_hash.hexdigest()
+
+# EOF
@@ -1,15 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from typing import Optional, List, MutableSequence
-from re import sub as re_sub
+from typing import Optional, List, MutableSequence, Dict, Union
+from re import compile as re_compile
 from collections import Counter
 from itertools import chain
-from functools import partial
+from functools import partial, lru_cache
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
-__all__ = ['get_words_counter', 'clean_sentence', 'get_sentence_words']
+__all__ = ['get_words_counter', 'clean_sentence', 'get_sentence_words',
+           'set_clean_sentence_cache_size', 'get_clean_sentence_cache_info']
+
+# Patterns for cleaning the sentences.
+_SPACE_BEFORE_PUNCTUATION = re_compile(r'\s([,.!?;:"](?:\s|$))')
+_PUNCTUATION = re_compile('[,.!?;:\"]')
+
+# Default maximum amount of cleaned sentences to keep in memory.
+_CLEAN_SENTENCE_CACHE_SIZE = 2 ** 16
 
 
 def get_sentence_words(sentence: str,
@@ -50,6 +58,29 @@ def clean_sentence(sentence: str,
                    remove_specials: Optional[bool] = True) -> str:
     """Cleans a sentence.
 
+    The cleaned sentences are kept in a bounded cache, so that each\
+    sentence is cleaned once for each set of arguments.
+
+    :param sentence: Sentence to be clean.
+    :type sentence: str
+    :param keep_case: Keep capitals and small (True) or turn\
+                      everything to small case (False)
+    :type keep_case: bool
+    :param remove_punctuation: Remove punctuation from sentence?
+    :type remove_punctuation: bool
+    :param remove_specials: Remove special tokens?
+    :type remove_specials: bool
+    :return: Cleaned sentence.
+    :rtype: str
+    """
+    return _clean_sentence_cached(
+        sentence, bool(keep_case), bool(remove_punctuation), bool(remove_specials))
+
+
+def _clean_sentence(sentence: str, keep_case: bool,
+                    remove_punctuation: bool, remove_specials: bool) -> str:
+    """Cleans a sentence, without caching.
+
     :param sentence: Sentence to be clean.
     :type sentence: str
     :param keep_case: Keep capitals and small (True) or turn\
@@ -65,18 +96,48 @@ def clean_sentence(sentence: str,
     the_sentence = sentence if keep_case else sentence.lower()
 
     # Remove any forgotten space before punctuation and double space.
-    the_sentence = re_sub(r'\s([,.!?;:"](?:\s|$))', r'\1', the_sentence).replace('  ', ' ')
+    the_sentence = _SPACE_BEFORE_PUNCTUATION.sub(r'\1', the_sentence).replace('  ', ' ')
 
     if remove_specials:
         the_sentence = the_sentence.replace('<SOS> ', '').replace('<sos> ', '')
         the_sentence = the_sentence.replace(' <EOS>', '').replace(' <eos>', '')
 
     if remove_punctuation:
-        the_sentence = re_sub('[,.!?;:\"]', '', the_sentence)
+        the_sentence = _PUNCTUATION.sub('', the_sentence)
 
     return the_sentence
 
 
+_clean_sentence_cached = lru_cache(maxsize=_CLEAN_SENTENCE_CACHE_SIZE)(_clean_sentence)
+
+
+def set_clean_sentence_cache_size(max_size: Optional[int]) -> None:
+    """Sets the maximum amount of cleaned sentences kept\
+    in the cache, and empties the cache.
+
+    :param max_size: Maximum amount of sentences (0 for no\
+                     cache, None for unbounded cache).
+    :type max_size: int|None
+    """
+    global _clean_sentence_cached
+    _clean_sentence_cached = lru_cache(maxsize=max_size)(_clean_sentence)
+
+
+def get_clean_sentence_cache_info() -> Dict[str, Union[int, float, None]]:
+    """Returns the statistics of the cache of the cleaned sentences.
+
+    :return: The hits, misses, hit rate, current size, and\
+             maximum size of the cache.
+    :rtype: dict[str, int|float|None]
+    """
+    cache_info = _clean_sentence_cached.cache_info()
+    nb_calls = cache_info.hits + cache_info.misses
+
+    return {'hits': cache_info.hits, 'misses': cache_info.misses,
+            'hit_rate': cache_info.hits / nb_calls if nb_calls > 0 else 0.,
+            'size': cache_info.currsize, 'max_size': cache_info.maxsize}
+
+
 def get_words_counter(captions: MutableSequence[str],
                       use_unique: Optional[bool] = False,
                       keep_case: Optional[bool] = False,
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Union, Callable, Tuple, Dict
+from io import BytesIO
+from pathlib import Path
+from struct import pack, unpack, calcsize
+import bz2
+import lzma
+import zlib
+
+import numpy as np
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['compress_bytes', 'decompress_bytes', 'is_compressed',
+           'compress_array', 'decompress_array',
+           'dump_compressed_numpy_object', 'load_numpy_file',
+           'get_codecs']
+
+# Prefix of compressed data. It starts with the same byte as the
+# .npy files, but differs from the magic string of numpy.
+_MAGIC = b'\x93BLOCKS'
+
+# Default size of the blocks, in bytes.
+_BLOCK_SIZE = 2 ** 20
+
+# Format of the header of the compressed data, after the codec
+# name: size of the data, size of the blocks, size of the elements
+# for the shuffling, and amount of blocks.
+_HEADER_FORMAT = '<QQHI'
+
+
+def _compress_zstd(data: bytes, level: Optional[int]) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def _decompress_zstd(data: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _compress_lz4(data: bytes, level: Optional[int]) -> bytes:
+    import lz4.frame
+    return lz4.frame.compress(data, compression_level=0 if level is None else level)
+
+
+def _decompress_lz4(data: bytes) -> bytes:
+    import lz4.frame
+    return lz4.frame.decompress(data)
+
+
+# Compression and decompression functions of each codec. The
+# `zstd` and `lz4` codecs need the `zstandard` and `lz4` packages.
+_CODECS: Dict[str, Tuple[Callable[[bytes, Optional[int]], bytes],
+                         Callable[[bytes], bytes]]] = {
+    'zlib': (lambda data, level: zlib.compress(data, -1 if level is None else level),
+             zlib.decompress),
+    'bz2': (lambda data, level: bz2.compress(data, 9 if level is None else level),
+            bz2.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level),
+             lzma.decompress),
+    'zstd': (_compress_zstd, _decompress_zstd),
+    'lz4': (_compress_lz4, _decompress_lz4)}
+
+
+def get_codecs() -> Tuple[str, ...]:
+    """Returns the names of the supported codecs.
+
+    :return: The names of the codecs.
+    :rtype: tuple[str]
+    """
+    return tuple(_CODECS.keys())
+
+
+def _get_codec(codec: str) -> Tuple[Callable[[bytes, Optional[int]], bytes],
+                                    Callable[[bytes], bytes]]:
+    """Returns the compression and decompression functions of a codec.
+
+    :param codec: The name of the codec.
+    :type codec: str
+    :return: The compression and the decompression function.
+    :rtype: (callable, callable)
+    """
+    try:
+        return _CODECS[codec]
+    except KeyError:
+        raise ValueError('Unknown codec: {}. Supported codecs are: {}'.format(
+            codec, ', '.join(_CODECS.keys())))
+
+
+def compress_bytes(data: Union[bytes, memoryview], codec: str,
+                   level: Optional[int] = None,
+                   block_size: Optional[int] = _BLOCK_SIZE,
+                   element_size: Optional[int] = 1) -> bytes:
+    """Compresses data in blocks.
+
+    The data are split in blocks of `block_size` bytes, and each\
+    block is compressed independently. The compressed data start\
+    with a header that has the codec, the size of the data, and\
+    the compressed size of each block, thus they can be\
+    decompressed without knowing the codec.
+
+    With an `element_size` larger than one, the bytes of each block\
+    are shuffled before the compression, i.e. the first bytes of all\
+    elements are followed by the second bytes of all elements, etc.\
+    For arrays of numbers, this groups the bytes that change slowly\
+    (e.g. sign and exponent of floats) and improves the compression.
+
+    :param data: The data.
+    :type data: bytes|memoryview
+    :param codec: The name of the codec (see `get_codecs`).
+    :type codec: str
+    :param level: The compression level, or None for the\
+                  default level of the codec.
+    :type level: int|None
+    :param block_size: The size of the blocks, in bytes.
+    :type block_size: int
+    :param element_size: The size of the elements for shuffling\
+                         the bytes, or 1 for no shuffling.
+    :type element_size: int
+    :return: The compressed data.
+    :rtype: bytes
+    """
+    compress_func = _get_codec(codec)[0]
+    data = memoryview(data).cast('B')
+    element_size = int(element_size)
+
+    if len(data) % element_size != 0:
+        raise ValueError('Size of data is not a multiple of the element size.')
+
+    # The blocks have whole elements.
+    block_size = max(int(block_size) // element_size, 1) * element_size
+
+    blocks = [compress_func(_shuffle(data[i:i + block_size], element_size), level)
+              for i in range(0, len(data), block_size)]
+    codec_name = codec.encode('ascii')
+
+    return b''.join([
+        _MAGIC, pack('<B', len(codec_name)), codec_name,
+        pack(_HEADER_FORMAT, len(data), block_size, element_size, len(blocks)),
+        pack('<{}Q'.format(len(blocks)), *[len(block) for block in blocks])] + blocks)
+
+
+def decompress_bytes(data: Union[bytes, memoryview]) -> bytearray:
+    """Decompresses data compressed with `compress_bytes`.
+
+    :param data: The compressed data.
+    :type data: bytes|memoryview
+    :return: The data.
+    :rtype: bytearray
+    """
+    data = memoryview(data).cast('B')
+
+    if not is_compressed(data):
+        raise ValueError('Data are not compressed with compress_bytes.')
+
+    position = len(_MAGIC)
+    codec_length = data[position]
+    position += 1
+    decompress_func = _get_codec(bytes(data[position:position + codec_length]).decode('ascii'))[1]
+    position += codec_length
+
+    nb_bytes, block_size, element_size, nb_blocks = unpack(
+        _HEADER_FORMAT, data[position:position + calcsize(_HEADER_FORMAT)])
+    position += calcsize(_HEADER_FORMAT)
+    blocks_sizes = unpack('<{}Q'.format(nb_blocks), data[position:position + 8 * nb_blocks])
+    position += 8 * nb_blocks
+
+    # Decompress each block directly to its place.
+    output = bytearray(nb_bytes)
+    for i_block, block_compressed_size in enumerate(blocks_sizes):
+        block = _unshuffle(decompress_func(data[position:position + block_compressed_size]),
+                           element_size)
+        output[i_block * block_size:i_block * block_size + len(block)] = block
+        position += block_compressed_size
+
+    return output
+
+
+def _shuffle(block: memoryview, element_size: int) -> Union[bytes, memoryview]:
+    """Shuffles the bytes of a block, by their position in the elements.
+
+    :param block: The block.
+    :type block: memoryview
+    :param element_size: The size of the elements.
+    :type element_size: int
+    :return: The shuffled block.
+    :rtype: bytes|memoryview
+    """
+    if element_size == 1:
+        return block
+
+    return np.frombuffer(block, dtype=np.uint8).reshape(-1, element_size).T.tobytes()
+
+
+def _unshuffle(block: bytes, element_size: int) -> bytes:
+    """Reverts the shuffling of the bytes of a block.
+
+    :param block: The shuffled block.
+    :type block: bytes
+    :param element_size: The size of the elements.
+    :type element_size: int
+    :return: The block.
+    :rtype: bytes
+    """
+    if element_size == 1:
+        return block
+
+    return np.frombuffer(block, dtype=np.uint8).reshape(element_size, -1).T.tobytes()
+
+
+def is_compressed(data: Union[bytes, memoryview]) -> bool:
+    """Checks if data (or their first bytes) are compressed\
+    with `compress_bytes`.
+
+    :param data: The data, or at least their first eight bytes.
+    :type data: bytes|memoryview
+    :return: True if the data are compressed.
+    :rtype: bool
+    """
+    return bytes(data[:len(_MAGIC)]) == _MAGIC
+
+
+def compress_array(array: np.ndarray, codec: str,
+                   level: Optional[int] = None,
+                   block_size: Optional[int] = _BLOCK_SIZE,
+                   shuffle: Optional[bool] = True) -> np.ndarray:
+    """Compresses the data of an array, in blocks.
+
+    The data type and the shape of the array are not kept\
+    (see `decompress_array`).
+
+    :param array: The array.
+    :type array: numpy.ndarray
+    :param codec: The name of the codec (see `get_codecs`).
+    :type codec: str
+    :param level: The compression level, or None for the\
+                  default level of the codec.
+    :type level: int|None
+    :param block_size: The size of the blocks, in bytes.
+    :type block_size: int
+    :param shuffle: Shuffle the bytes by their position in\
+                    the elements of the array (see `compress_bytes`)?
+    :type shuffle: bool
+    :return: The compressed data, as an array of bytes (uint8).
+    :rtype: numpy.ndarray
+    """
+    array = np.ascontiguousarray(array)
+    return np.frombuffer(compress_bytes(
+        array.reshape(-1).view(np.uint8).data, codec=codec, level=level, block_size=block_size,
+        element_size=array.itemsize if shuffle else 1), dtype=np.uint8)
+
+
+def decompress_array(compressed: np.ndarray, dtype: np.dtype,
+                     item_shape: Optional[tuple] = ()) -> np.ndarray:
+    """Decompresses the data of an array compressed with `compress_array`.
+
+    :param compressed: The compressed data, as an array of bytes.
+    :type compressed: numpy.ndarray
+    :param dtype: The data type of the array.
+    :type dtype: numpy.dtype
+    :param item_shape: The shape of the array, except the first dimension.
+    :type item_shape: tuple
+    :return: The array.
+    :rtype: numpy.ndarray
+    """
+    return np.frombuffer(decompress_bytes(np.ascontiguousarray(compressed).data),
+                         dtype=dtype).reshape((-1, ) + tuple(item_shape))
+
+
+def dump_compressed_numpy_object(np_obj: np.ndarray, file_path: Union[str, Path],
+                                 codec: str, level: Optional[int] = None,
+                                 block_size: Optional[int] = _BLOCK_SIZE,
+                                 shuffle: Optional[bool] = True) -> None:
+    """Dumps a numpy object to a file, compressed in blocks.
+
+    The file has the compressed contents of the .npy file of\
+    the object, and can be loaded with `load_numpy_file`. The\
+    bytes are not shuffled (see `compress_bytes`), since the .npy\
+    file has a header and, for records, pickled objects.
+
+    :param np_obj: The numpy object.
+    :type np_obj: numpy.ndarray
+    :param file_path: The path of the file.
+    :type file_path: str|pathlib.Path
+    :param codec: The name of the codec (see `get_codecs`).
+    :type codec: str
+    :param level: The compression level, or None for the\
+                  default level of the codec.
+    :type level: int|None
+    :param block_size: The size of the blocks, in bytes.
+    :type block_size: int
+    :param shuffle: Not used, for having the same arguments\
+                    as `compress_array`.
+    :type shuffle: bool
+    """
+    npy_data = BytesIO()
+    np.save(npy_data, np_obj)
+
+    Path(file_path).write_bytes(compress_bytes(
+        npy_data.getbuffer(), codec=codec, level=level, block_size=block_size))
+
+
+def load_numpy_file(file_path: Union[str, Path],
+                    allow_pickle: Optional[bool] = True,
+                    mmap_mode: Optional[str] = None) -> np.ndarray:
+    """Loads a .npy file, decompressing it if it is compressed\
+    (i.e. dumped with `dump_compressed_numpy_object`).
+
+    :param file_path: The path of the file.
+    :type file_path: str|pathlib.Path
+    :param allow_pickle: Allow loading pickled objects?
+    :type allow_pickle: bool
+    :param mmap_mode: Memory-map mode for loading the file, if it\
+                      is not compressed, or None for reading it.
+    :type mmap_mode: str|None
+    :return: The numpy object.
+    :rtype: numpy.ndarray
+    """
+    with Path(file_path).open('rb') as f:
+        if is_compressed(f.read(len(_MAGIC))):
+            f.seek(0)
+            return np.load(BytesIO(decompress_bytes(f.read())), allow_pickle=allow_pickle)
+
+    return np.load(str(file_path), allow_pickle=allow_pickle, mmap_mode=mmap_mode)
+
+# EOF
@@ -7,10 +7,11 @@ import os
 import pickle
 import yaml
 
-from librosa import load
 import numpy as np
+import soundfile as sf
 
 from tools import yaml_loader
+from tools.compression import load_numpy_file
 
 __author__ = 'Konstantinos Drossos -- Tampere University'
 __docformat__ = 'reStructuredText'
@@ -64,6 +65,13 @@ def load_audio_file(audio_file: str, sr: int, mono: bool,
                     duration: Optional[Union[float, None]] = None) -> np.ndarray:
     """Loads the data of an audio file.
 
+    If the audio file can be read with soundfile and has the sampling\
+    frequency to be used, its data are read directly in a float32 array.\
+    Otherwise (e.g. resampling is needed), the audio file is loaded with\
+    librosa. The audio data that are read directly are the same (bit\
+    for bit) as the ones loaded with librosa, since librosa reads such\
+    files with soundfile and does not resample them.
+
     :param audio_file: The path of the audio file.
     :type audio_file: str
     :param sr: The sampling frequency to be used.
@@ -77,19 +85,90 @@ def load_audio_file(audio_file: str, sr: int, mono: bool,
     :return: The audio data.
     :rtype: numpy.ndarray
     """
-    return load(path=audio_file, sr=sr, mono=mono,
-                offset=offset, duration=duration)[0]
+    audio_data = _read_audio_file(audio_file=audio_file, sr=sr, mono=mono,
+                                  offset=offset, duration=duration)
+
+    if audio_data is None:
+        # librosa (with numba and scipy) is slow to import, thus
+        # it is imported only when it is needed.
+        from librosa import load
+        audio_data = load(path=audio_file, sr=sr, mono=mono,
+                          offset=offset, duration=duration)[0]
+
+    return audio_data
+
 
+def _read_audio_file(audio_file: str, sr: int, mono: bool,
+                     offset: Optional[float] = 0.0,
+                     duration: Optional[Union[float, None]] = None) -> \
+        Optional[np.ndarray]:
+    """Reads the data of an audio file with soundfile, if the\
+    audio file has the sampling frequency to be used.
 
-def load_numpy_object(file_name: Union[str, Path]) -> Union[np.ndarray, np.recarray]:
+    :param audio_file: The path of the audio file.
+    :type audio_file: str
+    :param sr: The sampling frequency to be used.
+    :type sr: int
+    :param mono: Turn to mono?
+    :type mono: bool
+    :param offset: Offset to be used (in seconds).
+    :type offset: float
+    :param duration: Duration of signal to load (in seconds).
+    :type duration: float|None
+    :return: The audio data, or None if the audio file cannot\
+             be read or has other sampling frequency.
+    :rtype: numpy.ndarray|None
+    """
+    try:
+        with sf.SoundFile(audio_file) as sf_desc:
+            if sf_desc.samplerate != sr:
+                return None
+
+            # As the soundfile loader of librosa, the positions are
+            # truncated to samples (only the audioread loader of
+            # librosa rounds them, and it is used for the audio
+            # files that soundfile cannot read, i.e. when None is
+            # returned here).
+            start = int(offset * sr) if offset else 0
+            if start > 0:
+                sf_desc.seek(start)
+
+            nb_frames = max(sf_desc.frames - start, 0)
+            if duration is not None:
+                nb_frames = min(nb_frames, int(duration * sr))
+
+            audio_data = np.empty(
+                (nb_frames, sf_desc.channels) if sf_desc.channels > 1 else nb_frames,
+                dtype=np.float32)
+            audio_data = sf_desc.read(out=audio_data).T
+    except RuntimeError:
+        return None
+
+    # Same as librosa.to_mono
+    if mono and audio_data.ndim > 1:
+        audio_data = np.mean(audio_data, axis=0)
+
+    return audio_data
+
+
+def load_numpy_object(file_name: Union[str, Path],
+                      mmap_mode: Optional[str] = None) -> Union[np.ndarray, np.recarray]:
     """Loads and returns a numpy object.
 
+    Numpy objects that are saved compressed (see\
+    `tools.compression.dump_compressed_numpy_object`)\
+    are decompressed.
+
     :param file_name: File name of the numpy object.
     :type file_name: str|pathlib.Path
+    :param mmap_mode: Memory-map mode for loading the numpy object\
+                      (not for objects with pickled data or for\
+                      compressed objects), or None for reading it.
+    :type mmap_mode: str|None
     :return: Numpy object.
     :rtype: numpy.ndarray|numpy.rec.array
     """
-    return np.load(str(file_name), allow_pickle=True)
+    return load_numpy_file(file_name, allow_pickle=True, mmap_mode=mmap_mode)
 
 
 def load_pickle_file(file_name: Path, encoding: Optional[str] = 'latin1') -> Any:
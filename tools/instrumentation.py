@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Dict, List, Iterator, Any
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from threading import Thread, Event
+from time import perf_counter, process_time
+from cProfile import Profile
+import json
+import resource
+import sys
+
+from loguru import logger
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['measure_stage', 'enable_cprofile', 'get_report',
+           'dump_report', 'get_rss']
+
+# Interval for sampling the memory, in seconds.
+_MEMORY_SAMPLING_INTERVAL = .01
+
+# Measurements of the finished stages.
+_STAGES: List[Dict[str, Any]] = []
+
+# Names and profilers of the running stages.
+_RUNNING_STAGES: List[str] = []
+_PROFILERS: List[Profile] = []
+
+# Directory for the cProfile files, if cProfile is used.
+_DIR_CPROFILE: List[Path] = []
+
+
+@contextmanager
+def measure_stage(stage_name: str,
+                  nb_files: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Measures a stage of the code and logs the measurements.
+
+    The wall time, the CPU time (of the process and of its finished\
+    child processes), the bytes read and written by the process, the\
+    amount of processed files, and the peak resident memory (RSS)\
+    of the process are measured. Stages can be nested, and the name\
+    of a nested stage is prefixed with the names of its outer stages.
+
+    If cProfile is enabled, the calls of the stage (excluding the ones\
+    of its nested stages) are saved at a file for the stage.
+
+    :param stage_name: The name of the stage.
+    :type stage_name: str
+    :param nb_files: The amount of files processed by the stage\
+                     (can also be set to the `files` entry of the\
+                     returned measurements, during the stage).
+    :type nb_files: int|None
+    :return: The measurements of the stage, filled at its end.
+    :rtype: dict[str, T]
+    """
+    _RUNNING_STAGES.append(stage_name)
+    measurements = {'stage': '/'.join(_RUNNING_STAGES), 'files': nb_files}
+
+    memory = {'peak': get_rss()}
+    stop_event = Event()
+    memory_thread = Thread(target=_sample_memory, args=(memory, stop_event), daemon=True)
+    memory_thread.start()
+
+    io_start = _get_io()
+    cpu_start = process_time()
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    wall_start = perf_counter()
+
+    _start_profiler()
+
+    try:
+        yield measurements
+    finally:
+        _stop_profiler(measurements['stage'])
+
+        wall_time = perf_counter() - wall_start
+        children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_time = process_time() - cpu_start
+        io_end = _get_io()
+
+        stop_event.set()
+        memory_thread.join()
+        _RUNNING_STAGES.pop()
+
+        measurements.update({
+            'wall_time_s': wall_time,
+            'cpu_time_s': cpu_time,
+            'children_cpu_time_s': (children_end.ru_utime + children_end.ru_stime) -
+                                   (children_start.ru_utime + children_start.ru_stime),
+            'read_mb': (io_end['rchar'] - io_start['rchar']) / 2 ** 20,
+            'written_mb': (io_end['wchar'] - io_start['wchar']) / 2 ** 20,
+            'storage_read_mb': (io_end['read_bytes'] - io_start['read_bytes']) / 2 ** 20,
+            'storage_written_mb': (io_end['write_bytes'] - io_start['write_bytes']) / 2 ** 20,
+            'peak_rss_mb': max(memory['peak'], get_rss()) / 2 ** 20})
+        _STAGES.append(measurements)
+
+        logger.bind(indent=2).info(
+            'Stage {stage}: wall time {wall_time_s:.2f} s, CPU time {cpu_time_s:.2f} s '
+            '(child processes {children_cpu_time_s:.2f} s), read {read_mb:.1f} MB, '
+            'written {written_mb:.1f} MB, files {files}, '
+            'peak RSS {peak_rss_mb:.1f} MB'.format(**measurements))
+
+
+def enable_cprofile(dir_cprofile: Path) -> None:
+    """Enables cProfile for the stages.
+
+    :param dir_cprofile: Directory for the cProfile files.
+    :type dir_cprofile: pathlib.Path
+    """
+    dir_cprofile.mkdir(parents=True, exist_ok=True)
+    _DIR_CPROFILE[:] = [dir_cprofile]
+
+
+def get_report() -> Dict[str, Any]:
+    """Returns the measurements of the finished stages.
+
+    :return: The report, with the measurements of each stage.
+    :rtype: dict[str, T]
+    """
+    return {'date': datetime.now().isoformat(timespec='seconds'),
+            'command': sys.argv, 'stages': list(_STAGES)}
+
+
+def dump_report(file_path: Path) -> None:
+    """Saves the measurements of the finished stages at a JSON file.
+
+    :param file_path: The path of the JSON file.
+    :type file_path: pathlib.Path
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with file_path.open('w') as f:
+        json.dump(get_report(), f, indent=2)
+
+
+def get_rss() -> int:
+    """Returns the resident memory of the process, in bytes.
+
+    Where `/proc` is not available, the peak resident memory\
+    of the process since its start is returned instead.
+
+    :return: The resident memory.
+    :rtype: int
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _get_io() -> Dict[str, int]:
+    """Returns the bytes read and written by the process.
+
+    The `rchar` and `wchar` entries are the bytes read and written\
+    (including the ones from and to the page cache), and the\
+    `read_bytes` and `write_bytes` entries are the bytes read and\
+    written from and to the storage. Where `/proc` is not\
+    available, all entries are zero.
+
+    :return: The bytes read and written.
+    :rtype: dict[str, int]
+    """
+    io = {'rchar': 0, 'wchar': 0, 'read_bytes': 0, 'write_bytes': 0}
+
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                key, value = line.split(':')
+                if key in io:
+                    io[key] = int(value)
+    except OSError:
+        pass
+
+    return io
+
+
+def _sample_memory(memory: Dict[str, int], stop_event: Event) -> None:
+    """Samples the resident memory of the process, until stopped.
+
+    :param memory: Dictionary where the peak memory is kept.
+    :type memory: dict[str, int]
+    :param stop_event: Event for stopping the sampling.
+    :type stop_event: threading.Event
+    """
+    while not stop_event.wait(_MEMORY_SAMPLING_INTERVAL):
+        memory['peak'] = max(memory['peak'], get_rss())
+
+
+def _start_profiler() -> None:
+    """Starts the profiler of a stage (if cProfile is enabled),\
+    pausing the profiler of its outer stage.
+    """
+    if len(_DIR_CPROFILE) == 0:
+        return
+
+    if len(_PROFILERS) > 0:
+        _PROFILERS[-1].disable()
+
+    _PROFILERS.append(Profile())
+    _PROFILERS[-1].enable()
+
+
+def _stop_profiler(stage_name: str) -> None:
+    """Stops and saves the profiler of a stage (if cProfile is\
+    enabled), resuming the profiler of its outer stage.
+
+    :param stage_name: The full name of the stage.
+    :type stage_name: str
+    """
+    if len(_PROFILERS) == 0:
+        return
+
+    profiler = _PROFILERS.pop()
+    profiler.disable()
+    profiler.dump_stats(str(_DIR_CPROFILE[0].joinpath(
+        '{}.prof'.format(stage_name.replace('/', '.')))))
+
+    if len(_PROFILERS) > 0:
+        _PROFILERS[-1].enable()
+
+# EOF
@@ -0,0 +1,629 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Union, Dict, List, Any
+from pathlib import Path
+from struct import pack, unpack
+from itertools import chain
+from zipfile import ZipFile, ZIP_STORED
+import json
+import re
+
+import numpy as np
+
+from tools.compression import compress_array, decompress_array
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['PackedArraysWriter', 'ShardedArraysWriter',
+           'get_arrays_writer', 'load_packed_arrays',
+           'load_sharded_arrays', 'load_arrays',
+           'get_packed_item', 'get_packed_record',
+           'get_packed_nb_records']
+
+# Size of the header of the .npy files of the flat arrays. The header is
+# written before the data and re-written, with the final shape, when the
+# flat array is closed. Thus, it has a fixed size.
+_NPY_HEADER_SIZE = 256
+
+# File name of the manifest of the arrays (or shards) of a directory.
+_MANIFEST_FILE_NAME = 'manifest.json'
+
+
+def _get_npy_header(dtype: np.dtype, shape: tuple) -> bytes:
+    """Returns the header (version 1.0) of a .npy file, of fixed size.
+
+    :param dtype: Data type of the array.
+    :type dtype: numpy.dtype
+    :param shape: Shape of the array.
+    :type shape: tuple
+    :return: The header.
+    :rtype: bytes
+    """
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype),
+                   'fortran_order': False, 'shape': shape})
+    header = header.ljust(_NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return np.lib.format.MAGIC_PREFIX + b'\x01\x00' + \
+        pack('<H', len(header)) + header.encode('latin1')
+
+
+class _FlatArrayFile(object):
+    """Flat array of ragged items, written incrementally to a .npy file.
+    """
+
+    def __init__(self, file_path: Path, dtype: np.dtype,
+                 item_shape: tuple) -> None:
+        """Flat array of ragged items.
+
+        :param file_path: Path of the .npy file.
+        :type file_path: pathlib.Path
+        :param dtype: Data type of the items.
+        :type dtype: numpy.dtype
+        :param item_shape: Shape of the items, except the first dimension.
+        :type item_shape: tuple
+        """
+        self.dtype = np.dtype(dtype)
+        self.item_shape = tuple(item_shape)
+        self.offsets: List[int] = []
+        self.lengths: List[int] = []
+        self._nb_rows = 0
+        self._file = file_path.open('wb')
+        self._file.write(_get_npy_header(self.dtype, (0, ) + self.item_shape))
+
+    def append(self, array: np.ndarray) -> int:
+        """Appends an item to the flat array.
+
+        :param array: The item.
+        :type array: numpy.ndarray
+        :return: Index of the item.
+        :rtype: int
+        """
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+
+        if array.shape[1:] != self.item_shape:
+            raise ValueError('Item of shape {} cannot be added to a flat array '
+                             'with items of shape (n, {}).'.format(
+                                array.shape, self.item_shape))
+
+        self._file.write(array.tobytes())
+        self.offsets.append(self._nb_rows)
+        self.lengths.append(array.shape[0])
+        self._nb_rows += array.shape[0]
+
+        return len(self.lengths) - 1
+
+    def close(self) -> None:
+        """Writes the final header of the .npy file and closes it.
+        """
+        self._file.seek(0)
+        self._file.write(_get_npy_header(self.dtype, (self._nb_rows, ) + self.item_shape))
+        self._file.close()
+
+
+class PackedArraysWriter(object):
+    """Writer of records in flat, typed, arrays.
+
+    Each record has scalar values (e.g. strings and integers) and\
+    references to items of flat arrays (e.g. audio data and indices\
+    of words). The items of a flat array are concatenated in one\
+    `.npy` file, and their offsets and lengths are kept at the\
+    `<name>_offsets.npy` and `<name>_lengths.npy` files. The record\
+    references an item of the flat array `<name>` with the value\
+    `<name>_index`. No object data type is used, thus all the\
+    files can be loaded with `numpy.load(mmap_mode='r')`. The\
+    arrays are listed at the `manifest.json` file, thus other\
+    `.npy` files of the directory (e.g. of a previous output)\
+    are not loaded.
+
+    The items of a flat array can be compressed (see\
+    `tools.compression.compress_array`). Then, the flat array has\
+    the compressed bytes of the items, the offsets and lengths are\
+    in bytes, and the data type and the shape of the items are\
+    kept at the `<name>_compression.npy` file.
+    """
+
+    def __init__(self, dir_packed: Path) -> None:
+        """Writer of records in flat, typed, arrays.
+
+        :param dir_packed: Directory for the arrays.
+        :type dir_packed: pathlib.Path
+        """
+        self.dir_packed = dir_packed
+        self.dir_packed.mkdir(parents=True, exist_ok=True)
+        _remove_manifest(self.dir_packed)
+        self._flat_arrays: Dict[str, _FlatArrayFile] = {}
+        self._compression: Dict[str, np.ndarray] = {}
+        self._columns: Dict[str, List[Any]] = {}
+        self._nb_records = 0
+
+    @property
+    def shard_file_name(self) -> str:
+        """The file name of the current shard.
+
+        All records are in the same arrays, thus there are no shards.
+
+        :return: An empty string.
+        :rtype: str
+        """
+        return ''
+
+    def append_item(self, name: str, array: np.ndarray,
+                    dtype: Optional[np.dtype] = None,
+                    compression: Optional[Dict[str, Any]] = None) -> int:
+        """Appends an item to a flat array.
+
+        :param name: Name of the flat array.
+        :type name: str
+        :param array: The item.
+        :type array: numpy.ndarray
+        :param dtype: Data type of the flat array. If None, the\
+                      data type of the first item is used.
+        :type dtype: numpy.dtype|None
+        :param compression: The `codec`, `level`, and `block_size`\
+                            for compressing the items of the flat\
+                            array, or None for no compression. Must\
+                            be the same for all items of the flat array.
+        :type compression: dict[str, T]|None
+        :return: Index of the item at the flat array.
+        :rtype: int
+        """
+        array = np.asarray(array, dtype=dtype)
+
+        if compression is not None:
+            self._compression.setdefault(name, _get_compression_info(array))
+            array = compress_array(array, **compression)
+
+        if name not in self._flat_arrays:
+            self._flat_arrays[name] = _FlatArrayFile(
+                self.dir_packed.joinpath('{}.npy'.format(name)),
+                dtype=array.dtype, item_shape=array.shape[1:])
+
+        return self._flat_arrays[name].append(array)
+
+    def append_record(self, **columns: Any) -> int:
+        """Appends a record.
+
+        :param columns: The values of the columns of the record.
+        :type columns: str|int|float
+        :return: Index of the record.
+        :rtype: int
+        """
+        if self._nb_records > 0 and set(columns.keys()) != set(self._columns.keys()):
+            raise ValueError('Record has different columns from the previous records.')
+
+        for column_name, value in columns.items():
+            self._columns.setdefault(column_name, []).append(value)
+
+        self._nb_records += 1
+
+        return self._nb_records - 1
+
+    def start_entry(self) -> None:
+        """Marks the start of the data of an entry (i.e. audio file).
+
+        All entries are written in the same arrays, thus nothing is done.
+        """
+        pass
+
+    def close(self) -> None:
+        """Writes the columns of the records and closes the flat arrays.
+        """
+        for name, flat_array in self._flat_arrays.items():
+            flat_array.close()
+            np.save(str(self.dir_packed.joinpath('{}_offsets.npy'.format(name))),
+                    np.array(flat_array.offsets, dtype=np.int64))
+            np.save(str(self.dir_packed.joinpath('{}_lengths.npy'.format(name))),
+                    np.array(flat_array.lengths, dtype=np.int64))
+
+        for name, compression_info in self._compression.items():
+            np.save(str(self.dir_packed.joinpath('{}_compression.npy'.format(name))),
+                    compression_info)
+
+        for column_name, values in self._columns.items():
+            np.save(str(self.dir_packed.joinpath('{}.npy'.format(column_name))),
+                    np.array(values))
+
+        arrays_names = list(chain.from_iterable(
+            [name, '{}_offsets'.format(name), '{}_lengths'.format(name)]
+            for name in self._flat_arrays.keys()))
+        arrays_names.extend('{}_compression'.format(name) for name in self._compression.keys())
+        arrays_names.extend(self._columns.keys())
+
+        with self.dir_packed.joinpath(_MANIFEST_FILE_NAME).open('w') as f:
+            json.dump({'arrays': sorted(arrays_names), 'nb_records': self._nb_records},
+                      f, indent=2)
+
+    def __enter__(self) -> 'PackedArraysWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class ShardedArraysWriter(object):
+    """Writer of records in shards of flat, typed, arrays.
+
+    The data of a fixed amount of entries (i.e. audio files) are\
+    kept in memory and written as one shard. A shard is an uncompressed\
+    `.npz` file with the arrays of the PackedArraysWriter layout, i.e.\
+    the columns of the records and the flat arrays with their offsets and\
+    lengths (and, for compressed flat arrays, their `<name>_compression`\
+    array). References of records to items are within the same shard.\
+    The shards are listed at the `manifest.json` file, and the shards\
+    of a previous output that are not listed are deleted.
+    """
+
+    def __init__(self, dir_shards: Path, shard_size: int,
+                 shard_name_template: Optional[str] = 'shard_{:05d}.npz') -> None:
+        """Writer of records in shards of flat, typed, arrays.
+
+        :param dir_shards: Directory for the shards.
+        :type dir_shards: pathlib.Path
+        :param shard_size: Amount of entries (i.e. audio files) per shard.
+        :type shard_size: int
+        :param shard_name_template: Template for the file names of the shards.
+        :type shard_name_template: str
+        """
+        self.dir_shards = dir_shards
+        self.dir_shards.mkdir(parents=True, exist_ok=True)
+        _remove_manifest(self.dir_shards)
+        self.shard_size = int(shard_size)
+        self.shard_name_template = shard_name_template
+        self._shards: List[Dict[str, Any]] = []
+        self._dtypes: Dict[str, np.dtype] = {}
+        self._compression: Dict[str, np.ndarray] = {}
+        self._reset_shard()
+
+    def _reset_shard(self) -> None:
+        """Empties the data of the current shard.
+        """
+        self._items: Dict[str, List[np.ndarray]] = {}
+        self._columns: Dict[str, List[Any]] = {}
+        self._nb_entries = 0
+        self._nb_records = 0
+
+    @property
+    def shard_file_name(self) -> str:
+        """The file name of the current shard.
+
+        :return: The file name of the shard of the next records.
+        :rtype: str
+        """
+        return self.shard_name_template.format(len(self._shards))
+
+    def start_entry(self) -> None:
+        """Marks the start of the data of an entry (i.e. audio file).
+
+        If the current shard is full, it is written and a new one is started.
+        """
+        if self._nb_entries >= self.shard_size:
+            self._write_shard()
+        self._nb_entries += 1
+
+    def append_item(self, name: str, array: np.ndarray,
+                    dtype: Optional[np.dtype] = None,
+                    compression: Optional[Dict[str, Any]] = None) -> int:
+        """Appends an item to a flat array of the current shard.
+
+        :param name: Name of the flat array.
+        :type name: str
+        :param array: The item.
+        :type array: numpy.ndarray
+        :param dtype: Data type of the flat array. If None, the\
+                      data type of the first item is used.
+        :type dtype: numpy.dtype|None
+        :param compression: The `codec`, `level`, and `block_size`\
+                            for compressing the items of the flat\
+                            array, or None for no compression. Must\
+                            be the same for all items of the flat array.
+        :type compression: dict[str, T]|None
+        :return: Index of the item at the flat array of the shard.
+        :rtype: int
+        """
+        array = np.asarray(array, dtype=dtype or self._dtypes.get(name))
+        self._dtypes.setdefault(name, array.dtype)
+
+        if compression is not None:
+            self._compression.setdefault(name, _get_compression_info(array))
+            array = compress_array(array, **compression)
+        self._items.setdefault(name, []).append(array)
+
+        return len(self._items[name]) - 1
+
+    def append_record(self, **columns: Any) -> int:
+        """Appends a record to the current shard.
+
+        :param columns: The values of the columns of the record.
+        :type columns: str|int|float
+        :return: Index of the record at the shard.
+        :rtype: int
+        """
+        if self._nb_records > 0 and set(columns.keys()) != set(self._columns.keys()):
+            raise ValueError('Record has different columns from the previous records.')
+
+        for column_name, value in columns.items():
+            self._columns.setdefault(column_name, []).append(value)
+
+        self._nb_records += 1
+
+        return self._nb_records - 1
+
+    def _write_shard(self) -> None:
+        """Writes the current shard and starts a new one.
+        """
+        if self._nb_records == 0:
+            return
+
+        arrays = {}
+        for name, items in self._items.items():
+            lengths = np.array([len(item) for item in items], dtype=np.int64)
+            arrays[name] = np.concatenate(items)
+            arrays['{}_offsets'.format(name)] = np.cumsum(lengths) - lengths
+            arrays['{}_lengths'.format(name)] = lengths
+            if name in self._compression:
+                arrays['{}_compression'.format(name)] = self._compression[name]
+
+        for column_name, values in self._columns.items():
+            arrays[column_name] = np.array(values)
+
+        shard_file_name = self.shard_file_name
+        np.savez(str(self.dir_shards.joinpath(shard_file_name)), **arrays)
+
+        self._shards.append({'file_name': shard_file_name,
+                             'nb_entries': self._nb_entries,
+                             'nb_records': self._nb_records})
+        self._reset_shard()
+
+    def close(self) -> None:
+        """Writes the last shard and the manifest of the shards, and\
+        deletes the shards of a previous output that are not listed.
+        """
+        self._write_shard()
+        with self.dir_shards.joinpath(_MANIFEST_FILE_NAME).open('w') as f:
+            json.dump({'shards': self._shards,
+                       'nb_entries': sum(s['nb_entries'] for s in self._shards),
+                       'nb_records': sum(s['nb_records'] for s in self._shards)},
+                      f, indent=2)
+
+        shards_names = {shard['file_name'] for shard in self._shards}
+        for f_path in self.dir_shards.glob(re.sub(r'{[^}]*}', '*', self.shard_name_template)):
+            if f_path.name not in shards_names:
+                f_path.unlink()
+
+    def __enter__(self) -> 'ShardedArraysWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def get_arrays_writer(data_format: str, dir_output: Path,
+                      shard_size: Optional[int] = None) -> \
+        Union[PackedArraysWriter, ShardedArraysWriter, None]:
+    """Returns the writer of arrays for a data format.
+
+    :param data_format: The data format (`npy`, `packed`, or `sharded`).
+    :type data_format: str
+    :param dir_output: Directory for the arrays.
+    :type dir_output: pathlib.Path
+    :param shard_size: Amount of entries per shard (for the `sharded` format).
+    :type shard_size: int|None
+    :return: The writer, or None for the `npy` format (i.e. one numpy\
+             object per record).
+    :rtype: PackedArraysWriter|ShardedArraysWriter|None
+    """
+    if data_format == 'npy':
+        return None
+    elif data_format == 'packed':
+        return PackedArraysWriter(dir_output)
+    elif data_format == 'sharded':
+        return ShardedArraysWriter(dir_output, shard_size=shard_size)
+
+    raise ValueError('Unknown data format: {}'.format(data_format))
+
+
+def load_packed_arrays(dir_packed: Union[str, Path],
+                       mmap_mode: Optional[str] = 'r') -> Dict[str, np.ndarray]:
+    """Loads the arrays written with the PackedArraysWriter.
+
+    Only the arrays listed at the `manifest.json` file are loaded.
+
+    :param dir_packed: Directory of the arrays.
+    :type dir_packed: str|pathlib.Path
+    :param mmap_mode: Memory-map mode for loading the arrays.
+    :type mmap_mode: str|None
+    :return: The arrays, with their names as keys.
+    :rtype: dict[str, numpy.ndarray]
+    """
+    dir_packed = Path(dir_packed)
+    with dir_packed.joinpath(_MANIFEST_FILE_NAME).open('r') as f:
+        manifest = json.load(f)
+
+    return {name: np.load(str(dir_packed.joinpath('{}.npy'.format(name))),
+                          mmap_mode=mmap_mode, allow_pickle=False)
+            for name in manifest['arrays']}
+
+
+def load_sharded_arrays(dir_shards: Union[str, Path]) -> List[Dict[str, np.ndarray]]:
+    """Loads the shards written with the ShardedArraysWriter.
+
+    Only the shards listed at the `manifest.json` file are\
+    loaded, and their arrays are memory-mapped.
+
+    :param dir_shards: Directory of the shards.
+    :type dir_shards: str|pathlib.Path
+    :return: The arrays of each shard, with their names as keys.
+    :rtype: list[dict[str, numpy.ndarray]]
+    """
+    dir_shards = Path(dir_shards)
+    with dir_shards.joinpath(_MANIFEST_FILE_NAME).open('r') as f:
+        manifest = json.load(f)
+
+    return [_load_npz_arrays(dir_shards.joinpath(shard['file_name']))
+            for shard in manifest['shards']]
+
+
+def load_arrays(dir_data: Union[str, Path], data_format: str) -> \
+        List[Dict[str, np.ndarray]]:
+    """Loads the arrays of a data format, as a list of packed arrays.
+
+    :param dir_data: Directory of the arrays.
+    :type dir_data: str|pathlib.Path
+    :param data_format: The data format (`packed` or `sharded`).
+    :type data_format: str
+    :return: The packed arrays (one for the `packed`\
+             format and one per shard for the `sharded` format).
+    :rtype: list[dict[str, numpy.ndarray]]
+    """
+    if data_format == 'packed':
+        return [load_packed_arrays(dir_data)]
+    elif data_format == 'sharded':
+        return load_sharded_arrays(dir_data)
+
+    raise ValueError('Cannot load arrays of data format: {}'.format(data_format))
+
+
+def _load_npz_arrays(file_path: Path) -> Dict[str, np.ndarray]:
+    """Memory-maps the arrays of an uncompressed `.npz` file.
+
+    :param file_path: The path of the `.npz` file.
+    :type file_path: pathlib.Path
+    :return: The arrays, with their names as keys.
+    :rtype: dict[str, numpy.ndarray]
+    """
+    arrays = {}
+    with ZipFile(str(file_path)) as zip_file, file_path.open('rb') as f:
+        for info in zip_file.infolist():
+            if info.compress_type != ZIP_STORED:
+                raise ValueError('Array {} of {} is compressed.'.format(
+                    info.filename, file_path))
+
+            # Skip the local header of the zip entry.
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = unpack('<HH', f.read(4))
+            f.seek(name_length + extra_length, 1)
+
+            # Read the header of the .npy file.
+            version = np.lib.format.read_magic(f)
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f) \
+                if version == (1, 0) else np.lib.format.read_array_header_2_0(f)
+
+            name = info.filename[:-len('.npy')]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(
+                    str(file_path), dtype=dtype, mode='r', offset=f.tell(),
+                    shape=shape, order='F' if fortran_order else 'C')
+
+    return arrays
+
+
+def get_packed_item(arrays: Dict[str, np.ndarray], name: str,
+                    index: int) -> np.ndarray:
+    """Returns an item of a flat array, without copying the data.
+
+    Items of compressed flat arrays are decompressed (thus copied).
+
+    :param arrays: The packed arrays.
+    :type arrays: dict[str, numpy.ndarray]
+    :param name: Name of the flat array.
+    :type name: str
+    :param index: Index of the item.
+    :type index: int
+    :return: The item.
+    :rtype: numpy.ndarray
+    """
+    offset = int(arrays['{}_offsets'.format(name)][index])
+    item = arrays[name][offset:offset + int(arrays['{}_lengths'.format(name)][index])]
+
+    compression_name = '{}_compression'.format(name)
+    if compression_name in arrays:
+        compression_info = json.loads(str(arrays[compression_name][0]))
+        return decompress_array(item, dtype=np.dtype(compression_info['dtype']),
+                                item_shape=compression_info['item_shape'])
+
+    return item
+
+
+def get_packed_nb_records(arrays: Dict[str, np.ndarray]) -> int:
+    """Returns the amount of records in packed arrays.
+
+    :param arrays: The packed arrays.
+    :type arrays: dict[str, numpy.ndarray]
+    :return: Amount of records.
+    :rtype: int
+    """
+    return len(arrays[_get_columns_names(arrays)[0]])
+
+
+def get_packed_record(arrays: Dict[str, np.ndarray], index: int) -> Dict[str, Any]:
+    """Returns a record of packed arrays.
+
+    The references (i.e. `<name>_index` columns) to items of flat\
+    arrays are replaced by the items (under the key `<name>`).
+
+    :param arrays: The packed arrays.
+    :type arrays: dict[str, numpy.ndarray]
+    :param index: Index of the record.
+    :type index: int
+    :return: The record.
+    :rtype: dict[str, T]
+    """
+    record = {}
+    for column_name in _get_columns_names(arrays):
+        value = arrays[column_name][index].item()
+        if column_name.endswith('_index') and \
+                '{}_offsets'.format(column_name[:-len('_index')]) in arrays:
+            name = column_name[:-len('_index')]
+            record[name] = get_packed_item(arrays, name, value)
+        else:
+            record[column_name] = value
+
+    return record
+
+
+def _remove_manifest(dir_arrays: Path) -> None:
+    """Removes the manifest of the arrays (or shards) of a directory,\
+    if any, so that an unfinished output is not loaded.
+
+    :param dir_arrays: Directory of the arrays.
+    :type dir_arrays: pathlib.Path
+    """
+    manifest_file = dir_arrays.joinpath(_MANIFEST_FILE_NAME)
+    if manifest_file.exists():
+        manifest_file.unlink()
+
+
+def _get_compression_info(array: np.ndarray) -> np.ndarray:
+    """Returns the information for decompressing the items of a\
+    compressed flat array, i.e. the data type and the shape of\
+    the items, as a JSON string in an array of one element.
+
+    :param array: The first item of the flat array.
+    :type array: numpy.ndarray
+    :return: The information for decompressing the items.
+    :rtype: numpy.ndarray
+    """
+    return np.array([json.dumps({'dtype': array.dtype.str,
+                                 'item_shape': list(array.shape[1:])})])
+
+
+def _get_columns_names(arrays: Dict[str, np.ndarray]) -> List[str]:
+    """Returns the names of the columns of the records.
+
+    :param arrays: The packed arrays.
+    :type arrays: dict[str, numpy.ndarray]
+    :return: Names of the columns.
+    :rtype: list[str]
+    """
+    flat_names = [name[:-len('_offsets')] for name in arrays.keys()
+                  if name.endswith('_offsets')]
+    not_columns = set(chain.from_iterable(
+        [name, '{}_offsets'.format(name), '{}_lengths'.format(name),
+         '{}_compression'.format(name)]
+        for name in flat_names))
+
+    return [name for name in arrays.keys() if name not in not_columns]
+
+# EOF
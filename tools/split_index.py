@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Optional, Union, Iterable, Dict, Tuple, Any
+from pathlib import Path
+from threading import Lock
+import os
+
+import numpy as np
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['SplitIndexWriter', 'load_split_index', 'get_split_index_file']
+
+# Numeric columns of the index, with their data types.
+_NUMERIC_COLUMNS = [('caption_ind', np.int32), ('record_index', np.int64),
+                    ('nb_frames', np.int64), ('nb_words', np.int32),
+                    ('nb_chars', np.int32)]
+
+# String columns of the index.
+_STRING_COLUMNS = ['file_name', 'path', 'shard']
+
+
+class SplitIndexWriter(object):
+    """Writer of the index of a split, i.e. one row for each\
+    sample (caption) of the split.
+
+    Each row has the audio file name (`file_name`), the caption index\
+    (`caption_ind`), the location of the sample (`path` of the numpy\
+    object, relative to the directory of the split, for the `npy`\
+    format, or the file name of the `shard` and the `record_index` at\
+    the shard for the `packed` and `sharded` formats), the amount of\
+    frames of the audio data or of the features (`nb_frames`), and the\
+    amount of word and character indices (`nb_words` and `nb_chars`).
+
+    The index is saved as a numpy structured array (see\
+    `load_split_index`), with its rows sorted by audio file\
+    name and caption index. Rows can be added by many threads.
+    """
+
+    def __init__(self, file_path: Path,
+                 previous_index: Optional[np.ndarray] = None) -> None:
+        """Writer of the index of a split.
+
+        :param file_path: The path of the index file.
+        :type file_path: pathlib.Path
+        :param previous_index: The rows of a previous index, which\
+                               are kept if they are not added again\
+                               (e.g. with incremental build).
+        :type previous_index: numpy.ndarray|None
+        """
+        self.file_path = file_path
+        self._lock = Lock()
+        self._rows: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+        if previous_index is not None:
+            for row in previous_index:
+                self._rows[(str(row['file_name']), int(row['caption_ind']))] = {
+                    name: row[name].item() for name in previous_index.dtype.names}
+
+    def add(self, file_name: str, caption_ind: int, nb_frames: int,
+            nb_words: int, nb_chars: int, path: Optional[str] = '',
+            shard: Optional[str] = '', record_index: Optional[int] = -1) -> None:
+        """Adds (or replaces) the row of a sample.
+
+        :param file_name: The audio file name.
+        :type file_name: str
+        :param caption_ind: The caption index.
+        :type caption_ind: int
+        :param nb_frames: Amount of frames of the audio data or features.
+        :type nb_frames: int
+        :param nb_words: Amount of word indices.
+        :type nb_words: int
+        :param nb_chars: Amount of character indices.
+        :type nb_chars: int
+        :param path: Path of the numpy object (`npy` format).
+        :type path: str
+        :param shard: File name of the shard (`sharded` format).
+        :type shard: str
+        :param record_index: Index of the record at the packed arrays\
+                             or at the shard (`packed` and `sharded`\
+                             formats).
+        :type record_index: int
+        """
+        row = {'file_name': file_name, 'caption_ind': caption_ind,
+               'path': path, 'shard': shard, 'record_index': record_index,
+               'nb_frames': nb_frames, 'nb_words': nb_words, 'nb_chars': nb_chars}
+
+        with self._lock:
+            self._rows[(file_name, int(caption_ind))] = row
+
+    def close(self, audio_stems: Optional[Iterable[str]] = None) -> None:
+        """Saves the index.
+
+        :param audio_stems: The stems of the audio files of the split.\
+                            If given, only their rows are saved.
+        :type audio_stems: iterable[str]|None
+        """
+        keys = sorted(self._rows.keys())
+
+        if audio_stems is not None:
+            audio_stems = set(audio_stems)
+            keys = [key for key in keys if Path(key[0]).stem in audio_stems]
+
+        rows = [self._rows[key] for key in keys]
+
+        dtype = [(name, 'U{}'.format(max([len(row[name]) for row in rows], default=0) or 1))
+                 for name in _STRING_COLUMNS] + _NUMERIC_COLUMNS
+        index = np.array([tuple(row[name] for name, _ in dtype) for row in rows], dtype=dtype)
+
+        # Write to a temporary file and rename, so that
+        # loaders do not read a partially written index.
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.file_path.with_suffix('.tmp')
+        with tmp_file.open('wb') as f:
+            np.save(f, index)
+        os.replace(str(tmp_file), str(self.file_path))
+
+
+def load_split_index(file_path: Union[str, Path]) -> np.ndarray:
+    """Loads the index of a split.
+
+    The index is a numpy structured array with the columns\
+    `file_name`, `path`, `shard`, `caption_ind`, `record_index`,\
+    `nb_frames`, `nb_words`, and `nb_chars` (see SplitIndexWriter).
+
+    :param file_path: The path of the index file.
+    :type file_path: str|pathlib.Path
+    :return: The index.
+    :rtype: numpy.ndarray
+    """
+    return np.load(str(file_path))
+
+
+def get_split_index_file(dir_split: Path, file_name_template: str) -> Path:
+    """Returns the path of the index file of a split, next\
+    to the directory of the split.
+
+    :param dir_split: The directory of the split.
+    :type dir_split: pathlib.Path
+    :param file_name_template: Template for the file name of the\
+                               index, with the `split_dir` field.
+    :type file_name_template: str
+    :return: The path of the index file.
+    :rtype: pathlib.Path
+    """
+    return dir_split.parent.joinpath(file_name_template.format(split_dir=dir_split.name))
+
+# EOF
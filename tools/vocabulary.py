@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Iterable, Iterator, Sequence, List, Dict, Tuple
+from itertools import chain
+
+import numpy as np
+
+__author__ = 'Konstantinos Drossos -- Tampere University'
+__docformat__ = 'reStructuredText'
+__all__ = ['Vocabulary']
+
+
+class Vocabulary(object):
+    """Ordered list of tokens (i.e. words or characters)\
+    with a token to index mapping.
+
+    Offers the same indexing as a list of tokens, but\
+    the index of a token is found in constant time.
+    """
+
+    def __init__(self, tokens: Iterable[str]) -> None:
+        """Vocabulary of tokens.
+
+        :param tokens: The tokens, in the order of their indices.
+        :type tokens: iterable[str]
+        """
+        self._tokens: List[str] = list(tokens)
+        self._indices: Dict[str, int] = {
+            token: index for index, token in enumerate(self._tokens)}
+
+        if len(self._indices) != len(self._tokens):
+            raise ValueError('Tokens of a vocabulary must be unique.')
+
+    @property
+    def tokens(self) -> List[str]:
+        """The tokens of the vocabulary.
+
+        :return: The tokens, in the order of their indices.
+        :rtype: list[str]
+        """
+        return self._tokens
+
+    def index(self, token: str) -> int:
+        """Returns the index of a token.
+
+        :param token: The token.
+        :type token: str
+        :return: The index of the token.
+        :rtype: int
+        """
+        try:
+            return self._indices[token]
+        except KeyError:
+            raise ValueError('{!r} is not in the vocabulary'.format(token))
+
+    def encode(self, tokens: Iterable[str]) -> List[int]:
+        """Returns the indices of a sequence of tokens.
+
+        :param tokens: The tokens.
+        :type tokens: iterable[str]
+        :return: The indices of the tokens.
+        :rtype: list[int]
+        """
+        return [self.index(token) for token in tokens]
+
+    def encode_batch(self, sequences: Sequence[Iterable[str]]) -> \
+            Tuple[np.ndarray, np.ndarray]:
+        """Returns the indices of many sequences of tokens, in one\
+        flat array (i.e. as a ragged array).
+
+        The indices of the i-th sequence are the elements\
+        `indices[offsets[i]:offsets[i + 1]]`. The indices are\
+        written directly to the flat array, without creating a\
+        list or an array for each sequence.
+
+        :param sequences: The sequences of tokens (e.g. lists\
+                          of words or strings of characters).
+        :type sequences: list[list[str]|str]
+        :return: The indices of the tokens (int32), and the offsets\
+                 of the sequences (int64, one more than the sequences).
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences)),
+                  out=offsets[1:])
+
+        try:
+            indices = np.fromiter(
+                map(self._indices.__getitem__, chain.from_iterable(sequences)),
+                dtype=np.int32, count=int(offsets[-1]))
+        except KeyError as e:
+            raise ValueError('{!r} is not in the vocabulary'.format(e.args[0]))
+
+        return indices, offsets
+
+    def __getitem__(self, index: int) -> str:
+        return self._tokens[index]
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._indices
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tokens)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __reduce__(self):
+        # Only the tokens are serialized, the mapping is re-created.
+        return self.__class__, (self._tokens, )
+
+# EOF